@@ -0,0 +1,63 @@
+"""Memory benchmark: per-instance __dict__ dataclass vs slotted ResearchOutputItem vs ResearchOutputTable.
+
+Run with: python benchmarks/bench_item_memory.py [records]
+"""
+import sys
+import tracemalloc
+from dataclasses import dataclass, fields, make_dataclass
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.models.research_output_table import ResearchOutputTable
+
+# the previous ResearchOutputItem layout: same fields, plain @dataclass with a __dict__
+DictResearchOutputItem = make_dataclass(
+    "DictResearchOutputItem",
+    [(f.name, f.type, f) for f in fields(ResearchOutputItem)],
+)
+
+RESOURCE_TYPES = ["Dataset", "Software", "Text", "Image", "Collection"]
+CLIENTS = [f"snd.client{n}" for n in range(40)]
+
+
+def record_values(n: int) -> dict:
+    # built from fresh strings, like values decoded from JSON
+    return dict(
+        doi=f"10.5878/{n:08d}",
+        publicationYear=2000 + n % 25,
+        resourceType="".join(RESOURCE_TYPES[n % 5]),
+        title=f"Survey data on topic {n}",
+        publisher="".join(["Swedish National ", "Data Service"]),
+        createdAt=f"2024-01-{n % 28 + 1:02d}T10:00:00Z",
+        updatedAt=f"2024-02-{n % 28 + 1:02d}T10:00:00Z",
+        isPublisher=n % 2 == 0,
+        inDataCite=True,
+        dataCiteClientId="".join(CLIENTS[n % 40]),
+        dataCiteViewCount=n % 1000,
+        titleWordCount=5,
+    )
+
+
+def measure(build, count: int) -> int:
+    tracemalloc.start()
+    kept = build(count)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main(count: int = 100000) -> None:
+    variants = {
+        "dataclass (__dict__)": lambda c: [DictResearchOutputItem(**record_values(n)) for n in range(c)],
+        "dataclass (slots)": lambda c: [ResearchOutputItem(**record_values(n)) for n in range(c)],
+        "ResearchOutputTable": lambda c: ResearchOutputTable(ResearchOutputItem(**record_values(n)) for n in range(c)),
+    }
+    baseline = None
+    print(f"{count} records")
+    for name, build in variants.items():
+        size = measure(build, count)
+        baseline = baseline or size
+        print(f"{name:<22}{size / 1024 / 1024:>9.1f} MB{size / count:>9.0f} B/record{size / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
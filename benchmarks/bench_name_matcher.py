@@ -0,0 +1,36 @@
+"""Micro-benchmark: match_patterns vs NameMatcher on the name lists in tests/name-lists.
+
+Run with: python benchmarks/bench_name_matcher.py
+"""
+import timeit
+from pathlib import Path
+from roagg.helpers.utils import NameMatcher, match_patterns
+
+NAME_LISTS = Path(__file__).resolve().parent.parent / "tests" / "name-lists"
+
+SAMPLE_NAMES = [
+    "Department of Ecology, Swedish University of Agricultural Sciences, Uppsala",
+    "University of Gothenburg",
+    "KTH Royal Institute of Technology",
+    "Max Planck Institute for Biogeochemistry",
+    "Chalmers University of Technology, Department of Space, Earth and Environment",
+    "Lund University",
+    "Stockholm University, Department of Zoology",
+    "NOAA National Centers for Environmental Information",
+    None,
+]
+
+
+def main(number: int = 200) -> None:
+    print(f"{'list':<12}{'patterns':>9}{'match_patterns':>16}{'NameMatcher':>13}{'speedup':>9}")
+    for path in sorted(NAME_LISTS.glob("*.txt")):
+        patterns = [line.strip() for line in path.read_text().splitlines() if line.strip()]
+        matcher = NameMatcher(patterns)
+        assert [matcher.match(s) for s in SAMPLE_NAMES] == [match_patterns(s, patterns) for s in SAMPLE_NAMES]
+        baseline = timeit.timeit(lambda: [match_patterns(s, patterns) for s in SAMPLE_NAMES], number=number)
+        compiled = timeit.timeit(lambda: [matcher.match(s) for s in SAMPLE_NAMES], number=number)
+        print(f"{path.stem:<12}{len(patterns):>9}{baseline:>15.4f}s{compiled:>12.4f}s{baseline / compiled:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Micro-benchmark: per-product DOI extraction vs DoiExtractor.extract_page on synthetic OpenAire products.
+
+Run with: python benchmarks/bench_openaire_dois.py [products]
+"""
+import json
+import logging
+import re
+import sys
+import timeit
+from roagg.helpers.utils import is_valid_doi
+from roagg.providers.openaire import DoiExtractor
+
+
+def legacy_doi_list(resource: dict) -> list:
+    """OpenAireAPI.get_doi_list_from_resource before DoiExtractor."""
+    doi_list = []
+    for instance in resource['instances']:
+        if 'pids' in instance and len(instance['pids']) > 0:
+            for pid in instance['pids']:
+                if pid['scheme'].lower() == 'doi':
+                    doi_list.append(pid['value'])
+        if 'alternateIdentifiers' in instance and len(instance['alternateIdentifiers']) > 0:
+            for alternateIdentifier in instance['alternateIdentifiers']:
+                if alternateIdentifier['scheme'].lower() == 'doi':
+                    doi_list.append(alternateIdentifier['value'])
+        if len(doi_list) == 0:
+            url_replacements = [
+                ("https://doi.pangaea.de/", "https://doi.org/"),
+                ("https://zenodo.org/doi/", "https://doi.org/"),
+                ("https://zenodo.org/records/", "https://doi.org/10.5281/zenodo.")
+            ]
+            for url in instance['urls']:
+                normalized_url = url
+                for old_pattern, new_pattern in url_replacements:
+                    normalized_url = normalized_url.replace(old_pattern, new_pattern)
+                for doi in re.findall(r'\b10\.\d{4,9}/[-.;()/:\w]+', normalized_url):
+                    if is_valid_doi(doi):
+                        doi_list.append(doi)
+    if len(doi_list) == 0:
+        logging.warning(f"No DOI found in resource: {json.dumps(resource['instances'], indent=2)}")
+    return list(set(doi_list))
+
+
+def synthetic_products(count: int) -> list:
+    """A mix of products with pids, alternate identifiers, landing page URLs and no DOI at all."""
+    products = []
+    for i in range(count):
+        kind = i % 5
+        instance = {"urls": [f"https://example.org/dataset/{i}", f"https://example.org/files/{i}.zip"]}
+        if kind == 0:
+            instance["pids"] = [{"scheme": "doi", "value": f"10.5878/{i}"}, {"scheme": "handle", "value": f"11.{i}"}]
+        elif kind == 1:
+            instance["alternateIdentifiers"] = [{"scheme": "DOI", "value": f"10.1594/PANGAEA.{i}"}]
+        elif kind == 2:
+            instance["urls"].append(f"https://zenodo.org/records/{i}")
+        elif kind == 3:
+            instance["urls"].append(f"https://doi.pangaea.de/10.1594/PANGAEA.{i}")
+        products.append({"id": f"openaire-{i}", "instances": [instance, {"urls": [f"https://mirror.example.org/{i}"]}]})
+    return products
+
+
+def main(count: int = 10000, number: int = 5) -> None:
+    logging.disable(logging.WARNING)
+    products = synthetic_products(count)
+    assert [sorted(d) for d in DoiExtractor().extract_page(products)] == [sorted(legacy_doi_list(p)) for p in products]
+    baseline = timeit.timeit(lambda: [legacy_doi_list(p) for p in products], number=number) / number
+    batched = timeit.timeit(lambda: DoiExtractor().extract_page(products), number=number) / number
+    print(f"{count} products: legacy {baseline:.4f}s ({count / baseline:,.0f}/s), "
+          f"DoiExtractor {batched:.4f}s ({count / batched:,.0f}/s), {baseline / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
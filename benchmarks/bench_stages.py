@@ -0,0 +1,126 @@
+"""Stage benchmarks on synthetic provider pages, with JSON results and a baseline regression check.
+
+Run with:
+  python benchmarks/bench_stages.py --output results.json
+  python benchmarks/bench_stages.py --baseline results.json --tolerance 0.2
+
+Each stage is timed repeat times on the same generated data and the fastest
+run is reported. With --baseline the run fails when a stage is more than
+tolerance slower than in the baseline file.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict
+from roagg.aggregator import write_csv
+from roagg.helpers.fixtures import ROR, datacite_page, name_list, openaire_page, openalex_page
+from roagg.helpers.utils import get_roagg_version
+from roagg.models.result_index import ResultIndex
+from roagg.providers.datacite import DataCiteAPI
+from roagg.providers.openaire import DoiExtractor
+from roagg.providers.openalex import OpenAlexAPI
+
+
+def time_stage(run: Callable[[], None], setup: Callable[[], None] = None, repeat: int = 5) -> Dict[str, float]:
+    """Fastest and median wall-clock seconds of run, with setup excluded from the timing."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {"seconds": min(times), "median": statistics.median(times)}
+
+
+def run_stages(records: int, fan_out: int, names: int, repeat: int) -> Dict[str, dict]:
+    datacite_data = datacite_page(records, fan_out)["data"]
+    openaire_results = openaire_page(records)["results"]
+    openalex_results = openalex_page(records, fan_out)["results"]
+    api = DataCiteAPI(name=name_list(names), ror=ROR, client=object())
+    items = [api.get_record(item) for item in datacite_data]
+    creators = [item["attributes"]["creators"] for item in datacite_data]
+    state = {}
+
+    def new_index():
+        state["index"] = ResultIndex(items, "DataCite")
+
+    fd, csv_path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        stages = {
+            "datacite.get_record": time_stage(lambda: [api.get_record(item) for item in datacite_data], repeat=repeat),
+            "datacite.check_agent_list_match": time_stage(lambda: [api.check_agent_list_match(agents) for agents in creators], repeat=repeat),
+            "openaire.doi_extraction": time_stage(lambda: DoiExtractor().extract_page(openaire_results), repeat=repeat),
+            "openalex.merge_records": time_stage(
+                lambda: OpenAlexAPI(ror=ROR, results=state["index"], client=object()).merge_records(openalex_results),
+                setup=new_index, repeat=repeat
+            ),
+            "write_csv": time_stage(lambda: write_csv(items, csv_path), repeat=repeat),
+        }
+    finally:
+        os.remove(csv_path)
+    for timing in stages.values():
+        timing["records_per_second"] = records / timing["seconds"] if timing["seconds"] else None
+    return stages
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print each stage against the baseline, returns False when a stage regressed."""
+    ok = True
+    print(f"{'stage':<34}{'baseline':>10}{'current':>10}{'ratio':>8}")
+    for stage, timing in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            print(f"{stage:<34}{'-':>10}{timing['seconds']:>9.4f}s{'new':>8}")
+            continue
+        ratio = timing["seconds"] / before["seconds"]
+        regressed = ratio > 1 + tolerance
+        ok = ok and not regressed
+        print(f"{stage:<34}{before['seconds']:>9.4f}s{timing['seconds']:>9.4f}s{ratio:>7.2f}x{'  REGRESSION' if regressed else ''}")
+    if baseline.get("parameters") != results["parameters"]:
+        print(f"Warning: baseline parameters {baseline.get('parameters')} differ from {results['parameters']}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="time the main roagg stages on synthetic provider pages")
+    parser.add_argument("--records", type=int, default=10000, help="records per provider page (default: 10000)")
+    parser.add_argument("--fan-out", type=int, default=3, help="creators per record (default: 3)")
+    parser.add_argument("--names", type=int, default=20, help="size of the name list (default: 20)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage, the fastest is reported (default: 5)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline (default: 0.2)")
+    args = parser.parse_args()
+
+    parameters = {"records": args.records, "fan_out": args.fan_out, "names": args.names, "repeat": args.repeat}
+    results = {
+        "roagg": get_roagg_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parameters": parameters,
+        "stages": run_stages(args.records, args.fan_out, args.names, args.repeat),
+    }
+
+    for stage, timing in results["stages"].items():
+        print(f"{stage:<34}{timing['seconds']:>9.4f}s{timing['records_per_second']:>14,.0f} records/s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
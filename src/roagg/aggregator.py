@@ -1,69 +1,256 @@
+import argparse
+import os
 import sys
-from typing import List
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from roagg.enrichment import enrich as enrich_results
+from roagg.helpers.checkpoint import Checkpoint, default_checkpoint_file
+from roagg.helpers.http import HttpStats, get_default_client
+from roagg.helpers.metrics import RunMetrics
 from roagg.helpers.ror import get_names_from_ror
+from roagg.helpers.state import default_state_file, high_water_mark, load_state, save_state
 from roagg.providers.datacite import DataCiteAPI
+from roagg.providers.datacite_dump import DataCiteDump
 from roagg.providers.openaire import OpenAireAPI
 from roagg.providers.openalex import OpenAlexAPI
+from roagg.providers.openalex_snapshot import OpenAlexSnapshot
 import logging
 from roagg.models.research_output_item import ResearchOutputItem
+from roagg.models.result_index import ResultIndex
+from roagg.store import RecordStore
+from roagg.writers import check_output, read_output, write_output
 import json
-import csv
-from dataclasses import fields
 
-def aggregate(name: List[str] = [], ror: str = "", output: str = "output.csv") -> None:
-    if ror:
-        ror_name = get_names_from_ror(ror)
-        name.extend(ror_name)
-    
-    # remove duplicates
-    name = list(set(name))
+@dataclass
+class HarvestOptions:
+    """Options of an aggregate() run, the same for every organisation of a roagg-batch run."""
+    parallel_providers: bool = False
+    incremental: bool = False
+    state_file: Optional[str] = None
+    store: Optional[str] = None
+    datacite_shard_size: int = 0
+    datacite_workers: int = 4
+    project_fields: bool = True
+    source: str = "api"
+    datacite_dump: Optional[List[str]] = None
+    dump_workers: Optional[int] = None
+    openalex_snapshot: Optional[str] = None
+    openalex_index: Optional[str] = None
+    api_urls: Dict[str, str] = field(default_factory=dict)
+    checkpoint: bool = False
+    checkpoint_file: Optional[str] = None
+    resume: bool = False
+    max_cursor_age: float = 3600
+    prefetch: int = 2
+    datacite_mapping_workers: int = 0
+    datacite_max_query_length: int = 0
+    enrich: bool = False
+    enrich_batch_size: int = 50
+    enrich_workers: int = 4
+    output_format: Optional[str] = None
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "HarvestOptions":
+        """Options from parsed command line arguments, those a command does not have keep their defaults."""
+        values = vars(args)
+        options = cls(**{f.name: values[f.name] for f in fields(cls) if f.name in values})
+        options.project_fields = not values.get("full_records", False)
+        options.api_urls = dict(values.get("api_url") or [])
+        options.max_cursor_age = values.get("cursor_max_age", options.max_cursor_age)
+        return options
+
+def aggregate(name: List[str] = [], ror: str = "", output: str = "output.csv", options: HarvestOptions = None, datacite_records: Iterable[ResearchOutputItem] = None) -> RunMetrics:
+    """Harvest, merge and write the research outputs of one organisation, returns the run metrics.
+
+    datacite_records are DataCite records already harvested for the organisation,
+    e.g. by one pass over the data files for a whole batch.
+    """
+    run_start = time.perf_counter()
+    metrics = RunMetrics(ror=ror, output=str(output))
+    client = get_default_client()
+    http_before = client.snapshot_host_stats()
+    options = options or HarvestOptions()
+    api_urls = options.api_urls or {}
+    # a missing optional package for the output should not surface only after the harvest
+    check_output(output, options.output_format)
+    with metrics.stage("resolve_names"):
+        name = resolve_names(name, ror, api_urls.get("ror"))
+
+    record_store = RecordStore(options.store) if options.store else None
+    results = ResultIndex()
+    updated_since = {}
+    if options.incremental:
+        state_file = options.state_file or default_state_file(output)
+        state = load_state(state_file)
+        if state.get(ror) and record_store and record_store.count(ror):
+            results = ResultIndex(record_store.iter_records(ror))
+            updated_since = state[ror]
+            logging.info(f"Incremental harvest of {len(results)} previous records, updated since {updated_since}")
+        elif state.get(ror) and not record_store and os.path.exists(output):
+            results = ResultIndex(read_output(output, options.output_format))
+            updated_since = state[ror]
+            logging.info(f"Incremental harvest of {len(results)} previous records, updated since {updated_since}")
+        else:
+            logging.info(f"No previous run found for {ror or 'name list'} in {state_file}, running a full harvest")
 
-    datacite = DataCiteAPI(name=name, ror=ror)
+    checkpoints = None
+    if options.checkpoint or options.resume:
+        checkpoints = Checkpoint(options.checkpoint_file or default_checkpoint_file(output), resume=options.resume, max_cursor_age=options.max_cursor_age)
+
+    datacite = DataCiteAPI(name=name, ror=ror, updated_since=updated_since.get("DataCite"), project_fields=options.project_fields, base_url=api_urls.get("datacite"), checkpoint=checkpoints, prefetch=options.prefetch, mapping_workers=options.datacite_mapping_workers)
     url = datacite.api_request_url()
     # debug print of the query string
     logging.info("DataCite url:")
     logging.info(url)
 
-    records = datacite.all()
-    research_output_items = []
-    logging.info(f"Checking {len(records)} records...")
-    for record in records:
-        research_output_items.append(datacite.get_record(record))
+    openaire = OpenAireAPI(ror=ror, results=results, base_url=api_urls.get("openaire"), checkpoint=checkpoints, prefetch=options.prefetch)
+    snapshot = OpenAlexSnapshot(options.openalex_snapshot, options.openalex_index, workers=options.dump_workers, types=snapshot_types(options)) if options.openalex_snapshot else None
+    openalex = OpenAlexAPI(ror=ror, results=results, updated_since=updated_since.get("OpenAlex"), project_fields=options.project_fields, snapshot=snapshot, base_url=api_urls.get("openalex"), checkpoint=checkpoints, prefetch=options.prefetch)
 
-    openaire = OpenAireAPI(ror=ror, results=research_output_items)
-    openaire_id = openaire.get_openaire_id_from_ror()
-    logging.info(f"OpenAire ID from ROR {ror} : {openaire_id}")
-    openaire.get_records()
+    def harvest_datacite() -> Iterable[ResearchOutputItem]:
+        if datacite_records is not None:
+            # already harvested, e.g. from one pass over a data file for a whole batch
+            return datacite_records
+        if options.source == "datacite-dump":
+            return DataCiteDump(options.datacite_dump, [(name, ror)], workers=options.dump_workers).scan()[0]
+        if options.datacite_max_query_length:
+            return list(datacite.iter_records_planned(options.datacite_max_query_length, options.datacite_workers, options.datacite_shard_size))
+        if options.datacite_shard_size:
+            return list(datacite.iter_records_sharded(options.datacite_shard_size, options.datacite_workers))
+        return list(datacite.iter_records())
 
-    openalex = OpenAlexAPI(ror=ror, results=research_output_items)
-    openalex_id = openalex.get_openalex_id_from_ror()
-    logging.info(f"OpenAlex ID from ROR {ror} : {openalex_id}")
-    openalex.get_records()
+    # the DataCite mapping pool is also used by the enrichment, and the snapshot index by both
+    try:
+        with metrics.stage("harvest"):
+            harvests, timings = run_harvests({
+                "DataCite": harvest_datacite,
+                "OpenAire": openaire.fetch_items,
+                "OpenAlex": openalex.fetch_items,
+            }, parallel=options.parallel_providers)
 
-    logging.info(f"Writing: {output}")
-    
-    write_csv(research_output_items, output)
-    logging.info(f"Writing output to csv: {output} - Done")
+        # merge in a fixed order so the output does not depend on which provider finished first
+        merges = {
+            "DataCite": lambda records: [results.upsert(item, "DataCite") for item in records],
+            "OpenAire": openaire.merge_items,
+            "OpenAlex": openalex.merge_items,
+        }
+        for provider, merge in merges.items():
+            start = time.perf_counter()
+            merge(harvests[provider])
+            metrics.provider(provider).merge_seconds = time.perf_counter() - start
+        metrics.stages["merge"] = sum(p.merge_seconds for p in metrics.providers.values())
+        if options.enrich:
+            with metrics.stage("enrich"):
+                enrich_results(results, datacite, openalex, options.enrich_batch_size, options.enrich_workers)
+    finally:
+        datacite.close()
+        if snapshot:
+            snapshot.close()
 
-def write_csv(records: List[ResearchOutputItem], output: str) -> None:
-    # Get field names from the dataclass
-    dataclass_fields = fields(ResearchOutputItem)
-    header = [field.name for field in dataclass_fields]
+    provider_hosts = {
+        "DataCite": urllib.parse.urlsplit(datacite.datacite_base_url).netloc,
+        "OpenAire": urllib.parse.urlsplit(openaire.openaire_base_url).netloc,
+        "OpenAlex": urllib.parse.urlsplit(openalex.openalex_base_url).netloc,
+    }
+    http_stats = {
+        host: stats.since(http_before.get(host, HttpStats()))
+        for host, stats in client.snapshot_host_stats().items()
+    }
+    pages = {"DataCite": datacite.pages, "OpenAire": openaire.pages, "OpenAlex": openalex.pages}
+    for provider, seconds in timings.items():
+        provider_metrics = metrics.provider(provider)
+        provider_metrics.records = len(harvests[provider])
+        provider_metrics.pages = pages[provider]
+        provider_metrics.harvest_seconds = seconds
+        host = provider_hosts[provider]
+        # HTTP stats are kept per host, they cannot be split when providers share one (e.g. roagg-mock-server)
+        if host in http_stats and list(provider_hosts.values()).count(host) == 1:
+            provider_metrics.add_http(http_stats[host])
+    for provider, api in (("DataCite", datacite), ("OpenAire", openaire), ("OpenAlex", openalex)):
+        metrics.provider(provider).mapping_seconds = api.mapping_seconds
+    for provider, provider_metrics in metrics.providers.items():
+        summary = f"{provider} harvest: {provider_metrics.records} records in {provider_metrics.harvest_seconds:.1f}s ({provider_metrics.records_per_second:.0f}/s), {provider_metrics.pages} pages"
+        if provider_metrics.requests and provider_metrics.records:
+            summary += f", {provider_metrics.bytes_received / provider_metrics.records:.0f} bytes/record received, {provider_metrics.decode_seconds:.2f}s JSON decode"
+        logging.info(summary)
+    for host, stats in http_stats.items():
+        logging.info(
+            f"HTTP {host}: {stats.requests} requests, {stats.bytes_received} bytes in {stats.seconds:.1f}s, "
+            f"{stats.retries} retries, {stats.throttled} throttled, {stats.rate_limit_wait:.1f}s rate limit wait"
+        )
+    if client.cache is not None:
+        logging.info(f"HTTP cache: {client.cache.summary()}")
+
+    if record_store:
+        with metrics.stage("store"):
+            if not updated_since:
+                record_store.clear(ror)
+            written = record_store.upsert(ror, results)
+        logging.info(f"Stored {written} records for {ror or 'name list'} in {options.store}")
+
+    logging.info(f"Writing: {output}")
     
-    def format_value(value):
-        """Format values for CSV output"""
-        if value is None:
-            return ""
-        elif isinstance(value, bool):
-            return 1 if value else 0
+    with metrics.stage("write"):
+        if record_store:
+            write_output(record_store.iter_records(ror), output, options.output_format)
+            record_store.close()
         else:
-            return value
-
-    with open(output, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(header)
-        
-        writer.writerows([
-            [format_value(getattr(record, field.name)) for field in dataclass_fields]
-            for record in records
-        ])
+            write_output(results, output, options.output_format)
+    logging.info(f"Writing output: {output} - Done")
+    if checkpoints:
+        # the run is complete, the next one starts from the first page again
+        checkpoints.close(remove=True)
+
+    if options.incremental:
+        state[ror] = {
+            "DataCite": high_water_mark((item.updatedAt for item in harvests["DataCite"]), updated_since.get("DataCite")),
+            "OpenAlex": high_water_mark((item.updatedAt for item in harvests["OpenAlex"]), updated_since.get("OpenAlex")),
+        }
+        save_state(state_file, state)
+        logging.info(f"Saved high-water marks {state[ror]} to {state_file}")
+
+    metrics.records = len(results)
+    metrics.seconds = time.perf_counter() - run_start
+    return metrics
+
+def snapshot_types(options: HarvestOptions) -> Optional[Tuple[str, ...]]:
+    """Work types to index from an OpenAlex snapshot, all of them when the enrichment looks up any DOI."""
+    return None if options.enrich else ("dataset",)
+
+def resolve_names(name: List[str], ror: str, ror_url: str = None) -> List[str]:
+    """Name variants from the command line plus the names registered in ROR, without duplicates."""
+    name = list(name)
+    if ror:
+        name.extend(get_names_from_ror(ror, base_url=ror_url))
+    return list(set(name))
+
+def run_harvests(harvests: Dict[str, Callable[[], list]], parallel: bool = False) -> Tuple[Dict[str, list], Dict[str, float]]:
+    """Run provider harvests, optionally concurrently, and return results and wall-clock seconds per provider."""
+    timings = {}
+
+    def timed(provider: str, harvest: Callable[[], list]) -> list:
+        start = time.perf_counter()
+        try:
+            return harvest()
+        finally:
+            timings[provider] = time.perf_counter() - start
+
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(harvests)) as executor:
+            futures = {provider: executor.submit(timed, provider, harvest) for provider, harvest in harvests.items()}
+            results = {provider: future.result() for provider, future in futures.items()}
+    else:
+        results = {provider: timed(provider, harvest) for provider, harvest in harvests.items()}
+
+    return results, {provider: timings[provider] for provider in harvests}
+
+def write_csv(records: Iterable[ResearchOutputItem], output: str) -> None:
+    write_output(records, output, "csv")
+
+
+def read_csv(path: str) -> List[ResearchOutputItem]:
+    """Read a CSV written by write_csv back into ResearchOutputItems."""
+    return list(read_output(path, "csv"))
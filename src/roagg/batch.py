@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+from roagg.aggregator import HarvestOptions, aggregate, resolve_names, snapshot_types
+from roagg.cli import add_harvest_arguments, http_client, read_names_from_file, validate_ror_id
+from roagg.helpers.http import set_default_client
+from roagg.helpers.metrics import RunMetrics, write_json_report, write_prometheus_textfile
+from roagg.helpers.utils import get_roagg_version
+from roagg.providers.datacite_dump import DataCiteDump
+from roagg.providers.openalex_snapshot import OpenAlexSnapshot
+
+
+@dataclass
+class BatchEntry:
+    ror: str
+    output: str
+    name_txt: Optional[Path] = None
+
+
+@dataclass
+class BatchResult:
+    entry: BatchEntry
+    seconds: float
+    error: Optional[str] = None
+    metrics: Optional[RunMetrics] = None
+
+
+def read_manifest(path: Path) -> List[BatchEntry]:
+    """Read a CSV manifest with the columns ror, name_txt (optional) and output."""
+    with open(path, newline='', encoding='utf-8') as file:
+        entries = []
+        for row in csv.DictReader(file):
+            name_txt = (row.get("name_txt") or "").strip()
+            entries.append(BatchEntry(
+                ror=validate_ror_id(row["ror"].strip()),
+                output=row["output"].strip(),
+                name_txt=Path(name_txt) if name_txt else None,
+            ))
+        return entries
+
+
+def run_batch(entries: List[BatchEntry], workers: int = 4, options: HarvestOptions = None) -> List[BatchResult]:
+    """Aggregate every entry on a bounded thread pool, all sharing the default HTTP client.
+
+    With options.datacite_dump, the data files are scanned once for all
+    organisations before the OpenAire and OpenAlex harvests start.
+    """
+    options = options or HarvestOptions()
+    names = {id(entry): read_names_from_file(entry.name_txt) if entry.name_txt else [] for entry in entries}
+    datacite_records = {}
+    if options.datacite_dump:
+        organisations = [(resolve_names(names[id(entry)], entry.ror, options.api_urls.get("ror")), entry.ror) for entry in entries]
+        scanned = DataCiteDump(options.datacite_dump, organisations, workers=options.dump_workers).scan()
+        datacite_records = {id(entry): records for entry, records in zip(entries, scanned)}
+
+    def run(entry: BatchEntry) -> BatchResult:
+        start = time.perf_counter()
+        try:
+            # released once the organisation has been aggregated
+            metrics = aggregate(names[id(entry)], entry.ror, entry.output, options, datacite_records.pop(id(entry), None))
+        except Exception as e:
+            logging.error(f"Aggregation failed for {entry.ror}: {e}")
+            return BatchResult(entry, time.perf_counter() - start, str(e))
+        return BatchResult(entry, time.perf_counter() - start, metrics=metrics)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, entries))
+
+
+def main() -> None:
+    """aggregate research outputs for several organisations listed in a manifest."""
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(threadName)s: %(message)s')
+
+    parser = argparse.ArgumentParser(
+        description="aggregate research outputs for every organisation in a CSV manifest (columns: ror, name_txt, output)",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=get_roagg_version()
+    )
+
+    parser.add_argument(
+        "manifest",
+        type=Path,
+        help="CSV file with one organisation per row"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="number of organisations harvested at the same time (default: 4)"
+    )
+
+    parser.add_argument(
+        "--max-per-provider",
+        type=int,
+        default=4,
+        help="maximum concurrent requests to each provider API across all organisations (default: 4)"
+    )
+
+    parser.add_argument(
+        "--datacite-dump",
+        type=Path,
+        action='append',
+        help="scan local DataCite public data files once for all organisations instead of querying the DataCite API"
+    )
+
+    add_harvest_arguments(parser)
+
+    parser.add_argument(
+        "--metrics-out",
+        help="write the run metrics of every organisation as a JSON list to this file"
+    )
+
+    parser.add_argument(
+        "--metrics-prometheus",
+        help="also write the run metrics as a Prometheus textfile, labelled by ROR"
+    )
+
+    args = parser.parse_args()
+
+    set_default_client(http_client(args, max_per_host=args.max_per_provider))
+
+    entries = read_manifest(args.manifest)
+    start = time.perf_counter()
+    options = HarvestOptions.from_args(args)
+    if args.openalex_snapshot:
+        # index once up front so the workers only query it
+        snapshot = OpenAlexSnapshot(args.openalex_snapshot, args.openalex_index, workers=args.dump_workers, types=snapshot_types(options))
+        snapshot.build_index()
+        snapshot.close()
+    results = run_batch(entries, workers=args.workers, options=options)
+
+    for result in results:
+        status = f"failed: {result.error}" if result.error else "ok"
+        logging.info(f"{result.entry.ror} -> {result.entry.output}: {status} in {result.seconds:.1f}s")
+    logging.info(f"Batch of {len(results)} organisations done in {time.perf_counter() - start:.1f}s")
+
+    runs = [result.metrics for result in results if result.metrics]
+    if args.metrics_out and runs:
+        write_json_report(args.metrics_out, runs)
+    if args.metrics_prometheus and runs:
+        write_prometheus_textfile(args.metrics_prometheus, runs)
+
+    if any(result.error for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
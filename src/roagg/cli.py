@@ -5,7 +5,12 @@ import logging
 import sys
 from pathlib import Path
 from roagg.helpers.utils import get_roagg_version
-from roagg.aggregator import aggregate
+from roagg.aggregator import HarvestOptions, aggregate
+from roagg.helpers.cache import ResponseCache
+from roagg.helpers.http import HttpClient, set_default_client
+from roagg.helpers.metrics import write_json_report, write_prometheus_textfile
+from roagg.helpers.ratelimit import RetryPolicy
+from roagg.writers import WRITERS
 
 def validate_ror_id(ror_id: str) -> str:
     """validate ROR ID format (should start with https://ror.org/)."""
@@ -21,6 +26,192 @@ def read_names_from_file(filepath: Path) -> List[str]:
         logging.error(f"Failed to read names file: {e}")
         sys.exit(1)
 
+def parse_rate_limit(value: str) -> tuple:
+    """parse HOST=REQUESTS_PER_SECOND"""
+    host, _, rate = value.partition("=")
+    try:
+        return host.strip(), float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError("rate limit must be given as HOST=REQUESTS_PER_SECOND")
+
+API_NAMES = ("ror", "datacite", "openaire", "openalex")
+
+def parse_api_url(value: str) -> tuple:
+    """parse NAME=BASE_URL"""
+    name, _, url = value.partition("=")
+    name = name.strip().lower()
+    if name not in API_NAMES or not url:
+        raise argparse.ArgumentTypeError(f"API URL must be given as NAME=BASE_URL with NAME one of {', '.join(API_NAMES)}")
+    return name, url if url.endswith("/") else url + "/"
+
+def add_harvest_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the harvest, output and HTTP client options shared by roagg and roagg-batch."""
+    parser.add_argument(
+        "--output-format",
+        choices=sorted(WRITERS),
+        help="format of the output file when it is not clear from its name (default: from the file suffix, otherwise csv)"
+    )
+
+    parser.add_argument(
+        "--parallel-providers",
+        action="store_true",
+        help="harvest DataCite, OpenAire and OpenAlex concurrently"
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only harvest records updated since the previous run and merge them into the existing output"
+    )
+
+    parser.add_argument(
+        "--store",
+        help="SQLite database to upsert records into, the output is exported from it (shared by all organisations of a roagg-batch run)"
+    )
+
+    parser.add_argument(
+        "--datacite-shard-size",
+        type=int,
+        default=0,
+        help="split the DataCite query by year, client and resource type facets into shards of at most this many records and harvest them in parallel (default: 0, no sharding)"
+    )
+
+    parser.add_argument(
+        "--datacite-workers",
+        type=int,
+        default=4,
+        help="number of DataCite shards or sub-queries harvested at the same time (default: 4)"
+    )
+
+    parser.add_argument(
+        "--datacite-max-query-length",
+        type=int,
+        default=0,
+        help="split a DataCite query longer than this many URL-encoded characters into sub-queries (the ROR fields and batches of names) harvested in parallel and unioned by DOI (default: 0, one query)"
+    )
+
+    parser.add_argument(
+        "--datacite-mapping-workers",
+        type=int,
+        default=0,
+        help="processes mapping DataCite result pages to output rows, for organisations with large records (default: 0, map in the harvest thread)"
+    )
+
+    parser.add_argument(
+        "--dump-workers",
+        type=int,
+        help="processes used to decompress and filter data files (default: number of CPUs)"
+    )
+
+    parser.add_argument(
+        "--full-records",
+        action="store_true",
+        help="request complete DataCite and OpenAlex records instead of only the fields roagg uses"
+    )
+
+    parser.add_argument(
+        "--openalex-snapshot",
+        type=Path,
+        help="directory with an OpenAlex works snapshot (gzipped JSONL partitions) to use instead of the OpenAlex API, indexed once for datasets, or for every work type with --enrich (a much larger index that takes longer to build)"
+    )
+
+    parser.add_argument(
+        "--openalex-index",
+        help="SQLite index built from --openalex-snapshot and reused by later runs (default: inside the snapshot directory)"
+    )
+
+    parser.add_argument(
+        "--api-url",
+        type=parse_api_url,
+        action='append',
+        help="base URL of an API, e.g. datacite=http://localhost:8000/datacite/ to run against roagg-mock-server (names: ror, datacite, openaire, openalex)"
+    )
+
+    parser.add_argument(
+        "--enrich",
+        action="store_true",
+        help="look up records found in only some providers in DataCite and OpenAlex by DOI, in batches, to fill in their fields"
+    )
+
+    parser.add_argument(
+        "--enrich-batch-size",
+        type=int,
+        default=50,
+        help="DOIs per enrichment batch, larger batches are sent in requests of at most 100 DOIs to OpenAlex and 1000 to DataCite (default: 50)"
+    )
+
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=2,
+        help="pages fetched ahead while the previous page is mapped, per query (default: 2, 0 fetches one page at a time)"
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="save every harvested page and the cursor of the next page to an append-only checkpoint file next to the output, removed when the run completes"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the harvests of a failed run from its checkpoint file instead of the first page (implies --checkpoint)"
+    )
+
+    parser.add_argument(
+        "--cursor-max-age",
+        type=float,
+        default=3600,
+        help="seconds a saved cursor is trusted, older cursors restart their query from the first page (default: 3600)"
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="directory for a persistent HTTP response cache, shared by all organisations of a roagg-batch run (disabled by default)"
+    )
+
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=86400,
+        help="seconds a cached response is used without revalidation (default: 86400)"
+    )
+
+    parser.add_argument(
+        "--cache-max-size",
+        type=int,
+        default=1024,
+        help="maximum size of the response cache in MB, least recently used entries are evicted (default: 1024)"
+    )
+
+    parser.add_argument(
+        "--rate-limit",
+        type=parse_rate_limit,
+        action='append',
+        help="requests per second for an API host across all organisations, e.g. api.datacite.org=10 (can be used multiple times)"
+    )
+
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=5,
+        help="retries for throttled (429), failing (5xx) or timed out requests (default: 5)"
+    )
+
+def http_client(args: argparse.Namespace, max_per_host: Optional[int] = None) -> HttpClient:
+    """HTTP client with the cache, rate limits and retries from add_harvest_arguments."""
+    cache = None
+    if args.cache_dir:
+        cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl, max_bytes=args.cache_max_size * 1024 * 1024)
+    return HttpClient(
+        cache=cache,
+        max_per_host=max_per_host,
+        rate_limits=dict(args.rate_limit or []),
+        retry=RetryPolicy(max_retries=args.max_retries)
+    )
+
 def main() -> None:
     """create a summary CSV file for all research output for an organization."""
     logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -57,14 +248,43 @@ def main() -> None:
     parser.add_argument(
         "--source",
         default="api",
-        choices=["api"],
-        help="source for resource aggregation (only api is supported right now)"
+        choices=["api", "datacite-dump"],
+        help="source for the DataCite records: the REST API or local DataCite public data files (default: api)"
+    )
+
+    parser.add_argument(
+        "--datacite-dump",
+        type=Path,
+        action='append',
+        help="DataCite public data file or directory of gzipped JSONL files for --source datacite-dump (can be used multiple times)"
     )
 
     parser.add_argument(
         "--output",
         default="data/output.csv",
-        help="name of the output file (default: data/output.csv)"
+        help="name of the output file, written as CSV, JSONL (.jsonl) or Parquet (.parquet), compressed when it ends in .gz or .zst (default: data/output.csv)"
+    )
+
+    parser.add_argument(
+        "--state-file",
+        help="file with high-water marks per ROR for --incremental (default: next to the output file)"
+    )
+
+    parser.add_argument(
+        "--checkpoint-file",
+        help="checkpoint file (default: next to the output, e.g. data/kth.checkpoint.jsonl)"
+    )
+
+    add_harvest_arguments(parser)
+
+    parser.add_argument(
+        "--metrics-out",
+        help="write timings, requests, bytes, retries and records/s per provider and stage as JSON to this file"
+    )
+
+    parser.add_argument(
+        "--metrics-prometheus",
+        help="also write the run metrics as a Prometheus textfile (for the node exporter textfile collector)"
     )
 
     args = parser.parse_args()
@@ -74,6 +294,9 @@ def main() -> None:
         parser.print_help()
         sys.exit(1)
 
+    if args.source == "datacite-dump" and not args.datacite_dump:
+        parser.error("--source datacite-dump requires --datacite-dump")
+
     names: List[str] = []
     if args.name:
         names = args.name
@@ -81,11 +304,20 @@ def main() -> None:
     if args.name_txt:
         names.extend(read_names_from_file(args.name_txt))
 
+    set_default_client(http_client(args))
+
     try:
-        aggregate(names, args.ror, args.output)
+        metrics = aggregate(names, args.ror, args.output, HarvestOptions.from_args(args))
     except Exception as e:
         logging.error(f"Aggregation failed: {e}")
         sys.exit(1)
 
+    if args.metrics_out:
+        write_json_report(args.metrics_out, metrics)
+        logging.info(f"Wrote run metrics to {args.metrics_out}")
+    if args.metrics_prometheus:
+        write_prometheus_textfile(args.metrics_prometheus, [metrics])
+        logging.info(f"Wrote Prometheus metrics to {args.metrics_prometheus}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
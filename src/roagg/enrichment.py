@@ -0,0 +1,61 @@
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+from roagg.helpers.http import HttpError
+from roagg.helpers.utils import is_valid_doi, normalize_doi
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.models.result_index import ResultIndex
+from roagg.providers.datacite import DataCiteAPI
+from roagg.providers.openalex import OpenAlexAPI
+
+# provider, lookup of one batch of DOIs, batch
+Batch = Tuple[str, Callable[[List[str]], List[ResearchOutputItem]], List[str]]
+
+# where the organisation's records were found, not changed by the enrichment
+PROVENANCE_FIELDS = ("inDataCite", "inOpenAire", "inOpenAlex", "inCrossRef")
+
+
+def missing_dois(results: ResultIndex, flag: str) -> List[str]:
+    """DOIs of the records a provider did not return, e.g. flag inDataCite for records only found in OpenAire or OpenAlex."""
+    return [normalize_doi(item.doi) for item in results if item.doi and not getattr(item, flag) and is_valid_doi(normalize_doi(item.doi))]
+
+
+def batches(dois: List[str], size: int) -> List[List[str]]:
+    return [dois[i:i + size] for i in range(0, len(dois), size)]
+
+
+def enrich(results: ResultIndex, datacite: DataCiteAPI, openalex: OpenAlexAPI, batch_size: int = 50, workers: int = 4) -> Dict[str, int]:
+    """Look up the records one provider is missing in the other providers, a batch of DOIs per request.
+
+    DataCite fields are filled in for records only found in OpenAire or
+    OpenAlex, and OpenAlex fields (from the snapshot index when there is
+    one) for records OpenAlex did not return for the institution. Only
+    fields that are missing are set, in batch order, and the in* provenance
+    flags keep saying which providers found the record for the
+    organisation. A batch that fails is logged and skipped. Returns the
+    number of records enriched per provider.
+    """
+    jobs: List[Batch] = [("DataCite", datacite.get_records_by_doi, batch) for batch in batches(missing_dois(results, "inDataCite"), batch_size)]
+    jobs += [("OpenAlex", openalex.get_items_by_doi, batch) for batch in batches(missing_dois(results, "inOpenAlex"), batch_size)]
+    if not jobs:
+        return {}
+
+    def run(job: Batch) -> List[ResearchOutputItem]:
+        provider, lookup, batch = job
+        try:
+            return lookup(batch)
+        except (RuntimeError, HttpError, OSError, ValueError) as e:
+            logging.warning(f"{provider} enrichment of {len(batch)} DOIs failed: {e}")
+            return []
+
+    enriched = Counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (provider, _, _), items in zip(jobs, executor.map(run, jobs)):
+            for item in items:
+                if results.fill(item, provider, skip=PROVENANCE_FIELDS):
+                    enriched[provider] += 1
+    requested = Counter(provider for provider, _, _ in jobs)
+    for provider, count in requested.items():
+        logging.info(f"{provider} enrichment: {enriched[provider]} records enriched in {count} batches")
+    return dict(enriched)
@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def normalize_url(url: str) -> str:
+    """Normalise a URL for use as cache key: lowercase scheme/host, sorted query, no fragment."""
+    parsed = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path or "/", query, ""))
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    stored_at: float
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+
+class ResponseCache:
+    """Persistent response cache with TTL and size-bounded LRU eviction.
+
+    Each entry is one gzip file holding a JSON metadata line followed by the
+    response body. File modification time is used as the LRU clock.
+    """
+
+    suffix = ".gz"
+
+    def __init__(self, directory: str, ttl: float = 86400, max_bytes: int = 1024 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self.directory.glob(f"*{self.suffix}"))
+
+    def path_for(self, url: str) -> Path:
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        path = self.path_for(url)
+        try:
+            with gzip.open(path, "rb") as file:
+                meta = json.loads(file.readline())
+                body = file.read()
+            os.utime(path)
+        except (OSError, EOFError, ValueError):
+            return None
+        return CacheEntry(url=meta["url"], stored_at=meta["stored_at"], headers=meta.get("headers", {}), body=body)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.ttl
+
+    def put(self, url: str, headers: Dict[str, str], body: bytes) -> None:
+        path = self.path_for(url)
+        keep = {k: v for k, v in headers.items() if k in ("etag", "last-modified", "content-type")}
+        meta = json.dumps({"url": normalize_url(url), "stored_at": time.time(), "headers": keep})
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as file:
+                file.write(meta.encode("utf-8") + b"\n")
+                file.write(body)
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with self._lock:
+            self._size += path.stat().st_size - old_size
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def touch(self, entry: CacheEntry) -> None:
+        """Mark a revalidated entry as fresh again."""
+        self.put(entry.url, entry.headers, entry.body)
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache is below its size bound."""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob(f"*{self.suffix}"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+            size = sum(e[1] for e in entries)
+            for _, entry_size, path in entries:
+                if size <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    size -= entry_size
+                except OSError:
+                    pass
+            self._size = size
+
+    def count(self, hit: bool = False, revalidated: bool = False) -> None:
+        with self._lock:
+            if revalidated:
+                self.revalidated += 1
+            elif hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.revalidated} revalidated, {self.misses} misses"
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# status codes the APIs answer an unknown or expired cursor with
+EXPIRED_CURSOR_STATUS = {400, 404, 410, 422}
+
+
+def default_checkpoint_file(output: str) -> str:
+    """Checkpoint kept next to the output, e.g. data/output.csv -> data/output.checkpoint.jsonl"""
+    return str(Path(output).with_suffix(".checkpoint.jsonl"))
+
+
+def cursor_expired(error: Exception) -> bool:
+    """Whether a request with a saved cursor failed because the API no longer knows the cursor."""
+    status = getattr(error, "status", None) or getattr(error.__cause__, "status", None)
+    return status in EXPIRED_CURSOR_STATUS
+
+
+@dataclass
+class ResumedHarvest:
+    pages: List[list] = field(default_factory=list)
+    cursor: Optional[str] = None
+    saved_at: float = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.cursor is None
+
+    @property
+    def records(self) -> int:
+        return sum(len(page) for page in self.pages)
+
+
+class Checkpoint:
+    """Append-only spill file with the pages of each cursor-paginated query.
+
+    Every completed page is appended as one JSON line with the query key, the
+    raw records and the cursor of the next page (null after the last page).
+    A reset line drops what was saved for a key. Resuming replays the saved
+    pages and continues from the last cursor, unless it is older than
+    max_cursor_age seconds.
+    """
+
+    def __init__(self, path: str, resume: bool = False, max_cursor_age: float = 3600):
+        self.path = path
+        self.max_cursor_age = max_cursor_age
+        self._lock = threading.Lock()
+        self._saved: Dict[str, ResumedHarvest] = {}
+        if resume and os.path.exists(path):
+            self._load()
+        else:
+            open(path, "w").close()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as file:
+            data = file.read()
+        # a run killed while writing leaves a partial last line, drop it so appends start on a new line
+        complete = data[:data.rfind(b"\n") + 1]
+        if len(complete) != len(data):
+            with open(self.path, "r+b") as file:
+                file.truncate(len(complete))
+        for line in complete.decode("utf-8").splitlines():
+            entry = json.loads(line)
+            if entry.get("reset"):
+                self._saved.pop(entry["key"], None)
+                continue
+            saved = self._saved.setdefault(entry["key"], ResumedHarvest())
+            saved.pages.append(entry["records"])
+            saved.cursor = entry["cursor"]
+            saved.saved_at = entry["saved_at"]
+        logging.info(f"Checkpoint {self.path}: {len(self._saved)} saved queries, {sum(s.records for s in self._saved.values())} records")
+
+    def resume(self, key: str) -> Optional[ResumedHarvest]:
+        """Saved pages of a query, None when there are none or the cursor has expired."""
+        saved = self._saved.get(key)
+        if saved is None:
+            return None
+        age = time.time() - saved.saved_at
+        if not saved.done and age > self.max_cursor_age:
+            logging.warning(f"Checkpoint cursor for {key} is {age:.0f}s old, restarting the query from the first page")
+            self.reset(key)
+            return None
+        return saved
+
+    def save(self, key: str, records: list, cursor: Optional[str]) -> None:
+        line = json.dumps({"key": key, "cursor": cursor, "saved_at": time.time(), "records": records})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._saved.pop(key, None)
+            self._file.write(json.dumps({"key": key, "reset": True}) + "\n")
+            self._file.flush()
+
+    def close(self, remove: bool = False) -> None:
+        """Close the spill file, and remove it after a run that completed."""
+        self._file.close()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
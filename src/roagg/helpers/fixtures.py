@@ -0,0 +1,168 @@
+"""Synthetic ROR, DataCite, OpenAire and OpenAlex payloads for benchmarks and the mock API server.
+
+Records are generated from a seeded random generator so every run of a
+benchmark sees the same data. fan_out is the number of creators per record,
+each with one or two affiliations; about one record in four is affiliated
+with ROR (by identifier or by one of the names).
+"""
+import random
+from typing import List
+
+ROR = "https://ror.org/01tm6cn81"
+
+ORGANISATION_WORDS = [
+    "Ecology", "Physics", "Medicine", "Economics", "History", "Chemistry", "Marine Sciences",
+    "Computer Science", "Linguistics", "Geology", "Sociology", "Mathematics", "Astronomy",
+]
+OTHER_AFFILIATIONS = [
+    "Max Planck Institute for Biogeochemistry", "NOAA National Centers for Environmental Information",
+    "University of Oslo", "ETH Zurich", "CNRS", "University of Cape Town", "Kyoto University",
+]
+RESOURCE_TYPES = ["Dataset", "Dataset", "Dataset", "Software", "Text", "Image", "Collection"]
+PUBLISHERS = ["Zenodo", "PANGAEA", "Swedish National Data Service", "Dryad", "figshare"]
+
+
+def ror_organization(ror: str = ROR) -> dict:
+    """ROR v2 organization record with the names get_names_from_ror reads."""
+    return {
+        "id": ror,
+        "names": [
+            {"value": "University of Gothenburg", "types": ["ror_display", "label"], "lang": "en"},
+            {"value": "Göteborgs universitet", "types": ["label"], "lang": "sv"},
+            {"value": "GU", "types": ["acronym"], "lang": None},
+        ],
+    }
+
+
+def name_list(size: int = 20) -> List[str]:
+    """Name patterns like the ones in tests/name-lists: plain names and a few wildcards."""
+    names = ["University of Gothenburg", "Goteborgs universit*", "Department of * University of Gothenburg"]
+    i = 0
+    while len(names) < size:
+        word = ORGANISATION_WORDS[i % len(ORGANISATION_WORDS)]
+        names.append(f"Department of {word} {i // len(ORGANISATION_WORDS)}, University of Gothenburg" if i % 4 else f"Institute of {word}*")
+        i += 1
+    return names[:size]
+
+
+def _affiliation(rng: random.Random, affiliated: bool) -> dict:
+    if not affiliated:
+        return {"name": rng.choice(OTHER_AFFILIATIONS)}
+    if rng.random() < 0.5:
+        return {"name": "University of Gothenburg", "affiliationIdentifier": ROR, "affiliationIdentifierScheme": "ROR"}
+    return {"name": f"Department of {rng.choice(ORGANISATION_WORDS)}, University of Gothenburg"}
+
+
+def _agents(rng: random.Random, fan_out: int, affiliated: bool) -> List[dict]:
+    agents = []
+    for n in range(fan_out):
+        # only the last agent carries the matching affiliation, the worst case for the matcher
+        match = affiliated and n == fan_out - 1
+        affiliations = [_affiliation(rng, False) for _ in range(rng.randint(0, 1))] + [_affiliation(rng, match)]
+        agents.append({
+            "name": f"Author{rng.randint(1, 10 ** 6)}, Given",
+            "nameType": "Personal",
+            "nameIdentifiers": [{"nameIdentifier": f"https://orcid.org/0000-0002-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}", "nameIdentifierScheme": "ORCID"}],
+            "affiliation": affiliations,
+        })
+    return agents
+
+
+def datacite_record(rng: random.Random, n: int, fan_out: int, doi: str = None) -> dict:
+    doi = doi or f"10.5878/bench.{n}"
+    title = f"Survey data on {rng.choice(ORGANISATION_WORDS).lower()} {n}"
+    return {
+        "id": doi,
+        "type": "dois",
+        "attributes": {
+            "doi": doi,
+            "titles": [{"title": title}],
+            "types": {"resourceTypeGeneral": rng.choice(RESOURCE_TYPES)},
+            "publisher": {"name": rng.choice(PUBLISHERS)},
+            "publicationYear": rng.randint(2000, 2025),
+            "creators": _agents(rng, fan_out, rng.random() < 0.25),
+            "contributors": _agents(rng, max(1, fan_out // 2), False),
+            "relatedIdentifiers": [
+                {"relationType": rng.choice(["IsReferencedBy", "IsPartOf", "HasVersion"]), "relatedIdentifier": f"10.1000/rel.{n}", "relatedIdentifierType": "DOI"},
+            ],
+            "versionCount": rng.randint(0, 2),
+            "versionOfCount": rng.randint(0, 1),
+            "citationCount": rng.randint(0, 20),
+            "referenceCount": rng.randint(0, 20),
+            "viewCount": rng.randint(0, 500),
+            "downloadCount": rng.randint(0, 100),
+            "created": f"2024-01-{n % 28 + 1:02d}T10:00:00Z",
+            "registered": f"2024-01-{n % 28 + 1:02d}T10:00:00Z",
+            "updated": f"2024-02-{n % 28 + 1:02d}T10:00:00Z",
+        },
+        "relationships": {"client": {"data": {"id": f"snd.client{n % 40}", "type": "clients"}}},
+    }
+
+
+def datacite_page(count: int = 1000, fan_out: int = 3, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        "data": [datacite_record(rng, n, fan_out) for n in range(count)],
+        "meta": {"total": count, "totalPages": 1, "page": 1},
+        "links": {},
+    }
+
+
+def openaire_product(rng: random.Random, n: int) -> dict:
+    kind = n % 5
+    instance = {"urls": [f"https://example.org/dataset/{n}"]}
+    if kind in (0, 1):
+        # half of the products are also in DataCite
+        instance["pids"] = [{"scheme": "doi", "value": f"10.5878/bench.{n}"}]
+    elif kind == 2:
+        instance["alternateIdentifiers"] = [{"scheme": "doi", "value": f"10.1594/PANGAEA.{n}"}]
+    elif kind == 3:
+        instance["urls"].append(f"https://zenodo.org/records/{n}")
+    return {
+        "id": f"openaire____::{n}",
+        "type": "dataset",
+        "mainTitle": f"Dataset {n}",
+        "publisher": rng.choice(PUBLISHERS),
+        "publicationDate": f"{rng.randint(2000, 2025)}-01-01",
+        "bestAccessRight": {"label": rng.choice(["OPEN", "RESTRICTED", "CLOSED"])},
+        "indicators": {"usageCounts": {"downloads": rng.randint(0, 100), "views": rng.randint(0, 500)}},
+        "instances": [instance],
+    }
+
+
+def openaire_page(count: int = 1000, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        "header": {"numFound": count, "pageSize": count, "nextCursor": None},
+        "results": [openaire_product(rng, n) for n in range(count)],
+    }
+
+
+def openalex_work(rng: random.Random, n: int, fan_out: int, doi: str = None) -> dict:
+    authorships = []
+    for a in range(fan_out):
+        ror = ROR if a == 0 and n % 2 == 0 else f"https://ror.org/0other{a}"
+        authorships.append({"author": {"display_name": f"Author {a}"}, "institutions": [{"ror": ror, "display_name": "Institution"}]})
+    # every other work is also in DataCite
+    doi = doi or (f"10.5878/bench.{n}" if n % 2 == 0 else f"10.5281/zenodo.{n}")
+    return {
+        "id": f"https://openalex.org/W{n}",
+        "doi": f"https://doi.org/{doi}",
+        "title": f"Dataset {n}",
+        "type": "dataset",
+        "publication_year": rng.randint(2000, 2025),
+        "publication_date": f"{rng.randint(2000, 2025)}-01-01",
+        "created_date": "2024-01-01",
+        "updated_date": f"2024-02-{n % 28 + 1:02d}T00:00:00",
+        "cited_by_count": rng.randint(0, 20),
+        "referenced_works_count": rng.randint(0, 20),
+        "authorships": authorships,
+    }
+
+
+def openalex_page(count: int = 1000, fan_out: int = 3, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        "meta": {"count": count, "per_page": count, "next_cursor": None},
+        "results": [openalex_work(rng, n, fan_out) for n in range(count)],
+    }
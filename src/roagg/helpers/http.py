@@ -0,0 +1,306 @@
+import gzip
+import http.client
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, fields, replace
+from typing import Dict, List, Optional, Tuple
+from roagg.helpers.cache import CacheEntry, ResponseCache
+from roagg.helpers.ratelimit import DEFAULT_RATE_LIMITS, THROTTLE_STATUS, AdaptiveLimiter, RetryPolicy, TokenBucket
+from roagg.helpers.utils import get_roagg_version
+
+
+def default_user_agent() -> str:
+    version = get_roagg_version()
+    return f'ResearchOutputAggregator/{version} (https://github.com/snd-sweden/research-output-aggregator; mailto:team-it@snd.se)'
+
+
+class HttpError(Exception):
+    """Raised for responses outside the 2xx range."""
+
+    def __init__(self, url: str, status: int, reason: str = "", headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"HTTP {status} {reason} for {url}")
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers or {}
+
+
+@dataclass
+class HttpStats:
+    requests: int = 0
+    bytes_received: int = 0
+    seconds: float = 0.0
+    retries: int = 0
+    throttled: int = 0
+    rate_limit_wait: float = 0.0
+    decode_seconds: float = 0.0
+
+    def add(self, size: int, seconds: float) -> None:
+        self.requests += 1
+        self.bytes_received += size
+        self.seconds += seconds
+
+    def since(self, before: "HttpStats") -> "HttpStats":
+        """Difference to an earlier copy of the same stats."""
+        return HttpStats(**{f.name: getattr(self, f.name) - getattr(before, f.name) for f in fields(self)})
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    bytes_received: int = 0
+    seconds: float = 0.0
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class HttpClient:
+    """Standard library HTTP client with keep-alive connections per host and gzip.
+
+    Idle connections are pooled per (scheme, host) so sequential page requests
+    reuse the same TLS session. The client is safe to share between threads,
+    each request checks out its own connection from the pool. Requests to a
+    host go through a token bucket and an adaptive concurrency limit, and
+    throttling, server errors and network failures are retried with jittered
+    exponential backoff honouring Retry-After. With a
+    ResponseCache, fresh entries are served without any network call and
+    stale entries are revalidated with ETag/Last-Modified when available.
+    """
+
+    redirect_codes = {301, 302, 303, 307, 308}
+
+    default_max_per_host = 8
+
+    def __init__(self, user_agent: str = None, timeout: float = 60.0, max_redirects: int = 5, cache: ResponseCache = None,
+                 max_per_host: int = None, rate_limits: Dict[str, float] = None, retry: RetryPolicy = None):
+        self.user_agent = user_agent or default_user_agent()
+        self.cache = cache
+        self.max_per_host = max_per_host or self.default_max_per_host
+        self.rate_limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+        self.retry = retry or RetryPolicy()
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.stats = HttpStats()
+        self.host_stats: Dict[str, HttpStats] = {}
+        self._idle: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._memo: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _host_limits(self, netloc: str) -> Tuple[Optional[TokenBucket], AdaptiveLimiter]:
+        """Rate limit and concurrency limit for one host, shared by all threads using this client."""
+        with self._lock:
+            if netloc not in self._limiters:
+                rate = self.rate_limits.get(netloc.split(":")[0])
+                self._buckets[netloc] = TokenBucket(rate) if rate else None
+                self._limiters[netloc] = AdaptiveLimiter(self.max_per_host)
+            return self._buckets[netloc], self._limiters[netloc]
+
+    def snapshot_host_stats(self) -> Dict[str, HttpStats]:
+        """Copy of the per-host stats, to measure one run with HttpStats.since."""
+        with self._lock:
+            return {netloc: replace(stats) for netloc, stats in self.host_stats.items()}
+
+    def _host_stats(self, netloc: str) -> HttpStats:
+        # callers hold self._lock
+        return self.host_stats.setdefault(netloc, HttpStats())
+
+    def _checkout(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _checkin(self, scheme: str, netloc: str, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.setdefault((scheme, netloc), []).append(connection)
+
+    def _record(self, netloc: str, size: int, seconds: float) -> None:
+        with self._lock:
+            self.stats.add(size, seconds)
+            self._host_stats(netloc).add(size, seconds)
+
+    def _send(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+        request_headers = {
+            "User-Agent": self.user_agent,
+            "Accept-Encoding": "gzip",
+            "Accept": "application/json",
+            **headers,
+        }
+
+        bucket, limiter = self._host_limits(parsed.netloc)
+        with limiter:
+            waited = bucket.acquire() if bucket else 0.0
+            response = self._request(parsed, path, request_headers, url)
+        if response.status in THROTTLE_STATUS:
+            limiter.throttled()
+        else:
+            limiter.succeeded()
+        with self._lock:
+            stats = self._host_stats(parsed.netloc)
+            stats.rate_limit_wait += waited
+            if response.status in THROTTLE_STATUS:
+                stats.throttled += 1
+        return response
+
+    def _request(self, parsed: urllib.parse.SplitResult, path: str, request_headers: Dict[str, str], url: str) -> HttpResponse:
+        # a pooled connection may have been closed by the server, retry once on a fresh one
+        for attempt in range(2):
+            connection = self._checkout(parsed.scheme, parsed.netloc)
+            start = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+                raw = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest):
+                connection.close()
+                if attempt == 0:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            seconds = time.perf_counter() - start
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._checkin(parsed.scheme, parsed.netloc, connection)
+
+        self._record(parsed.netloc, len(raw), seconds)
+        response_headers = {k.lower(): v for k, v in response.getheaders()}
+        body = raw
+        if response_headers.get("content-encoding", "").lower() == "gzip":
+            body = gzip.decompress(raw)
+        return HttpResponse(
+            url=url,
+            status=response.status,
+            headers=response_headers,
+            body=body,
+            bytes_received=len(raw),
+            seconds=seconds,
+        )
+
+    def _fetch(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        conditional = "If-None-Match" in headers or "If-Modified-Since" in headers
+        for _ in range(self.max_redirects + 1):
+            response = self._send(url, headers)
+            if response.status in self.redirect_codes and "location" in response.headers:
+                url = urllib.parse.urljoin(url, response.headers["location"])
+                continue
+            if response.status == 304 and conditional:
+                return response
+            if not 200 <= response.status < 300:
+                raise HttpError(url, response.status, headers=response.headers)
+            return response
+        raise HttpError(url, response.status, "too many redirects", response.headers)
+
+    @staticmethod
+    def _from_cache(url: str, entry: CacheEntry) -> HttpResponse:
+        return HttpResponse(url=url, status=200, headers=entry.headers, body=entry.body)
+
+    def _fetch_with_retry(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        attempt = 0
+        while True:
+            try:
+                return self._fetch(url, headers)
+            except Exception as e:
+                delay = self.retry.delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                netloc = urllib.parse.urlsplit(url).netloc
+                with self._lock:
+                    self.stats.retries += 1
+                    self._host_stats(netloc).retries += 1
+                logging.warning(f"Retry {attempt}/{self.retry.max_retries} in {delay:.1f}s for {url}: {e}")
+                time.sleep(delay)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        headers = dict(headers or {})
+        if self.cache is None:
+            return self._fetch_with_retry(url, headers)
+
+        entry = self.cache.get(url)
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                self.cache.count(hit=True)
+                return self._from_cache(url, entry)
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        response = self._fetch_with_retry(url, headers)
+        if response.status == 304 and entry is not None:
+            self.cache.touch(entry)
+            self.cache.count(revalidated=True)
+            return self._from_cache(url, entry)
+        self.cache.count()
+        self.cache.put(url, response.headers, response.body)
+        return response
+
+    def _decode(self, response: HttpResponse):
+        start = time.perf_counter()
+        result = response.json()
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.stats.decode_seconds += seconds
+            self._host_stats(urllib.parse.urlsplit(response.url).netloc).decode_seconds += seconds
+        return result
+
+    def get_json(self, url: str, headers: Optional[Dict[str, str]] = None, memoize: bool = False):
+        """Get and decode a JSON response, memoize keeps the result in memory for the lifetime of the client."""
+        if not memoize:
+            return self._decode(self.get(url, headers))
+        with self._lock:
+            if url in self._memo:
+                return self._memo[url]
+        result = self._decode(self.get(url, headers))
+        with self._lock:
+            self._memo[url] = result
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+_default_client: Optional[HttpClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> HttpClient:
+    """Return the client shared by all providers in this process."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def set_default_client(client: HttpClient) -> None:
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
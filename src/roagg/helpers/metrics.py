@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Union
+from roagg.helpers.http import HttpStats
+
+
+@dataclass
+class ProviderMetrics:
+    records: int = 0
+    pages: int = 0
+    harvest_seconds: float = 0.0
+    mapping_seconds: float = 0.0
+    merge_seconds: float = 0.0
+    requests: int = 0
+    bytes_received: int = 0
+    http_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    retries: int = 0
+    throttled: int = 0
+    rate_limit_wait: float = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.harvest_seconds if self.harvest_seconds else 0.0
+
+    def add_http(self, stats: HttpStats) -> None:
+        self.requests += stats.requests
+        self.bytes_received += stats.bytes_received
+        self.http_seconds += stats.seconds
+        self.decode_seconds += stats.decode_seconds
+        self.retries += stats.retries
+        self.throttled += stats.throttled
+        self.rate_limit_wait += stats.rate_limit_wait
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "records_per_second": self.records_per_second}
+
+
+@dataclass
+class RunMetrics:
+    """Timings and counters of one aggregate() run, per stage and per provider.
+
+    HTTP counters come from the difference in the client's per-host stats over
+    the run, so with several runs sharing a client (roagg-batch) they also
+    include requests of the runs that overlapped with this one.
+    """
+    ror: str = ""
+    output: str = ""
+    started: float = field(default_factory=time.time)
+    seconds: float = 0.0
+    records: int = 0
+    stages: Dict[str, float] = field(default_factory=dict)
+    providers: Dict[str, ProviderMetrics] = field(default_factory=dict)
+
+    def provider(self, name: str) -> ProviderMetrics:
+        return self.providers.setdefault(name, ProviderMetrics())
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def to_dict(self) -> dict:
+        return {
+            "ror": self.ror,
+            "output": self.output,
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+            "seconds": self.seconds,
+            "records": self.records,
+            "stages": dict(self.stages),
+            "providers": {name: metrics.to_dict() for name, metrics in self.providers.items()},
+        }
+
+
+def _write_atomic(path: str, text: str) -> None:
+    # the Prometheus textfile collector may read the file at any time
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp, path)
+
+
+def write_json_report(path: str, runs: Union[RunMetrics, List[RunMetrics]]) -> None:
+    """One run as an object, a list of runs (roagg-batch) as a list."""
+    report = [run.to_dict() for run in runs] if isinstance(runs, list) else runs.to_dict()
+    _write_atomic(path, json.dumps(report, indent=2) + "\n")
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def prometheus_text(runs: List[RunMetrics]) -> str:
+    """Gauges in the Prometheus text exposition format, labelled by ror, stage and provider."""
+    samples: Dict[str, List[str]] = {}
+    help_text = {
+        "roagg_run_seconds": "Wall time of the aggregation run",
+        "roagg_run_timestamp_seconds": "Unix time the aggregation run started",
+        "roagg_run_records": "Records written by the aggregation run",
+        "roagg_stage_seconds": "Wall time of each stage of the run",
+    }
+
+    def add(name: str, labels: Dict[str, str], value: Optional[float]) -> None:
+        label_text = ",".join(f'{key}="{_label(str(v))}"' for key, v in labels.items())
+        samples.setdefault(name, []).append(f"{name}{{{label_text}}} {value}")
+
+    for run in runs:
+        add("roagg_run_seconds", {"ror": run.ror}, run.seconds)
+        add("roagg_run_timestamp_seconds", {"ror": run.ror}, run.started)
+        add("roagg_run_records", {"ror": run.ror}, run.records)
+        for stage, seconds in run.stages.items():
+            add("roagg_stage_seconds", {"ror": run.ror, "stage": stage}, seconds)
+        for provider, metrics in run.providers.items():
+            for key, value in metrics.to_dict().items():
+                name = f"roagg_provider_{key}"
+                help_text.setdefault(name, f"Provider {key.replace('_', ' ')}")
+                add(name, {"ror": run.ror, "provider": provider}, value)
+
+    lines = []
+    for name, metric_samples in samples.items():
+        lines.append(f"# HELP {name} {help_text[name]}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(metric_samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path: str, runs: List[RunMetrics]) -> None:
+    _write_atomic(path, prometheus_text(runs))
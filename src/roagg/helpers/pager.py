@@ -0,0 +1,103 @@
+import logging
+import queue
+import threading
+from typing import Callable, Iterator, Optional, Tuple
+from roagg.helpers.checkpoint import Checkpoint, cursor_expired
+
+# records of one page, cursor of the next page (None after the last page), total number of records
+Page = Tuple[list, Optional[str], Optional[int]]
+
+_DONE = object()
+
+
+def paginate(fetch: Callable[[str], Page], start: str, label: str, checkpoint: Checkpoint = None, key: str = None, prefetch: int = 0) -> Iterator[list]:
+    """Yield the records of each page of a cursor-paginated query, starting from the start cursor.
+
+    With a checkpoint every page is saved with the next cursor under key, and a
+    query saved by an earlier run continues from its last cursor. With
+    prefetch, pages are fetched in a background thread up to prefetch pages
+    ahead of the consumer.
+    """
+    pages = _pages(fetch, start, label, checkpoint, key)
+    return prefetched(pages, prefetch, label) if prefetch > 0 else pages
+
+
+def _pages(fetch: Callable[[str], Page], start: str, label: str, checkpoint: Optional[Checkpoint], key: Optional[str]) -> Iterator[list]:
+    cursor = start
+    retrieved = 0
+    pending: Optional[Page] = None
+    resumed = checkpoint.resume(key) if checkpoint else None
+    if resumed is not None:
+        # the saved pages are only replayed once the saved cursor is known to still work
+        if not resumed.done:
+            try:
+                pending = fetch(resumed.cursor)
+            except Exception as e:
+                if not cursor_expired(e):
+                    raise
+                logging.warning(f"Saved {label} cursor was rejected ({e}), restarting from the first page")
+                checkpoint.reset(key)
+                resumed = None
+        if resumed is not None:
+            logging.info(f"Resuming {label} from checkpoint with {resumed.records} records")
+            for page in resumed.pages:
+                retrieved += len(page)
+                yield page
+            if resumed.done:
+                return
+
+    while True:
+        records, next_cursor, total = pending or fetch(cursor)
+        pending = None
+        retrieved += len(records)
+        logging.info(f"Retrieved {label} {retrieved} of {total}")
+        if checkpoint:
+            checkpoint.save(key, records, next_cursor)
+        yield records
+        if not next_cursor:
+            break
+        cursor = next_cursor
+
+
+def prefetched(pages: Iterator[list], depth: int, label: str = "") -> Iterator[list]:
+    """Iterate pages in a background thread, at most depth pages ahead of the consumer.
+
+    A cursor is only known once its page has arrived, so the pages are still
+    fetched one after the other, but the next request is in flight while the
+    consumer maps the previous page. The producer blocks when depth pages are
+    waiting, which keeps memory bounded, and stops when the consumer does.
+    Errors are raised in the consumer.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for page in pages:
+                if not put((page, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((None, e))
+
+    thread = threading.Thread(target=produce, name=f"prefetch {label}".strip(), daemon=True)
+    thread.start()
+    try:
+        while True:
+            page, error = buffer.get()
+            if error is not None:
+                raise error
+            if page is _DONE:
+                return
+            yield page
+    finally:
+        stop.set()
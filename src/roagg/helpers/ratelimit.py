@@ -0,0 +1,122 @@
+import email.utils
+import http.client
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# requests per second for each provider API, kept below the documented public limits
+DEFAULT_RATE_LIMITS: Dict[str, float] = {
+    "api.datacite.org": 10.0,
+    "api.openalex.org": 10.0,
+    "api.openaire.eu": 5.0,
+    "api.ror.org": 5.0,
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+
+
+class TokenBucket:
+    """Blocking token bucket allowing rate requests per second with bursts up to burst."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that halves when the service throttles and grows back on success."""
+
+    def __init__(self, max_concurrency: int, increase_after: int = 10):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.increase_after = increase_after
+        self.active = 0
+        self.successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def throttled(self) -> None:
+        with self._condition:
+            self.limit = max(1, self.limit // 2)
+            self.successes = 0
+
+    def succeeded(self) -> None:
+        with self._condition:
+            self.successes += 1
+            if self.successes >= self.increase_after and self.limit < self.max_concurrency:
+                self.limit += 1
+                self.successes = 0
+                self._condition.notify()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header given as seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for throttling, server errors and network failures."""
+
+    def __init__(self, max_retries: int = 5, backoff: float = 1.0, max_backoff: float = 60.0):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None when the error should not be retried."""
+        if attempt >= self.max_retries:
+            return None
+        status = getattr(error, "status", None)
+        if status is not None:
+            # HttpError
+            if status not in RETRY_STATUS:
+                return None
+            retry_after = parse_retry_after(getattr(error, "headers", {}).get("retry-after"))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        elif not isinstance(error, (OSError, http.client.HTTPException)):
+            return None
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
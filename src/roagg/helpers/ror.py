@@ -1,14 +1,14 @@
-import urllib.request
-import json
 from typing import List
+from roagg.helpers.http import HttpClient, get_default_client
 
-def get_ror_info(ror: str):
+ror_base_url = "https://api.ror.org/v2/"
+
+def get_ror_info(ror: str, client: HttpClient = None, base_url: str = None):
     ror_id = ror.split('/')[-1]
-    url = f"https://api.ror.org/v2/organizations/{ror_id}"
-    with urllib.request.urlopen(url) as response:
-        return json.loads(response.read())
+    url = f"{base_url or ror_base_url}organizations/{ror_id}"
+    return (client or get_default_client()).get_json(url, memoize=True)
 
-def get_names_from_ror(ror: str) -> List[str]:
-    names = get_ror_info(ror)['names']
+def get_names_from_ror(ror: str, client: HttpClient = None, base_url: str = None) -> List[str]:
+    names = get_ror_info(ror, client, base_url)['names']
     valid_types = {'alias', 'ror_display', 'label'}
     return [n['value'] for n in names if valid_types.intersection(n['types'])]
\ No newline at end of file
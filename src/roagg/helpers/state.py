@@ -0,0 +1,31 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+def default_state_file(output: str) -> str:
+    """State file kept next to the output, e.g. data/output.csv -> data/output.state.json"""
+    return str(Path(output).with_suffix(".state.json"))
+
+
+def load_state(path: str) -> Dict[str, Dict[str, str]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_state(path: str, state: Dict[str, Dict[str, str]]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def high_water_mark(timestamps: Iterable[Optional[str]], previous: Optional[str] = None) -> Optional[str]:
+    """Latest ISO 8601 timestamp seen, never earlier than the previous mark."""
+    marks = [t for t in timestamps if t]
+    if previous:
+        marks.append(previous)
+    return max(marks) if marks else None
@@ -1,13 +1,15 @@
 import importlib.metadata
 import re
+from typing import List
 
 doi_pattern = re.compile(r'^10\.\d{4,9}/[-._;()/:A-Z0-9]+$', re.IGNORECASE)
+doi_in_text_pattern = re.compile(r'\b10\.\d{4,9}/[-.;()/:\w]+')
 
 def is_valid_doi(s: str) -> bool:
     return bool(doi_pattern.match(s))
 
 def find_doi_in_text(text: str) -> str | None:
-    return re.findall(r'\b10\.\d{4,9}/[-.;()/:\w]+', text)
+    return doi_in_text_pattern.findall(text)
 
 def remove_resolver_prefix_from_doi(doi: str) -> str:
     if doi is None:
@@ -25,6 +27,12 @@ def remove_resolver_prefix_from_doi(doi: str) -> str:
             return doi[len(prefix):]
     return doi
 
+def normalize_doi(doi: str) -> str | None:
+    """Lowercased DOI without resolver prefix, used as key when comparing DOIs."""
+    if doi is None:
+        return None
+    return remove_resolver_prefix_from_doi(doi.strip()).lower()
+
 def match_patterns(string, patterns):
     if string is None:
         return False
@@ -62,4 +70,40 @@ def string_word_count(string: str) -> int:
     """Count words in a string after trimming whitespace."""
     if not string:
         return 0
-    return len(string.strip().split())
\ No newline at end of file
+    return len(string.strip().split())
+
+class NameMatcher:
+    """Precompiled equivalent of match_patterns for a fixed list of name patterns.
+
+    Patterns without wildcards match as case-insensitive substrings, patterns
+    with * or ? must match the whole string. Build it once per run and reuse it.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self.substrings = tuple(dict.fromkeys(
+            p.lower() for p in self.patterns if '*' not in p and '?' not in p
+        ))
+        # an empty pattern is a substring of everything
+        self.match_all = "" in self.substrings
+        self.substring_regex = None
+        if self.substrings and not self.match_all:
+            alternation = '|'.join(re.escape(p) for p in self.substrings)
+            self.substring_regex = re.compile(alternation)
+        wildcards = [pattern_to_regexp(p)[1:-1] for p in self.patterns if '*' in p or '?' in p]
+        self.wildcard_regex = None
+        if wildcards:
+            self.wildcard_regex = re.compile('^(?:' + '|'.join(wildcards) + ')$', re.IGNORECASE)
+
+    def match(self, string: str) -> bool:
+        if string is None:
+            return False
+        if self.match_all:
+            return True
+        if self.substring_regex is not None and self.substring_regex.search(string.lower()):
+            return True
+        if self.wildcard_regex is not None and self.wildcard_regex.match(string):
+            return True
+        return False
+
+    __call__ = match
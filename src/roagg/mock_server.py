@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+import argparse
+import base64
+import gzip
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from roagg.helpers.fixtures import ROR, datacite_page, datacite_record, openaire_page, openalex_page, openalex_work, ror_organization
+from roagg.helpers.utils import get_roagg_version, normalize_doi
+
+# filters the DataCite shard planner adds to the query: field, value of a record
+SHARD_FIELDS = {
+    "publicationYear": lambda record: str(record["attributes"].get("publicationYear")),
+    "client_id": lambda record: record["relationships"]["client"]["data"]["id"],
+    "types.resourceTypeGeneral": lambda record: record["attributes"]["types"].get("resourceTypeGeneral"),
+}
+SHARD_CLAUSE = re.compile(r'AND (NOT )?(publicationYear|client_id|types\.resourceTypeGeneral):(?:"([^"]*)"|\(([^)]*)\))')
+UPDATED_CLAUSE = re.compile(r'updated:\[(\S+) TO \*\]')
+# DOI lookup used by the enrichment: doi:("a" OR "b")
+DOI_CLAUSE = re.compile(r'^doi:\((.*)\)$')
+
+# largest page each API returns
+MAX_PAGE_SIZE = {"datacite": 1000, "openaire": 100, "openalex": 200}
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], start: str) -> Optional[int]:
+    """Offset of a cursor, 0 for the API's start cursor and None when it is not one of ours."""
+    if cursor in (None, "", start):
+        return 0
+    try:
+        kind, _, offset = base64.urlsafe_b64decode(cursor.encode()).decode().partition(":")
+        return int(offset) if kind == "offset" else None
+    except ValueError:
+        return None
+
+
+class MockData:
+    """Generated records served by the mock API, all affiliated with fixtures.ROR.
+
+    Only found by DOI: DataCite records for the Zenodo DOIs of the OpenAlex
+    works, and OpenAlex works for the DataCite DOIs OpenAlex does not list
+    for the institution.
+    """
+
+    def __init__(self, records: int = 1000, fan_out: int = 3, seed: int = 0):
+        self.ror = ROR
+        self.datacite = datacite_page(records, fan_out, seed)["data"]
+        self.openaire = openaire_page(records, seed)["results"]
+        self.openalex = openalex_page(records, fan_out, seed)["results"]
+        rng = random.Random(seed + 1)
+        self.datacite_by_doi = {normalize_doi(r["attributes"]["doi"]): r for r in self.datacite}
+        self.openalex_by_doi = {normalize_doi(w["doi"]): w for w in self.openalex}
+        for n in range(1, records, 2):
+            zenodo = f"10.5281/zenodo.{n}"
+            self.datacite_by_doi[zenodo] = datacite_record(rng, n, fan_out, doi=zenodo)
+            bench = f"10.5878/bench.{n}"
+            self.openalex_by_doi[bench] = openalex_work(rng, n, fan_out, doi=bench)
+
+
+class MockApiServer(ThreadingHTTPServer):
+    """Local stand-in for the ROR, DataCite, OpenAire and OpenAlex APIs.
+
+    Each API is mounted under its own path (/ror/, /datacite/, /openaire/,
+    /openalex/) and pages with cursors the way the real API does. Every
+    request can be delayed by latency (plus up to jitter), answered with 429
+    and Retry-After (throttle_rate) or with 500 (failure_rate).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0), data: MockData = None, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: int = 1, seed: int = 0):
+        super().__init__(address, MockApiHandler)
+        self.data = data or MockData()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def api_urls(self) -> Dict[str, str]:
+        """Base URLs for aggregate(api_urls=...) and --api-url."""
+        return {name: f"{self.base_url}{name}/" for name in ("ror", "datacite", "openaire", "openalex")}
+
+    def fault(self) -> Optional[int]:
+        """Status code to answer this request with instead of the data, if any."""
+        with self._lock:
+            draw = self.random.random()
+            delay = self.latency + self.random.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay:
+            time.sleep(delay)
+        if draw < self.throttle_rate:
+            return 429
+        if draw < self.throttle_rate + self.failure_rate:
+            return 500
+        return None
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def start(self) -> threading.Thread:
+        """Serve from a background thread, for tests and benchmarks."""
+        thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        return thread
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockApiServer
+
+    def log_message(self, format, *args):
+        logging.debug(f"mock API: {format % args}")
+
+    def do_GET(self):
+        self.server.count("requests")
+        status = self.server.fault()
+        if status == 429:
+            self.server.count("throttled")
+            return self.send_json({"error": "Too Many Requests"}, 429, {"Retry-After": str(self.server.retry_after)})
+        if status:
+            self.server.count("failed")
+            return self.send_json({"error": "Internal Server Error"}, status)
+
+        parsed = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True))
+        api, _, path = parsed.path.strip("/").partition("/")
+        route = {
+            ("ror", "organizations"): self.ror_organization,
+            ("datacite", "dois"): self.datacite_dois,
+            ("openaire", "organizations"): self.openaire_organizations,
+            ("openaire", "researchProducts"): self.openaire_research_products,
+            ("openalex", "institutions"): self.openalex_institution,
+            ("openalex", "works"): self.openalex_works,
+        }.get((api, path.split("/")[0]))
+        if route is None:
+            return self.send_json({"error": f"Unknown path {parsed.path}"}, 404)
+        self.server.count(api)
+        body = route(path, params)
+        if body is None:
+            return self.send_json({"error": "Not found"}, 404)
+        if isinstance(body, tuple):
+            return self.send_json(*body)
+        self.send_json(body)
+
+    def send_json(self, body: dict, status: int = 200, headers: Dict[str, str] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            payload = gzip.compress(payload, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def page(self, items: list, api: str, cursor: Optional[str], start: str, size: str) -> Optional[Tuple[list, Optional[str]]]:
+        offset = decode_cursor(cursor, start)
+        if offset is None:
+            return None
+        size = max(0, min(int(size), MAX_PAGE_SIZE[api]))
+        end = offset + size
+        return items[offset:end], encode_cursor(end) if size and end < len(items) else None
+
+    def ror_organization(self, path: str, params: dict) -> Optional[dict]:
+        ror_id = path.split("/")[-1]
+        return ror_organization() if ROR.endswith(f"/{ror_id}") else None
+
+    def datacite_dois(self, path: str, params: dict):
+        query = params.get("query", "")
+        records = self.server.data.datacite
+        lookup = DOI_CLAUSE.match(query)
+        if lookup:
+            by_doi = self.server.data.datacite_by_doi
+            records = [by_doi[doi] for doi in (normalize_doi(d) for d in re.findall(r'"([^"]*)"', lookup.group(1))) if doi in by_doi]
+        updated = UPDATED_CLAUSE.search(query)
+        if updated:
+            records = [r for r in records if r["attributes"]["updated"][:10] >= updated.group(1)]
+        for negate, field, value, values in SHARD_CLAUSE.findall(query):
+            wanted = {value} if not values else set(re.findall(r'"([^"]*)"', values))
+            records = [r for r in records if (SHARD_FIELDS[field](r) in wanted) != bool(negate)]
+
+        page = self.page(records, "datacite", params.get("page[cursor]"), "1", params.get("page[size]", "25"))
+        if page is None:
+            return {"errors": [{"status": "400", "title": "Invalid cursor"}]}, 400
+        items, next_cursor = page
+        fields = params.get("fields[dois]")
+        if fields:
+            keep = set(fields.split(","))
+            items = [
+                {**item, "attributes": {k: v for k, v in item["attributes"].items() if k in keep},
+                 "relationships": {k: v for k, v in item["relationships"].items() if k in keep}}
+                for item in items
+            ]
+        size = int(params.get("page[size]", "25"))
+        meta = {"total": len(records), "totalPages": -(-len(records) // size) if size else 0}
+        if params.get("disable-facets") != "true":
+            meta.update(self.datacite_facets(records))
+        links = {"self": self.request_url(params)}
+        if next_cursor:
+            links["next"] = self.request_url({**params, "page[cursor]": next_cursor})
+        return {"data": items, "meta": meta, "links": links}
+
+    def datacite_facets(self, records: list) -> dict:
+        """Top ten values of each shard facet, like the DataCite API."""
+        def facet(key, to_id):
+            counts = Counter(SHARD_FIELDS[key](r) for r in records).most_common(10)
+            return [{"id": to_id(value), "title": value, "count": count} for value, count in counts]
+        return {
+            "published": facet("publicationYear", str),
+            "clients": facet("client_id", str),
+            "resourceTypes": facet("types.resourceTypeGeneral", lambda value: re.sub(r"(?<!^)(?=[A-Z])", "-", value).lower()),
+        }
+
+    def request_url(self, params: dict) -> str:
+        path = urllib.parse.urlsplit(self.path).path
+        return f"{self.server.base_url.rstrip('/')}{path}?{urllib.parse.urlencode(params)}"
+
+    def openaire_organizations(self, path: str, params: dict) -> dict:
+        found = params.get("pid") == self.server.data.ror
+        return {"header": {"numFound": int(found)}, "results": [{"id": "openorgs____::mock"}] if found else []}
+
+    def openaire_research_products(self, path: str, params: dict):
+        products = self.server.data.openaire if params.get("relOrganizationId") == "openorgs____::mock" else []
+        page = self.page(products, "openaire", params.get("cursor"), "*", params.get("pageSize", "10"))
+        if page is None:
+            return {"error": "Invalid cursor"}, 400
+        items, next_cursor = page
+        header = {"numFound": len(products), "pageSize": len(items)}
+        if next_cursor:
+            header["nextCursor"] = next_cursor
+        return {"header": header, "results": items}
+
+    def openalex_institution(self, path: str, params: dict) -> Optional[dict]:
+        if path.split("/", 1)[-1] != f"ror:{self.server.data.ror}":
+            return None
+        return {"id": "https://openalex.org/I1", "ror": self.server.data.ror, "display_name": "University of Gothenburg"}
+
+    def openalex_works(self, path: str, params: dict):
+        filters = dict(f.split(":", 1) for f in params.get("filter", "").split(",") if ":" in f)
+        works = self.server.data.openalex if filters.get("institutions.id") == "https://openalex.org/I1" else []
+        if "doi" in filters:
+            by_doi = self.server.data.openalex_by_doi
+            works = [by_doi[doi] for doi in map(normalize_doi, filters["doi"].split("|")) if doi in by_doi]
+        if "type" in filters:
+            works = [w for w in works if w["type"] == filters["type"]]
+        if "from_updated_date" in filters:
+            works = [w for w in works if w["updated_date"][:10] >= filters["from_updated_date"]]
+        page = self.page(works, "openalex", params.get("cursor"), "*", params.get("per-page", "25"))
+        if page is None:
+            return {"error": "Invalid cursor"}, 400
+        items, next_cursor = page
+        if params.get("select"):
+            keep = params["select"].split(",")
+            items = [{k: w[k] for k in keep if k in w} for w in items]
+        return {"meta": {"count": len(works), "per_page": len(items), "next_cursor": next_cursor}, "results": items}
+
+
+def main() -> None:
+    """serve generated ROR, DataCite, OpenAire and OpenAlex data for offline load tests."""
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+
+    parser = argparse.ArgumentParser(
+        description="local mock of the ROR, DataCite, OpenAire and OpenAlex APIs serving generated records",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=get_roagg_version()
+    )
+
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="address to listen on (default: 127.0.0.1)"
+    )
+
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="port to listen on (default: 8000)"
+    )
+
+    parser.add_argument(
+        "--records",
+        type=int,
+        default=10000,
+        help="records generated for each provider (default: 10000)"
+    )
+
+    parser.add_argument(
+        "--fan-out",
+        type=int,
+        default=3,
+        help="creators per generated record (default: 3)"
+    )
+
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="seconds added to every response (default: 0)"
+    )
+
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="up to this many extra seconds added at random to every response (default: 0)"
+    )
+
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests answered with 500 (default: 0)"
+    )
+
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests answered with 429 and Retry-After (default: 0)"
+    )
+
+    parser.add_argument(
+        "--retry-after",
+        type=int,
+        default=1,
+        help="seconds sent in Retry-After with 429 responses (default: 1)"
+    )
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed for the generated records and the injected faults (default: 0)"
+    )
+
+    args = parser.parse_args()
+
+    server = MockApiServer(
+        (args.host, args.port),
+        MockData(args.records, args.fan_out, args.seed),
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    api_urls = " ".join(f"--api-url {name}={url}" for name, url in server.api_urls().items())
+    logging.info(f"Serving {args.records} records per provider on {server.base_url}")
+    logging.info(f"Run against it with: roagg --ror {ROR} {api_urls} --output mock.csv")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logging.info(f"Mock API stats: {dict(server.stats)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import sys
 from dataclasses import dataclass
 
-@dataclass
+# string fields with few distinct values, interned so equal values share one object
+INTERNED_FIELDS = ("resourceType", "publisher", "dataCiteClientId", "dataCiteClientName", "openAireBestAccessRight")
+
+@dataclass(slots=True)
 class ResearchOutputItem:
     doi: str
     publicationYear: int = None
@@ -49,3 +53,9 @@ class ResearchOutputItem:
     #extra fields
     titleWordCount: int = None
     referencedByDoi: str = None
+
+    def __post_init__(self):
+        for name in INTERNED_FIELDS:
+            value = getattr(self, name)
+            if type(value) is str:
+                setattr(self, name, sys.intern(value))
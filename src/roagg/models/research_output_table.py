@@ -0,0 +1,69 @@
+import sys
+from array import array
+from dataclasses import fields
+from typing import Any, Iterable, Iterator, List
+from roagg.models.research_output_item import INTERNED_FIELDS, ResearchOutputItem
+
+# bool columns are stored one byte per row, -1 is None
+BOOL_NONE = -1
+
+
+class ResearchOutputTable:
+    """Column-backed, append-only collection of ResearchOutputItems.
+
+    Rows are stored as one column per field instead of one object per row:
+    bool fields in byte arrays, repeated strings interned. Indexing or
+    iterating returns regular ResearchOutputItem objects.
+    """
+
+    def __init__(self, items: Iterable[ResearchOutputItem] = ()):
+        self.fields = fields(ResearchOutputItem)
+        self.columns = {
+            f.name: array('b') if f.type is bool else []
+            for f in self.fields
+        }
+        self._length = 0
+        self.extend(items)
+
+    def append(self, item: ResearchOutputItem) -> None:
+        for f in self.fields:
+            value = getattr(item, f.name)
+            column = self.columns[f.name]
+            if f.type is bool:
+                column.append(BOOL_NONE if value is None else int(bool(value)))
+            elif f.name in INTERNED_FIELDS and type(value) is str:
+                column.append(sys.intern(value))
+            else:
+                column.append(value)
+        self._length += 1
+
+    def extend(self, items: Iterable[ResearchOutputItem]) -> None:
+        for item in items:
+            self.append(item)
+
+    def column(self, name: str) -> List[Any]:
+        """Values of one field for all rows."""
+        values = self.columns[name]
+        if isinstance(values, array):
+            return [None if v == BOOL_NONE else bool(v) for v in values]
+        return list(values)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> ResearchOutputItem:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ResearchOutputTable index out of range")
+        values = {}
+        for f in self.fields:
+            value = self.columns[f.name][index]
+            if f.type is bool:
+                value = None if value == BOOL_NONE else bool(value)
+            values[f.name] = value
+        return ResearchOutputItem(**values)
+
+    def __iter__(self) -> Iterator[ResearchOutputItem]:
+        for index in range(self._length):
+            yield self[index]
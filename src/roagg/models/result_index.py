@@ -0,0 +1,114 @@
+from dataclasses import fields
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from roagg.helpers.utils import normalize_doi
+from roagg.models.research_output_item import ResearchOutputItem
+
+PROVIDERS = ("DataCite", "OpenAire", "OpenAlex")
+
+_PROVIDER_SPECIFIC = ("openAire", "openAlex", "inOpenAire", "inOpenAlex")
+
+# fields each provider sets on a record another provider already added
+PROVIDER_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "DataCite": tuple(f.name for f in fields(ResearchOutputItem) if not f.name.startswith(_PROVIDER_SPECIFIC)),
+    "OpenAire": (
+        "openAireBestAccessRight", "openAireIndicatorsUsageCountsDownloads",
+        "openAireIndicatorsUsageCountsViews", "inOpenAire",
+    ),
+    "OpenAlex": (
+        "openAlexCitedByCount", "openAlexReferencedWorksCount", "inOpenAlex",
+        "openAlexId", "haveCreatorAffiliation",
+    ),
+}
+
+# providers in order of precedence for fields more than one provider sets, the default is PROVIDERS
+FIELD_PRECEDENCE: Dict[str, Tuple[str, ...]] = {
+    "haveCreatorAffiliation": ("DataCite", "OpenAlex", "OpenAire"),
+}
+
+
+def precedence(provider: Optional[str], field: str) -> int:
+    """Lower is stronger, values without a known provider (e.g. from a previous run) are the weakest."""
+    order = FIELD_PRECEDENCE.get(field, PROVIDERS)
+    return order.index(provider) if provider in order else len(order)
+
+
+class ResultIndex:
+    """Records of one aggregation keyed by normalised DOI, in insertion order.
+
+    Providers upsert their records: a new DOI is added as is, for a known DOI
+    only the fields in PROVIDER_FIELDS for that provider are merged, and a
+    value is only replaced by a provider with the same or higher precedence
+    or when it is missing.
+    """
+
+    def __init__(self, items: Iterable[ResearchOutputItem] = (), provider: str = None):
+        self._items: Dict[str, ResearchOutputItem] = {}
+        # provider that added each record, and per field overrides from merges
+        self._origin: Dict[str, Optional[str]] = {}
+        self._merged: Dict[str, Dict[str, str]] = {}
+        for item in items:
+            self.upsert(item, provider)
+
+    def key(self, doi: Optional[str]) -> str:
+        key = normalize_doi(doi)
+        # records without a DOI are kept but can never be matched
+        return key if key else f"\0{len(self._items)}"
+
+    def source(self, doi: str, field: str) -> Optional[str]:
+        key = normalize_doi(doi)
+        return self._merged.get(key, {}).get(field, self._origin.get(key))
+
+    def get(self, doi: Optional[str]) -> Optional[ResearchOutputItem]:
+        key = normalize_doi(doi)
+        return self._items.get(key) if key else None
+
+    def __contains__(self, doi: Optional[str]) -> bool:
+        return self.get(doi) is not None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[ResearchOutputItem]:
+        return iter(self._items.values())
+
+    def upsert(self, item: ResearchOutputItem, provider: Optional[str], doi: str = None) -> ResearchOutputItem:
+        """Add the record or merge the provider's fields into the record with the same DOI.
+
+        doi overrides item.doi as the key, for provider records listing several DOIs.
+        """
+        key = self.key(doi or item.doi)
+        existing = self._items.get(key)
+        if existing is None:
+            self._items[key] = item
+            self._origin[key] = provider
+            return item
+
+        merged = self._merged.setdefault(key, {})
+        origin = self._origin.get(key)
+        for name in PROVIDER_FIELDS.get(provider, ()):
+            current = getattr(existing, name)
+            source = merged.get(name, origin)
+            if current is None or precedence(provider, name) <= precedence(source, name):
+                setattr(existing, name, getattr(item, name))
+                merged[name] = provider
+        return existing
+
+    def fill(self, item: ResearchOutputItem, provider: str, skip: Tuple[str, ...] = ()) -> int:
+        """Set the provider's fields the record with the same DOI is missing (None or ""), returns how many were set.
+
+        Unlike upsert nothing is overwritten and unknown DOIs are not added.
+        """
+        key = normalize_doi(item.doi)
+        existing = self._items.get(key) if key else None
+        if existing is None:
+            return 0
+        merged = self._merged.setdefault(key, {})
+        filled = 0
+        for name in PROVIDER_FIELDS.get(provider, ()):
+            value = getattr(item, name)
+            if name in skip or getattr(existing, name) not in (None, "") or value in (None, ""):
+                continue
+            setattr(existing, name, value)
+            merged[name] = provider
+            filled += 1
+        return filled
@@ -1,79 +1,191 @@
-from typing import List
-import urllib.request
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+import urllib.parse
 import logging
 import json
-from roagg.helpers.utils import get_roagg_version
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from roagg.helpers.checkpoint import Checkpoint
+from roagg.helpers.http import HttpClient, HttpError, get_default_client
+from roagg.helpers.pager import Page, paginate
 from roagg.models.research_output_item import ResearchOutputItem
-from roagg.helpers.utils import match_patterns, string_word_count
+from roagg.helpers.utils import NameMatcher, normalize_doi, string_word_count
+
+@dataclass
+class DataCiteShard:
+    query: str
+    count: int
+    label: str = "all"
+
+def resource_type_general(facet_id: str) -> str:
+    """Facet ids are kebab-case (physical-object), the query field is PascalCase (PhysicalObject)."""
+    return "".join(part.capitalize() for part in facet_id.split("-"))
+
+def encoded_length(query: str) -> int:
+    """Length of the query as it appears in the request URL."""
+    return len(urllib.parse.quote_plus(query))
 
 class DataCiteAPI:
-    def __init__(self, page_size: int = 500, name: List[str] = [], ror: str = ""):
+    """DataCite REST API harvest for a name list and/or ROR.
+
+    With mapping_workers, pages are mapped to ResearchOutputItems in a pool of
+    worker processes (see map_pages), call close() when done.
+    """
+    datacite_base_url = "https://api.datacite.org/"
+
+    # attributes and relationships read by get_record, requested as a sparse fieldset
+    record_fields = [
+        "doi", "titles", "types", "publisher", "publicationYear", "created", "updated", "registered",
+        "creators", "contributors", "relatedIdentifiers", "versionCount", "versionOfCount",
+        "citationCount", "referenceCount", "viewCount", "downloadCount", "client",
+    ]
+
+    # facets used to split a large query into disjoint shards: (facet in meta, query field, facet id to value)
+    shard_facets = [
+        ("published", "publicationYear", str),
+        ("clients", "client_id", str),
+        ("resourceTypes", "types.resourceTypeGeneral", resource_type_general),
+    ]
+
+    # DataCite returns at most 1000 records per page
+    max_page_size = 1000
+
+    def __init__(self, page_size: int = 500, name: List[str] = [], ror: str = "", client: HttpClient = None, updated_since: str = None, project_fields: bool = True, base_url: str = None, checkpoint: Checkpoint = None, prefetch: int = 2, mapping_workers: int = 0):
         self.page_size = page_size
+        self.mapping_workers = mapping_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.checkpoint = checkpoint
+        self.prefetch = prefetch
+        if base_url:
+            self.datacite_base_url = base_url
+        self.project_fields = project_fields
+        self.updated_since = updated_since
+        self.client = client or get_default_client()
         self.name = name
         self.ror = ror
+        self.name_matcher = NameMatcher(name)
+        # pages fetched and seconds spent in get_record, for the run metrics
+        self.pages = 0
+        self.mapping_seconds = 0.0
+        self._metrics_lock = threading.Lock()
 
     def get_query_string(self) -> str:
         if not self.name and not self.ror:
             return ""
-            
-        query_parts = []
-        
-        if self.name:
-            # Separate wildcard and exact matches, handle spaces in wildcard queries appropriately
-            wildcard = ' OR '.join(n.replace(" ", "\\ ") for n in self.name if '*' in n)
-            exact = ' OR '.join(f'"{n}"' for n in self.name if '*' not in n)
-            name_fields = [
-                "creators.affiliation.name",
-                "contributors.affiliation.name", 
-                "publisher.name"
-            ]
-
-            if wildcard and exact:
-                name_conditions = f'{wildcard} OR {exact}'
-            else:
-                name_conditions = wildcard or exact
-            
-            query_parts.extend([f"{field}:({name_conditions})" for field in name_fields])
-        
-        if self.ror:
-            ror_fields = [
-                "publisher.publisherIdentifier",
-                "creators.affiliation.affiliationIdentifier", 
-                "contributors.affiliation.affiliationIdentifier",
-                "creators.nameIdentifiers.nameIdentifier",
-                "contributors.nameIdentifiers.nameIdentifier",
-                "fundingReferences.funderIdentifier"
-            ]
-            query_parts.extend([f'{field}:"{self.ror}"' for field in ror_fields])
-            # nameIdentifiers are formated without https://ror.org/ prefix from some sources, so we need to check both
-            query_parts.extend([f'{field}:"{self.ror.split("https://ror.org/")[1]}"' for field in ror_fields])
-        
-        return " OR ".join(query_parts)
-
-    def api_request_url(self, page_size: int = None) -> str:
+        clauses = [clause for clause in (self.name_clause(self.name), self.ror_clause()) if clause]
+        return self.limit_updated(" OR ".join(clauses))
+
+    def name_clause(self, names: List[str]) -> str:
+        if not names:
+            return ""
+        # Separate wildcard and exact matches, handle spaces in wildcard queries appropriately
+        wildcard = ' OR '.join(n.replace(" ", "\\ ") for n in names if '*' in n)
+        exact = ' OR '.join(f'"{n}"' for n in names if '*' not in n)
+        name_fields = [
+            "creators.affiliation.name",
+            "contributors.affiliation.name", 
+            "publisher.name"
+        ]
+
+        if wildcard and exact:
+            name_conditions = f'{wildcard} OR {exact}'
+        else:
+            name_conditions = wildcard or exact
+
+        return " OR ".join(f"{field}:({name_conditions})" for field in name_fields)
+
+    def ror_clause(self) -> str:
+        return " OR ".join(self.ror_terms())
+
+    def ror_terms(self) -> List[str]:
+        """One field:"ROR" term per field and ROR format."""
+        if not self.ror:
+            return []
+        ror_fields = [
+            "publisher.publisherIdentifier",
+            "creators.affiliation.affiliationIdentifier", 
+            "contributors.affiliation.affiliationIdentifier",
+            "creators.nameIdentifiers.nameIdentifier",
+            "contributors.nameIdentifiers.nameIdentifier",
+            "fundingReferences.funderIdentifier"
+        ]
+        query_parts = [f'{field}:"{self.ror}"' for field in ror_fields]
+        # nameIdentifiers are formated without https://ror.org/ prefix from some sources, so we need to check both
+        query_parts.extend([f'{field}:"{self.ror.split("https://ror.org/")[1]}"' for field in ror_fields])
+        return query_parts
+
+    def limit_updated(self, query: str) -> str:
+        if self.updated_since:
+            # only the date part, records updated the same day are fetched again and merged by DOI
+            query = f"({query}) AND updated:[{self.updated_since[:10]} TO *]"
+        return query
+
+    def plan_queries(self, max_query_length: int = 2000) -> List[DataCiteShard]:
+        """Split the query into sub-queries of at most max_query_length URL-encoded characters.
+
+        The ROR terms and the names are packed in batches that fit the limit,
+        each name batch matched in all name fields. A ROR term or name that
+        is too long on its own gets a sub-query of its own and a warning. The
+        sub-queries overlap, so their results are unioned by DOI.
+        """
+        query = self.get_query_string()
+        if not query or encoded_length(query) <= max_query_length:
+            return [DataCiteShard(query, 0)] if query else []
+        queries = self._batch_queries("ror", self.ror_terms(), lambda terms: " OR ".join(terms), max_query_length)
+        queries += self._batch_queries("names", self.name, self.name_clause, max_query_length)
+        logging.info(f"DataCite query plan: {len(queries)} sub-queries instead of one query of {encoded_length(query)} characters")
+        return queries
+
+    def _batch_queries(self, label: str, parts: List[str], clause: Callable[[List[str]], str], max_query_length: int) -> List[DataCiteShard]:
+        """Sub-queries for consecutive batches of parts, labelled by the part numbers they hold, e.g. names 1-12."""
+        def build(batch: List[str]) -> str:
+            return self.limit_updated(clause(batch))
+
+        batches: List[Tuple[int, List[str]]] = []
+        batch: List[str] = []
+        first = 0
+        for i, part in enumerate(parts):
+            if batch and encoded_length(build(batch + [part])) > max_query_length:
+                batches.append((first, batch))
+                batch, first = [], i
+            batch.append(part)
+        if batch:
+            batches.append((first, batch))
+
+        queries = []
+        for first, batch in batches:
+            query = DataCiteShard(build(batch), 0, f"{label} {first + 1}-{first + len(batch)}")
+            if encoded_length(query.query) > max_query_length:
+                logging.warning(f"DataCite sub-query {query.label} ({batch[0]}) is {encoded_length(query.query)} characters, over the limit of {max_query_length}, and cannot be split further")
+            queries.append(query)
+        return queries
+
+    def api_request_url(self, page_size: int = None, query: str = None, facets: bool = False) -> str:
         if page_size is None:
             page_size = self.page_size
-        params = urllib.parse.urlencode({
+        if query is None:
+            query = self.get_query_string()
+        params = {
             'page[size]': page_size,
             'page[cursor]': '1',
             'affiliation': 'true',
             'publisher': 'true',
             'detail': 'true',
-            'disable-facets': 'false',
-            'query': self.get_query_string()
-        })
-        return f"https://api.datacite.org/dois?{params}"
-
-    @staticmethod
-    def get_api_result(url: str) -> dict:
-        request = urllib.request.Request(url)
-        version = get_roagg_version()
-        request.add_header('User-Agent', f'ResearchOutputAggregator/{version} (https://github.com/snd-sweden/research-output-aggregator; mailto:team-it@snd.se)')
+            # facets are only needed for planning shards
+            'disable-facets': 'false' if facets or not self.project_fields else 'true',
+            'query': query
+        }
+        if self.project_fields:
+            params['fields[dois]'] = ','.join(self.record_fields)
+        return f"{self.datacite_base_url}dois?{urllib.parse.urlencode(params)}"
+
+    def get_api_result(self, url: str) -> dict:
         try:
-            with urllib.request.urlopen(request) as response:
-                return json.loads(response.read())
-        except (urllib.error.URLError, json.JSONDecodeError, KeyError) as e:
-            raise RuntimeError(f"Failed run DataCite query: {e}")
+            return self.client.get_json(url)
+        except (HttpError, OSError, json.JSONDecodeError, KeyError) as e:
+            raise RuntimeError(f"Failed run DataCite query: {e}") from e
     
     def get_record(self, item: dict) -> ResearchOutputItem:
         attributes = item.get("attributes", {})
@@ -104,7 +216,7 @@ class DataCiteAPI:
 
         record.isPublisher = (
             publisher_attr.get("publisherIdentifier") == self.ror or 
-            match_patterns(publisher_attr.get("name"), self.name)
+            self.name_matcher.match(publisher_attr.get("name"))
         )
 
         related = [
@@ -139,6 +251,34 @@ class DataCiteAPI:
         record.haveContributorAffiliation = self.check_agent_list_match(attributes.get("contributors", []))
         return record
 
+    def matches_record(self, item: dict) -> bool:
+        """Local equivalent of get_query_string, for records read from a DataCite data file.
+
+        Names are matched with the NameMatcher, so a quoted name matches as a
+        case-insensitive substring and a wildcard name must match the whole
+        field, which is close to but not exactly the Elasticsearch behaviour.
+        """
+        attributes = item.get("attributes", {})
+        if self.updated_since and str(attributes.get("updated") or "")[:10] < self.updated_since[:10]:
+            return False
+        rors = {self.ror, self.ror.split("https://ror.org/")[1]} if self.ror else set()
+        publisher = attributes.get("publisher") or {}
+        if rors and publisher.get("publisherIdentifier") in rors:
+            return True
+        if self.name and self.name_matcher.match(publisher.get("name")):
+            return True
+        for agent in (attributes.get("creators") or []) + (attributes.get("contributors") or []):
+            if rors and any(identifier.get("nameIdentifier") in rors for identifier in agent.get("nameIdentifiers") or []):
+                return True
+            for affiliation in agent.get("affiliation") or []:
+                if rors and affiliation.get("affiliationIdentifier") in rors:
+                    return True
+                if self.name and self.name_matcher.match(affiliation.get("name")):
+                    return True
+        if rors and any(funder.get("funderIdentifier") in rors for funder in attributes.get("fundingReferences") or []):
+            return True
+        return False
+
     def check_agent_list_match(self, items: list) -> bool:
         partial_ror = self.ror.split("https://ror.org/")[1] if self.ror else ""
         for agent in items:
@@ -149,30 +289,188 @@ class DataCiteAPI:
             if any(identifier.get("nameIdentifier") == partial_ror for identifier in agent.get("nameIdentifiers", [])):
                 return True
             # Check if the agent name matches any pattern
-            if match_patterns(agent.get("name"), self.name):
+            if self.name_matcher.match(agent.get("name")):
                 return True
             # Check each affiliation
             for affiliation in agent.get("affiliation", []):
                 if (affiliation.get("affiliationIdentifier") == self.ror or 
-                        match_patterns(affiliation.get("name"), self.name)):
+                        self.name_matcher.match(affiliation.get("name"))):
                     return True
         return False
 
+    def iter_pages(self, query: str = None, label: str = None) -> Iterator[list]:
+        """Yield the raw records of each result page as it arrives."""
+        url = self.api_request_url(query=query)
+        shard = f" shard {label}" if label else ""
+
+        def fetch_page(page_url: str) -> Page:
+            response = self.get_api_result(page_url)
+            with self._metrics_lock:
+                self.pages += 1
+            return response["data"], response['links'].get('next'), response['meta']['total']
+
+        yield from paginate(fetch_page, url, f"DataCite{shard}", self.checkpoint, f"DataCite {url}", self.prefetch)
+
+    def iter_records(self) -> Iterator[ResearchOutputItem]:
+        """Yield mapped records page by page so raw payloads are not kept around."""
+        for records in self.map_pages(self.iter_pages()):
+            yield from records
+
+    def map_page(self, page: list) -> List[ResearchOutputItem]:
+        if self.mapping_workers:
+            records, seconds = self.mapping_pool().submit(_map_page_in_worker, page).result()
+        else:
+            records, seconds = _map_page(self, page)
+        with self._metrics_lock:
+            self.mapping_seconds += seconds
+        return records
+
+    def map_pages(self, pages: Iterator[list]) -> Iterator[List[ResearchOutputItem]]:
+        """Map pages in order, with mapping_workers up to twice that many pages at a time in the pool."""
+        if not self.mapping_workers:
+            yield from map(self.map_page, pages)
+            return
+        pending: Deque[Future] = deque()
+        for page in pages:
+            pending.append(self.mapping_pool().submit(_map_page_in_worker, page))
+            if len(pending) >= 2 * self.mapping_workers:
+                yield self._mapped(pending.popleft())
+        while pending:
+            yield self._mapped(pending.popleft())
+
+    def _mapped(self, future: Future) -> List[ResearchOutputItem]:
+        records, seconds = future.result()
+        with self._metrics_lock:
+            self.mapping_seconds += seconds
+        return records
+
+    def mapping_pool(self) -> ProcessPoolExecutor:
+        """Worker processes with their own DataCiteAPI for the name list and ROR, started on first use."""
+        with self._metrics_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.mapping_workers, initializer=_init_mapping_worker, initargs=(self.name, self.ror))
+            return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def get_records_by_doi(self, dois: List[str]) -> List[ResearchOutputItem]:
+        """DataCite records for a batch of DOIs, one request per max_page_size DOIs, DOIs that are not in DataCite are left out."""
+        skipped = [doi for doi in dois if '"' in doi]
+        if skipped:
+            logging.warning(f"DataCite DOI lookup skips {len(skipped)} DOIs that cannot be quoted in a query: {', '.join(skipped)}")
+        dois = [doi for doi in dois if doi not in skipped]
+        items = []
+        for start in range(0, len(dois), self.max_page_size):
+            chunk = dois[start:start + self.max_page_size]
+            quoted = " OR ".join(f'"{doi}"' for doi in chunk)
+            url = self.api_request_url(page_size=len(chunk), query=f"doi:({quoted})")
+            with self._metrics_lock:
+                self.pages += 1
+            items.extend(self.map_page(self.get_api_result(url)["data"]))
+        return items
+
+    def plan_shards(self, max_shard_size: int = 10000, query: DataCiteShard = None) -> List[DataCiteShard]:
+        """Split the query (or a sub-query from plan_queries) into disjoint shards of at most max_shard_size records where the facets allow it."""
+        if query is None:
+            query = DataCiteShard(self.get_query_string(), 0)
+        meta = self.get_api_result(self.api_request_url(page_size=0, query=query.query, facets=True))["meta"]
+        shards = self._split_shard(DataCiteShard(query.query, meta["total"], query.label), 0, max_shard_size, meta)
+        logging.info(f"DataCite shard plan for {query.label}: {len(shards)} shards for {meta['total']} records")
+        for shard in shards:
+            logging.info(f"DataCite shard {shard.label}: {shard.count} records")
+        return shards
+
+    def _split_shard(self, shard: DataCiteShard, depth: int, max_shard_size: int, meta: Optional[dict] = None) -> List[DataCiteShard]:
+        if shard.count <= max_shard_size or depth >= len(self.shard_facets):
+            return [shard] if shard.count else []
+        if meta is None:
+            meta = self.get_api_result(self.api_request_url(page_size=0, query=shard.query, facets=True))["meta"]
+            shard.count = meta["total"]
+            if shard.count <= max_shard_size:
+                return [shard] if shard.count else []
+
+        facet, field, to_value = self.shard_facets[depth]
+        values = [(to_value(f["id"]), f["count"]) for f in meta.get(facet) or [] if f.get("count")]
+        if not values:
+            return self._split_shard(shard, depth + 1, max_shard_size, meta)
+
+        prefix = "" if shard.label == "all" else f"{shard.label},"
+        shards = []
+        for value, count in values:
+            sub = DataCiteShard(f'({shard.query}) AND {field}:"{value}"', count, f"{prefix}{field}={value}")
+            shards.extend(self._split_shard(sub, depth + 1, max_shard_size))
+        # facets only list the most common values, the rest goes in one shard excluding all of them
+        rest_count = shard.count - sum(count for _, count in values)
+        if rest_count > 0:
+            excluded = " OR ".join(f'"{value}"' for value, _ in values)
+            rest = DataCiteShard(f"({shard.query}) AND NOT {field}:({excluded})", rest_count, f"{prefix}{field}=other")
+            shards.extend(self._split_shard(rest, depth + 1, max_shard_size))
+        return shards
+
+    def iter_records_sharded(self, max_shard_size: int = 10000, workers: int = 4) -> Iterator[ResearchOutputItem]:
+        """Harvest the shards in parallel and yield records in shard plan order, deduplicated by DOI."""
+        yield from self.harvest_queries(self.plan_shards(max_shard_size), workers)
+
+    def iter_records_planned(self, max_query_length: int = 2000, workers: int = 4, max_shard_size: int = 0) -> Iterator[ResearchOutputItem]:
+        """Harvest the sub-queries of plan_queries in parallel, each sharded when max_shard_size is set."""
+        queries = self.plan_queries(max_query_length)
+        if max_shard_size:
+            queries = [shard for query in queries for shard in self.plan_shards(max_shard_size, query)]
+        yield from self.harvest_queries(queries, workers)
+
+    def harvest_queries(self, queries: List[DataCiteShard], workers: int = 4) -> Iterator[ResearchOutputItem]:
+        """Harvest the queries in parallel and yield records in query order, deduplicated by DOI.
+
+        Logs records, records not found by an earlier query and time per
+        query, so broad name variants or slow shards show up.
+        """
+        def harvest(query: DataCiteShard) -> Tuple[List[ResearchOutputItem], float]:
+            start = time.perf_counter()
+            records = [record for records in self.map_pages(self.iter_pages(query.query, query.label)) for record in records]
+            return records, time.perf_counter() - start
+
+        seen = set()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for query, (records, seconds) in zip(queries, executor.map(harvest, queries)):
+                new = 0
+                for record in records:
+                    key = normalize_doi(record.doi)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    new += 1
+                    yield record
+                logging.info(f"DataCite query {query.label}: {len(records)} records, {new} new, in {seconds:.1f}s")
+
     def all(self) -> list:
         result = []
-        url = self.api_request_url()
-        while True:
-            response = self.get_api_result(url)
-            result.extend(response["data"])
-            logging.info(f"Retrieved DataCite {len(result)} of {response['meta']['total']}")
-            if response['links'].get('next'):
-                url = response['links']['next']
-            else:
-                break
+        for page in self.iter_pages():
+            result.extend(page)
         return result
 
     def count(self) -> int:
         if not self.get_query_string():
             return 0
         url = self.api_request_url(page_size=0)
-        return self.get_api_result(url)["meta"]["total"]
\ No newline at end of file
+        return self.get_api_result(url)["meta"]["total"]
+
+def _map_page(api: DataCiteAPI, page: list) -> Tuple[List[ResearchOutputItem], float]:
+    start = time.perf_counter()
+    records = [api.get_record(item) for item in page]
+    return records, time.perf_counter() - start
+
+
+# DataCiteAPI used for mapping, built once in each worker process
+_worker_api: Optional[DataCiteAPI] = None
+
+
+def _init_mapping_worker(name: List[str], ror: str) -> None:
+    global _worker_api
+    _worker_api = DataCiteAPI(name=name, ror=ror)
+
+
+def _map_page_in_worker(page: list) -> Tuple[List[ResearchOutputItem], float]:
+    return _map_page(_worker_api, page)
@@ -1,37 +1,127 @@
-from typing import List
-import urllib.request
+from typing import Iterator, List, Tuple
+import urllib.parse
 import logging
 import json
+import re
+import time
+from roagg.helpers.checkpoint import Checkpoint
+from roagg.helpers.http import HttpClient, get_default_client
+from roagg.helpers.pager import Page, paginate
 from roagg.models.research_output_item import ResearchOutputItem
-from roagg.helpers.utils import find_doi_in_text, is_valid_doi, string_word_count
+from roagg.models.result_index import ResultIndex
+from roagg.helpers.utils import doi_in_text_pattern, is_valid_doi, string_word_count
+
+# an OpenAire research product mapped to an item, with all DOIs of the product
+MappedProduct = Tuple[ResearchOutputItem, List[str]]
+
+# landing page URLs rewritten to doi.org URLs before looking for a DOI in them
+DOI_URL_PREFIXES = {
+    "https://doi.pangaea.de/": "https://doi.org/",
+    "https://zenodo.org/doi/": "https://doi.org/",
+    "https://zenodo.org/records/": "https://doi.org/10.5281/zenodo.",
+}
+
+
+class DoiExtractor:
+    """Extracts the DOIs of OpenAire research products, a page at a time.
+
+    Products without any DOI are only remembered; log_summary reports them
+    once instead of logging every product's instances as they are found.
+    """
+
+    prefix_pattern = re.compile("|".join(re.escape(prefix) for prefix in DOI_URL_PREFIXES))
+
+    def __init__(self):
+        self.products = 0
+        self.missing: List[dict] = []
+
+    def rewrite_url(self, url: str) -> str:
+        match = self.prefix_pattern.match(url)
+        if match is None:
+            return url
+        return DOI_URL_PREFIXES[match.group()] + url[match.end():]
+
+    def extract(self, resource: dict) -> List[str]:
+        """DOIs of one product from instance pids and alternate identifiers, or from its URLs when there are none."""
+        self.products += 1
+        doi_list = []
+        for instance in resource['instances']:
+            for pid in instance.get('pids') or ():
+                if pid['scheme'].lower() == 'doi':
+                    doi_list.append(pid['value'])
+            for alternateIdentifier in instance.get('alternateIdentifiers') or ():
+                if alternateIdentifier['scheme'].lower() == 'doi':
+                    doi_list.append(alternateIdentifier['value'])
+
+            if not doi_list and instance.get('urls'):
+                # one search over all URLs, a DOI cannot span the newline
+                urls = "\n".join(self.rewrite_url(url) for url in instance['urls'])
+                # ASCII matches of the search pattern are always valid DOIs
+                doi_list.extend(doi for doi in doi_in_text_pattern.findall(urls) if doi.isascii() or is_valid_doi(doi))
+
+        if not doi_list:
+            self.missing.append(resource)
+        return list(dict.fromkeys(doi_list))
+
+    def extract_page(self, resources: List[dict]) -> List[List[str]]:
+        return [self.extract(resource) for resource in resources]
+
+    def log_summary(self) -> None:
+        if not self.missing:
+            return
+        ids = ", ".join(str(resource.get('id')) for resource in self.missing[:5])
+        logging.warning(f"No DOI found in {len(self.missing)} of {self.products} OpenAire research products, e.g. {ids}")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            for resource in self.missing:
+                logging.debug(f"No DOI found in resource {resource.get('id')}: {json.dumps(resource['instances'], indent=2)}")
+
 
 class OpenAireAPI:
     openaire_base_url = "https://api.openaire.eu/graph/v1/"
 
-    def __init__(self, page_size: int = 100, ror: str = "", results: List[ResearchOutputItem] = []):
+    def __init__(self, page_size: int = 100, ror: str = "", results: ResultIndex = None, client: HttpClient = None, base_url: str = None, checkpoint: Checkpoint = None, prefetch: int = 2):
         self.page_size = page_size
+        self.pages = 0
+        self.mapping_seconds = 0.0
+        self.checkpoint = checkpoint
+        self.prefetch = prefetch
+        if base_url:
+            self.openaire_base_url = base_url
+        self.client = client or get_default_client()
         self.ror = ror
-        self.results = results
+        self.doi_extractor = DoiExtractor()
+        self.results = results if results is not None else ResultIndex()
     
     def get_openaire_id_from_ror(self) -> str:
         url = f"{self.openaire_base_url}organizations?pid={self.ror}"
-        with urllib.request.urlopen(url) as response:
-            json_response = json.loads(response.read())
-            
-            if 'results' in json_response and len(json_response['results']) > 0:
-                return json_response['results'][0]['id']
-            else:
-                return ""
+        json_response = self.client.get_json(url, memoize=True)
+        
+        if 'results' in json_response and len(json_response['results']) > 0:
+            return json_response['results'][0]['id']
+        else:
+            return ""
 
     def get_records(self) -> List[ResearchOutputItem]:
+        return self.merge_records(self.fetch_records())
+
+    def fetch_records(self) -> list:
+        return [product for page in self.iter_pages() for product in page]
+
+    def fetch_items(self) -> List[MappedProduct]:
+        """Harvest and map the products page by page, mapping a page while the next one is fetched."""
+        items = [item for page in self.iter_pages() for item in self.map_page(page)]
+        self.doi_extractor.log_summary()
+        return items
+
+    def iter_pages(self) -> Iterator[list]:
         if not self.ror:
-            return []
-        openaire_results = []
+            return
         openaire_id = self.get_openaire_id_from_ror()
+        logging.info(f"OpenAire ID from ROR {self.ror} : {openaire_id}")
         
         if not openaire_id:
             logging.info(f"No OpenAire ID found for ROR {self.ror}")
-            return []
+            return
 
         params = {
             'pageSize': self.page_size,
@@ -39,117 +129,78 @@ class OpenAireAPI:
             'type': 'dataset', # limit to only datasets for now
             'relOrganizationId': openaire_id
         }
-        retrieve_count = 0
-        while True:
-            query_string = urllib.parse.urlencode(params)
-            url = f"{self.openaire_base_url}researchProducts?{query_string}"
-            with urllib.request.urlopen(url) as response:
-                json_response = json.loads(response.read())
-                if 'results' in json_response:
-                    openaire_results.extend(json_response['results'])
-
-                retrieve_count = len(openaire_results)
-                logging.info(f"Retrieved OpenAire {retrieve_count} of {json_response['header']['numFound']}")
-
-                if 'nextCursor' in json_response['header'] and json_response['header']['nextCursor']:
-                    params['cursor'] = json_response['header']['nextCursor']
-                else:
-                    break
-
-        # Create a dictionary for O(1) lookups
-        doi_to_item = {item.doi.lower(): item for item in self.results if item.doi}
-        
-        for r in openaire_results:
-            openAireBestAccessRight = None
-            if 'bestAccessRight' in r and r['bestAccessRight'] and 'label' in r['bestAccessRight']:
-                openAireBestAccessRight = r['bestAccessRight']['label']
-            
-            openAireIndicatorsUsageCountsDownloads = None
-            if 'indicators' in r and r['indicators'] and 'usageCounts' in r['indicators']:
-                if 'downloads' in r['indicators']['usageCounts']:
-                    openAireIndicatorsUsageCountsDownloads = r['indicators']['usageCounts']['downloads']
-
-            openAireIndicatorsUsageCountsViews = None
-            if 'indicators' in r and r['indicators'] and 'usageCounts' in r['indicators']:
-                if 'views' in r['indicators']['usageCounts']:
-                    openAireIndicatorsUsageCountsViews = r['indicators']['usageCounts']['views']
-            
-            dois = self.get_doi_list_from_resource(r)
-            recordMatch = False
-            for doi in dois:
-                item = doi_to_item.get(doi.lower())
-                if item:
-                    recordMatch = True
-                    item.openAireBestAccessRight = openAireBestAccessRight
-                    item.openAireIndicatorsUsageCountsDownloads = openAireIndicatorsUsageCountsDownloads
-                    item.openAireIndicatorsUsageCountsViews = openAireIndicatorsUsageCountsViews
-                    item.inOpenAire = True
-            if not recordMatch and len(dois) > 0:
-                publication_date = r.get('publicationDate', None)
-                publication_year = None
-                if publication_date:
-                    publication_year = publication_date[:4] if len(publication_date) >= 4 else None
-                item = ResearchOutputItem(
-                    doi=dois[0],
-                    isPublisher=None,
-                    resourceType=r.get('type', None),
-                    title=r.get('mainTitle', None),
-                    publisher=r.get('publisher', None),
-                    publicationYear=publication_year,
-                    haveContributorAffiliation=None,
-                    haveCreatorAffiliation=None,
-                    isLatestVersion=None,
-                    isConceptDoi=None,
-                    inOpenAire=True,
-                    openAireBestAccessRight=openAireBestAccessRight,
-                    openAireIndicatorsUsageCountsDownloads=openAireIndicatorsUsageCountsDownloads,
-                    openAireIndicatorsUsageCountsViews=openAireIndicatorsUsageCountsViews,
-                    openAireId=r.get('id', None),
-                    titleWordCount=string_word_count(r.get('mainTitle', None))
-                )
-                self.results.append(item)
-                doi_to_item[item.doi.lower()] = item  # Add to lookup dictionary
 
+        def fetch_page(cursor: str) -> Page:
+            query_string = urllib.parse.urlencode({**params, 'cursor': cursor})
+            json_response = self.client.get_json(f"{self.openaire_base_url}researchProducts?{query_string}")
+            self.pages += 1
+            header = json_response['header']
+            return json_response.get('results', []), header.get('nextCursor'), header['numFound']
+
+        key = f"OpenAire {self.openaire_base_url}researchProducts?{urllib.parse.urlencode(params)}"
+        yield from paginate(fetch_page, params['cursor'], "OpenAire", self.checkpoint, key, self.prefetch)
+
+    def map_page(self, page: list) -> List[MappedProduct]:
+        """Products with at least one DOI, as an item and all DOIs of the product."""
+        start = time.perf_counter()
+        items = [
+            (self.map_product(r, dois), dois)
+            for r, dois in zip(page, self.doi_extractor.extract_page(page)) if dois
+        ]
+        self.mapping_seconds += time.perf_counter() - start
+        return items
+
+    def map_product(self, r: dict, dois: List[str]) -> ResearchOutputItem:
+        openAireBestAccessRight = None
+        if 'bestAccessRight' in r and r['bestAccessRight'] and 'label' in r['bestAccessRight']:
+            openAireBestAccessRight = r['bestAccessRight']['label']
+        
+        openAireIndicatorsUsageCountsDownloads = None
+        if 'indicators' in r and r['indicators'] and 'usageCounts' in r['indicators']:
+            if 'downloads' in r['indicators']['usageCounts']:
+                openAireIndicatorsUsageCountsDownloads = r['indicators']['usageCounts']['downloads']
+
+        openAireIndicatorsUsageCountsViews = None
+        if 'indicators' in r and r['indicators'] and 'usageCounts' in r['indicators']:
+            if 'views' in r['indicators']['usageCounts']:
+                openAireIndicatorsUsageCountsViews = r['indicators']['usageCounts']['views']
+        
+        publication_date = r.get('publicationDate', None)
+        publication_year = None
+        if publication_date:
+            publication_year = publication_date[:4] if len(publication_date) >= 4 else None
+        return ResearchOutputItem(
+            doi=dois[0],
+            isPublisher=None,
+            resourceType=r.get('type', None),
+            title=r.get('mainTitle', None),
+            publisher=r.get('publisher', None),
+            publicationYear=publication_year,
+            haveContributorAffiliation=None,
+            haveCreatorAffiliation=None,
+            isLatestVersion=None,
+            isConceptDoi=None,
+            inOpenAire=True,
+            openAireBestAccessRight=openAireBestAccessRight,
+            openAireIndicatorsUsageCountsDownloads=openAireIndicatorsUsageCountsDownloads,
+            openAireIndicatorsUsageCountsViews=openAireIndicatorsUsageCountsViews,
+            openAireId=r.get('id', None),
+            titleWordCount=string_word_count(r.get('mainTitle', None))
+        )
+
+    def merge_items(self, items: List[MappedProduct]) -> None:
+        for item, dois in items:
+            # enrich every known DOI of the product, add it under its first DOI otherwise
+            matched = [doi for doi in dois if doi in self.results]
+            for doi in matched:
+                self.results.upsert(item, "OpenAire", doi=doi)
+            if not matched:
+                self.results.upsert(item, "OpenAire")
+
+    def merge_records(self, openaire_results: list) -> list:
+        self.merge_items(self.map_page(openaire_results))
+        self.doi_extractor.log_summary()
         return openaire_results
 
     def get_doi_list_from_resource(self, resource: dict) -> List[str]:
-        doi_list = []
-        
-        for instance in resource['instances']:
-            logging.debug(f"Instance: {instance}")
-
-            if 'pids' in instance and len(instance['pids']) > 0:
-                for pid in instance['pids']:
-                    if pid['scheme'].lower() == 'doi':
-                        doi_list.append(pid['value'])
-
-            if 'alternateIdentifiers' in instance and len(instance['alternateIdentifiers']) > 0:
-                for alternateIdentifier in instance['alternateIdentifiers']:
-                    if alternateIdentifier['scheme'].lower() == 'doi':
-                        doi_list.append(alternateIdentifier['value'])
-
-            if len(doi_list) == 0:
-                # Normalize URLs to standard DOI format
-                url_replacements = [
-                    ("https://doi.pangaea.de/", "https://doi.org/"),
-                    ("https://zenodo.org/doi/", "https://doi.org/"),
-                    ("https://zenodo.org/records/", "https://doi.org/10.5281/zenodo.")
-                ]
-                
-                for url in instance['urls']:
-                    normalized_url = url
-                    for old_pattern, new_pattern in url_replacements:
-                        normalized_url = normalized_url.replace(old_pattern, new_pattern)
-
-                    for doi in find_doi_in_text(normalized_url):
-                        if is_valid_doi(doi):
-                            doi_list.append(doi)
-
-        # if doi_list is empty print json for instances
-        if len(doi_list) == 0:
-            logging.warning(f"No DOI found in resource: {json.dumps(resource['instances'], indent=2)}")
-
-        return list(set(doi_list))
-
-
-
+        return self.doi_extractor.extract(resource)
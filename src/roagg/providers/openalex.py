@@ -1,119 +1,175 @@
-from typing import List
-import urllib.request
+from typing import Iterator, List, Optional
+import urllib.parse
 import logging
-import json
+import time
+from roagg.helpers.checkpoint import Checkpoint
+from roagg.helpers.http import HttpClient, get_default_client
+from roagg.helpers.pager import Page, paginate
+from roagg.providers.openalex_snapshot import OpenAlexSnapshot
 from roagg.models.research_output_item import ResearchOutputItem
-from roagg.helpers.utils import string_word_count, remove_resolver_prefix_from_doi
+from roagg.models.result_index import ResultIndex
+from roagg.helpers.utils import normalize_doi, string_word_count, remove_resolver_prefix_from_doi
 
 class OpenAlexAPI:
     openalex_base_url = "https://api.openalex.org/"
+    # OpenAlex accepts at most 100 values OR-ed in one filter
+    max_filter_values = 100
 
-    def __init__(self, page_size: int = 200, ror: str = "", results: List[ResearchOutputItem] = []):
+    # work fields read by map_work, requested with select=
+    select_fields = [
+        "id", "doi", "title", "type", "publication_year", "publication_date",
+        "created_date", "updated_date", "cited_by_count", "referenced_works_count",
+    ]
+
+    def __init__(self, page_size: int = 200, ror: str = "", results: ResultIndex = None, client: HttpClient = None, updated_since: str = None, project_fields: bool = True, snapshot: OpenAlexSnapshot = None, base_url: str = None, checkpoint: Checkpoint = None, prefetch: int = 2):
         self.page_size = page_size
+        self.pages = 0
+        self.mapping_seconds = 0.0
+        self.checkpoint = checkpoint
+        self.prefetch = prefetch
+        if base_url:
+            self.openalex_base_url = base_url
+        self.snapshot = snapshot
+        self.project_fields = project_fields
+        self.updated_since = updated_since
+        self.client = client or get_default_client()
         self.ror = ror
-        self.results = results
+        self.results = results if results is not None else ResultIndex()
 
     def get_openalex_id_from_ror(self) -> str:
         url = f"{self.openalex_base_url}institutions/ror:{self.ror}"
-        with urllib.request.urlopen(url) as response:
-            json_response = json.loads(response.read())
-            
-            if 'id' in json_response:
-                return json_response['id']
-            else:
-                return ""
-            
+        json_response = self.client.get_json(url, memoize=True)
+        
+        if 'id' in json_response:
+            return json_response['id']
+        else:
+            return ""
+        
     def get_records(self) -> List[ResearchOutputItem]:
+        return self.merge_records(self.fetch_records())
+
+    def fetch_records(self) -> list:
+        return [work for page in self.iter_pages() for work in page]
+
+    def fetch_items(self) -> List[ResearchOutputItem]:
+        """Harvest and map the works page by page, mapping a page while the next one is fetched."""
+        return [item for page in self.iter_pages() for item in self.map_page(page)]
+
+    def iter_pages(self) -> Iterator[list]:
         if not self.ror:
-            return []
-        openalex_results = []
+            return
+        if self.snapshot is not None:
+            openalex_results = self.snapshot.works_for_ror(self.ror, updated_since=self.updated_since)
+            logging.info(f"Read {len(openalex_results)} OpenAlex works for {self.ror} from the snapshot index")
+            yield openalex_results
+            return
         openalex_id = self.get_openalex_id_from_ror()
+        logging.info(f"OpenAlex ID from ROR {self.ror} : {openalex_id}")
         
         if not openalex_id:
             logging.info(f"No OpenAlex ID found for ROR {self.ror}")
-            return []
+            return
 
         params = {
             'per-page': self.page_size,
             'cursor': '*',
             'filter': f'institutions.id:{openalex_id},type:dataset' # limit to only datasets for now
         }
-        retrieve_count = 0
-
-        while True:
-            query_string = urllib.parse.urlencode(params)
-            url = f"{self.openalex_base_url}works?{query_string}"
-            with urllib.request.urlopen(url) as response:
-                json_response = json.loads(response.read())
-                if 'results' in json_response:
-                    openalex_results.extend(json_response['results'])
-                retrieve_count = len(openalex_results)
-                logging.info(f"Retrieved OpenAlex {retrieve_count} of {json_response['meta']['count']}")
-
-                if 'next_cursor' in json_response['meta'] and json_response['meta']['next_cursor']:
-                    params['cursor'] = json_response['meta']['next_cursor']
-                else:
-                    break
+        if self.project_fields:
+            params['select'] = ','.join(self.select_fields)
+        if self.updated_since:
+            params['filter'] += f',from_updated_date:{self.updated_since[:10]}'
 
-        # Create a dictionary for O(1) lookups
-        doi_to_item = {item.doi.lower(): item for item in self.results if item.doi}
-        
-        for r in openalex_results:
-            openAlexCitedByCount = None
-            if 'cited_by_count' in r:
-                openAlexCitedByCount = r['cited_by_count']
+        def fetch_page(cursor: str) -> Page:
+            query_string = urllib.parse.urlencode({**params, 'cursor': cursor})
+            json_response = self.client.get_json(f"{self.openalex_base_url}works?{query_string}")
+            self.pages += 1
+            meta = json_response['meta']
+            return json_response.get('results', []), meta.get('next_cursor'), meta['count']
+
+        key = f"OpenAlex {self.openalex_base_url}works?{urllib.parse.urlencode(params)}"
+        yield from paginate(fetch_page, params['cursor'], "OpenAlex", self.checkpoint, key, self.prefetch)
 
-            openAlexReferencedWorksCount = None
-            if 'referenced_works_count' in r:
-                openAlexReferencedWorksCount = r['referenced_works_count']
+    def get_items_by_doi(self, dois: List[str]) -> List[ResearchOutputItem]:
+        """OpenAlex works for a batch of DOIs, whatever their institution, one request per max_filter_values DOIs.
 
-            haveCreatorAffiliation = False
+        With a snapshot the works are looked up in its DOI index instead.
+        """
+        if self.snapshot is not None:
+            found = self.snapshot.lookup(dois)
+            return self.map_page([found[doi] for doi in dict.fromkeys(map(normalize_doi, dois)) if doi in found])
+        # , and | separate filters and values
+        skipped = [doi for doi in dois if "," in doi or "|" in doi]
+        if skipped:
+            logging.warning(f"OpenAlex DOI lookup skips {len(skipped)} DOIs that cannot be used in a filter: {', '.join(skipped)}")
+        dois = [doi for doi in dois if doi not in skipped]
+        items = []
+        for start in range(0, len(dois), self.max_filter_values):
+            chunk = dois[start:start + self.max_filter_values]
+            params = {'per-page': len(chunk), 'filter': f"doi:{'|'.join(chunk)}"}
+            if self.project_fields:
+                params['select'] = ','.join(self.select_fields)
+            json_response = self.client.get_json(f"{self.openalex_base_url}works?{urllib.parse.urlencode(params)}")
+            self.pages += 1
+            items.extend(self.map_page(json_response.get('results', [])))
+        return items
+
+    def map_page(self, page: list) -> List[ResearchOutputItem]:
+        start = time.perf_counter()
+        items = [item for item in map(self.map_work, page) if item is not None]
+        self.mapping_seconds += time.perf_counter() - start
+        return items
+
+    def map_work(self, r: dict) -> Optional[ResearchOutputItem]:
+        """ResearchOutputItem for an OpenAlex work, None for works without a DOI."""
+        openAlexCitedByCount = None
+        if 'cited_by_count' in r:
+            openAlexCitedByCount = r['cited_by_count']
+
+        openAlexReferencedWorksCount = None
+        if 'referenced_works_count' in r:
+            openAlexReferencedWorksCount = r['referenced_works_count']
+
+        haveCreatorAffiliation = False
  
-            for authorship in r.get('institutions', []):
-                for affiliation in authorship.get('institutions', []):
-                    if affiliation.get('ror') == self.ror:
-                        haveCreatorAffiliation = True
-                        break
-
-            doi = remove_resolver_prefix_from_doi(r.get('doi', None))
-            if doi is None:
-                continue
-
-            recordMatch = False
-
-            item = doi_to_item.get(doi.lower())
-            if item:
-                recordMatch = True
-                item.openAlexCitedByCount = openAlexCitedByCount
-                item.openAlexReferencedWorksCount = openAlexReferencedWorksCount
-                item.inOpenAlex = True
-                item.openAlexId = r.get('id', None)
-                item.haveCreatorAffiliation = haveCreatorAffiliation
-            if not recordMatch:
-                publication_date = r.get('publication_date', None)
-                publication_year = r.get('publication_year', None)
-                if publication_date:
-                    publication_year = publication_date[:4] if len(publication_date) >= 4 else None
-                item = ResearchOutputItem(
-                    doi=doi,
-                    isPublisher=None,
-                    resourceType=r.get('type', None),
-                    title=r.get('title', None),
-                    publisher=None,
-                    publicationYear=publication_year,
-                    createdAt=r.get('created_date', None),
-                    updatedAt=r.get('updated_date', None),
-                    haveContributorAffiliation=None,
-                    haveCreatorAffiliation=haveCreatorAffiliation,
-                    isLatestVersion=None,   
-                    isConceptDoi=None,
-                    inOpenAlex=True,
-                    openAlexCitedByCount=openAlexCitedByCount,
-                    openAlexReferencedWorksCount=openAlexReferencedWorksCount,
-                    openAlexId=r.get('id', None),
-                    titleWordCount=string_word_count(r.get('title', None))
-                )
-                self.results.append(item)
-                doi_to_item[item.doi.lower()] = item  # Add to lookup dictionary
-
-        return openalex_results
\ No newline at end of file
+        for authorship in r.get('institutions', []):
+            for affiliation in authorship.get('institutions', []):
+                if affiliation.get('ror') == self.ror:
+                    haveCreatorAffiliation = True
+                    break
+
+        doi = remove_resolver_prefix_from_doi(r.get('doi', None))
+        if doi is None:
+            return None
+
+        publication_date = r.get('publication_date', None)
+        publication_year = r.get('publication_year', None)
+        if publication_date:
+            publication_year = publication_date[:4] if len(publication_date) >= 4 else None
+        return ResearchOutputItem(
+            doi=doi,
+            isPublisher=None,
+            resourceType=r.get('type', None),
+            title=r.get('title', None),
+            publisher=None,
+            publicationYear=publication_year,
+            createdAt=r.get('created_date', None),
+            updatedAt=r.get('updated_date', None),
+            haveContributorAffiliation=None,
+            haveCreatorAffiliation=haveCreatorAffiliation,
+            isLatestVersion=None,   
+            isConceptDoi=None,
+            inOpenAlex=True,
+            openAlexCitedByCount=openAlexCitedByCount,
+            openAlexReferencedWorksCount=openAlexReferencedWorksCount,
+            openAlexId=r.get('id', None),
+            titleWordCount=string_word_count(r.get('title', None))
+        )
+
+    def merge_items(self, items: List[ResearchOutputItem]) -> None:
+        for item in items:
+            self.results.upsert(item, "OpenAlex")
+
+    def merge_records(self, openalex_results: list) -> list:
+        self.merge_items(self.map_page(openalex_results))
+        return openalex_results
@@ -0,0 +1,182 @@
+import gzip
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from roagg.helpers.utils import normalize_doi
+
+# fields kept from each work, the ones OpenAlexAPI.merge_records and enrichment read
+INDEX_FIELDS = [
+    "id", "doi", "title", "type", "publication_year", "publication_date",
+    "created_date", "updated_date", "cited_by_count", "referenced_works_count",
+]
+
+IndexRow = Tuple[str, Optional[str], Optional[str], Optional[str], str, List[str]]
+
+
+def work_rors(work: dict) -> List[str]:
+    rors = {
+        institution.get("ror")
+        for authorship in work.get("authorships") or []
+        for institution in authorship.get("institutions") or []
+    }
+    rors.discard(None)
+    return sorted(rors)
+
+
+def _read_partition(args: Tuple[str, Optional[Sequence[str]]]) -> List[IndexRow]:
+    """Decompress one snapshot partition and project the works to index rows."""
+    path, types = args
+    rows = []
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            work = json.loads(line)
+            if types and work.get("type") not in types:
+                continue
+            projected = {field: work.get(field) for field in INDEX_FIELDS}
+            rows.append((
+                work["id"],
+                normalize_doi(projected["doi"]),
+                projected["type"],
+                projected["updated_date"],
+                json.dumps(projected),
+                work_rors(work),
+            ))
+    return rows
+
+
+class OpenAlexSnapshot:
+    """OpenAlex works snapshot (gzipped JSONL partitions) with a reusable SQLite index.
+
+    The first run decompresses the partitions in worker processes and indexes
+    the projected works by OpenAlex id, DOI and institution ROR. Later runs
+    only index partitions that are new or changed since the last run. Only
+    datasets are indexed by default, types=None indexes every work type so
+    the enrichment can look up any DOI, at the cost of a much larger index.
+    """
+
+    def __init__(self, directory: str, index_path: str = None, workers: int = None, types: Optional[Sequence[str]] = ("dataset",)):
+        self.directory = Path(directory)
+        self.index_path = index_path or str(self.directory / "roagg-openalex-index.sqlite")
+        self.workers = workers
+        self.types = tuple(types) if types else None
+        self.connection = sqlite3.connect(self.index_path, timeout=60, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS works (id TEXT PRIMARY KEY, doi TEXT, type TEXT, updated_date TEXT, work TEXT)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_works_doi ON works (doi)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS work_institutions (id TEXT, ror TEXT, PRIMARY KEY (ror, id))")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_work_institutions_id ON work_institutions (id)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS partitions (path TEXT PRIMARY KEY, size INTEGER, mtime REAL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+        self._lock = threading.Lock()
+        self._check_types()
+
+    def _check_types(self) -> None:
+        """Keep an index built for all the requested work types (or more), otherwise index every partition again."""
+        types = json.dumps(sorted(self.types) if self.types else None)
+        row = self.connection.execute("SELECT value FROM settings WHERE key = 'types'").fetchone()
+        if row is not None:
+            indexed = json.loads(row[0])
+            if indexed is None or (self.types and set(self.types) <= set(indexed)):
+                # new partitions are indexed for the same types as the rest
+                self.types = tuple(indexed) if indexed else None
+                return
+        with self.connection:
+            if row is not None:
+                logging.info(f"OpenAlex index {self.index_path} was built for types {row[0]}, indexing all partitions for {types}")
+                self.connection.execute("DELETE FROM partitions")
+            self.connection.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('types', ?)", (types,))
+
+    def partitions(self) -> List[Path]:
+        works = self.directory / "data" / "works"
+        root = works if works.is_dir() else self.directory
+        # updated_date=YYYY-MM-DD directories sort oldest first, so newer versions of a work replace older ones
+        return sorted(p for p in root.rglob("*.gz") if p.is_file())
+
+    def stale_partitions(self) -> List[Path]:
+        indexed = {path: (size, mtime) for path, size, mtime in self.connection.execute("SELECT path, size, mtime FROM partitions")}
+        stale = []
+        for path in self.partitions():
+            stat = path.stat()
+            if indexed.get(str(path)) != (stat.st_size, stat.st_mtime):
+                stale.append(path)
+        return stale
+
+    def build_index(self) -> int:
+        """Index new or changed partitions, returns the number of works written."""
+        stale = self.stale_partitions()
+        if not stale:
+            return 0
+        logging.info(f"Indexing {len(stale)} OpenAlex snapshot partitions into {self.index_path}")
+        start = time.perf_counter()
+        written = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for path, rows in zip(stale, executor.map(_read_partition, [(str(p), self.types) for p in stale])):
+                self._write_rows(rows)
+                stat = path.stat()
+                with self.connection:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO partitions (path, size, mtime) VALUES (?, ?, ?)",
+                        (str(path), stat.st_size, stat.st_mtime)
+                    )
+                written += len(rows)
+                logging.info(f"Indexed {path.name}: {len(rows)} works")
+        logging.info(f"Indexed {written} OpenAlex works in {time.perf_counter() - start:.1f}s")
+        return written
+
+    def _write_rows(self, rows: Iterable[IndexRow]) -> None:
+        with self.connection:
+            for work_id, doi, work_type, updated_date, work, rors in rows:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO works (id, doi, type, updated_date, work) VALUES (?, ?, ?, ?, ?)",
+                    (work_id, doi, work_type, updated_date, work)
+                )
+                self.connection.execute("DELETE FROM work_institutions WHERE id = ?", (work_id,))
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO work_institutions (id, ror) VALUES (?, ?)",
+                    [(work_id, ror) for ror in rors]
+                )
+
+    def works_for_ror(self, ror: str, work_type: str = "dataset", updated_since: str = None) -> List[dict]:
+        """Works with an author affiliated to the ROR, in the shape of OpenAlex API results."""
+        sql = (
+            "SELECT works.work FROM works JOIN work_institutions ON works.id = work_institutions.id "
+            "WHERE work_institutions.ror = ?"
+        )
+        params = [ror]
+        if work_type:
+            sql += " AND works.type = ?"
+            params.append(work_type)
+        if updated_since:
+            sql += " AND works.updated_date >= ?"
+            params.append(updated_since[:10])
+        sql += " ORDER BY works.id"
+        with self._lock:
+            self.build_index()
+            return [json.loads(work) for work, in self.connection.execute(sql, params)]
+
+    def lookup(self, dois: Iterable[str]) -> Dict[str, dict]:
+        """Indexed works by normalised DOI, without scanning the snapshot again."""
+        keys = sorted({normalize_doi(doi) for doi in dois if doi})
+        found = {}
+        # the enrichment looks up batches from several threads, next to the harvest with --parallel-providers
+        with self._lock:
+            self.build_index()
+            # stay below the SQLite limit on bound parameters
+            for offset in range(0, len(keys), 500):
+                batch = keys[offset:offset + 500]
+                placeholders = ", ".join("?" for _ in batch)
+                for doi, work in self.connection.execute(f"SELECT doi, work FROM works WHERE doi IN ({placeholders})", batch):
+                    found[doi] = json.loads(work)
+        return found
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,103 @@
+import sqlite3
+from dataclasses import fields
+from typing import Iterable, Iterator
+from roagg.helpers.utils import normalize_doi
+from roagg.models.research_output_item import ResearchOutputItem
+
+SQL_TYPES = {str: "TEXT", int: "INTEGER", bool: "INTEGER"}
+INDEXED_FIELDS = ["publicationYear", "resourceType", "inDataCite", "inOpenAire", "inOpenAlex", "inCrossRef"]
+
+
+class RecordStore:
+    """SQLite store of ResearchOutputItems keyed by ROR and normalised DOI.
+
+    Several organisations can share one database, every query is scoped to a ROR.
+    """
+
+    table = "records"
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.fields = fields(ResearchOutputItem)
+        # several organisations may write to the same database from a batch run
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.create_schema()
+
+    def create_schema(self) -> None:
+        columns = ", ".join(f'"{f.name}" {SQL_TYPES.get(f.type, "TEXT")}' for f in self.fields)
+        with self.connection:
+            self.connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} '
+                f'(ror TEXT NOT NULL, doiKey TEXT NOT NULL, {columns}, PRIMARY KEY (ror, doiKey))'
+            )
+            # add columns for fields introduced after the database was created
+            existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({self.table})")}
+            for f in self.fields:
+                if f.name not in existing:
+                    self.connection.execute(f'ALTER TABLE {self.table} ADD COLUMN "{f.name}" {SQL_TYPES.get(f.type, "TEXT")}')
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_ror ON {self.table} (ror)")
+            for name in INDEXED_FIELDS:
+                self.connection.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_{name} ON {self.table} (ror, "{name}")')
+
+    def upsert(self, ror: str, items: Iterable[ResearchOutputItem]) -> int:
+        """Insert or replace items by DOI in batched transactions, returns the number of rows written."""
+        names = [f.name for f in self.fields]
+        columns = ", ".join(f'"{name}"' for name in names)
+        placeholders = ", ".join("?" for _ in range(len(names) + 2))
+        updates = ", ".join(f'"{name}" = excluded."{name}"' for name in names)
+        sql = (
+            f"INSERT INTO {self.table} (ror, doiKey, {columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT (ror, doiKey) DO UPDATE SET {updates}"
+        )
+        written = 0
+        batch = []
+        for item in items:
+            key = normalize_doi(item.doi)
+            if not key:
+                continue
+            batch.append((ror or "", key, *(getattr(item, name) for name in names)))
+            if len(batch) >= self.batch_size:
+                written += self._write_batch(sql, batch)
+                batch = []
+        if batch:
+            written += self._write_batch(sql, batch)
+        return written
+
+    def _write_batch(self, sql: str, batch: list) -> int:
+        with self.connection:
+            self.connection.executemany(sql, batch)
+        return len(batch)
+
+    def _to_item(self, row: tuple) -> ResearchOutputItem:
+        values = {}
+        for f, value in zip(self.fields, row):
+            if f.type is bool and value is not None:
+                value = bool(value)
+            values[f.name] = value
+        return ResearchOutputItem(**values)
+
+    def iter_records(self, ror: str) -> Iterator[ResearchOutputItem]:
+        """Stream the records of one organisation in DOI order."""
+        columns = ", ".join(f'"{f.name}"' for f in self.fields)
+        cursor = self.connection.execute(
+            f"SELECT {columns} FROM {self.table} WHERE ror = ? ORDER BY doiKey", (ror or "",)
+        )
+        for row in cursor:
+            yield self._to_item(row)
+
+    def clear(self, ror: str) -> None:
+        with self.connection:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE ror = ?", (ror or "",))
+
+    def count(self, ror: str) -> int:
+        return self.connection.execute(f"SELECT COUNT(*) FROM {self.table} WHERE ror = ?", (ror or "",)).fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,254 @@
+import csv
+import gzip
+import json
+import os
+from abc import ABC, abstractmethod
+from dataclasses import fields
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+from roagg.models.research_output_item import ResearchOutputItem
+
+# compression by file suffix, e.g. data/kth.csv.gz
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+
+
+def zstd_module():
+    """zstd from the standard library (Python 3.14) or the zstandard package (pip install roagg[zstd])."""
+    try:
+        from compression import zstd
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard
+    except ImportError as e:
+        raise RuntimeError("zstd compressed output needs the zstandard package: pip install roagg[zstd]") from e
+
+
+def open_text(path: str, mode: str, compression: Optional[str] = None) -> IO[str]:
+    """Open a text file for "r" or "w", gzip or zstd compressed."""
+    if compression == "gzip":
+        return gzip.open(path, f"{mode}t", encoding="utf-8", newline="")
+    if compression == "zstd":
+        return zstd_module().open(path, f"{mode}t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def split_suffix(path: str) -> Tuple[str, Optional[str]]:
+    """Format suffix and compression of an output path, data/kth.jsonl.gz -> (".jsonl", "gzip")."""
+    root, suffix = os.path.splitext(str(path))
+    compression = COMPRESSION_SUFFIXES.get(suffix.lower())
+    if compression:
+        root, suffix = os.path.splitext(root)
+    return suffix.lower(), compression
+
+
+class OutputWriter(ABC):
+    """Writes ResearchOutputItems one at a time, to a temporary file that replaces the output on commit.
+
+    Use as a context manager: the output is only replaced when the block
+    completes, after an error the temporary file is removed and an earlier
+    output is left as it was.
+    """
+    suffixes: Tuple[str, ...] = ()
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.path = str(path)
+        self.tmp_path = f"{self.path}.tmp"
+        self.compression = compression
+        self.fields = [f.name for f in fields(ResearchOutputItem)]
+        self.count = 0
+
+    @classmethod
+    def check(cls, compression: Optional[str] = None) -> None:
+        """Raise before a run when the format or compression needs a package that is not installed."""
+        if compression == "zstd":
+            zstd_module()
+
+    def __enter__(self) -> "OutputWriter":
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self.close()
+        finally:
+            if exc_type is None:
+                os.replace(self.tmp_path, self.path)
+            elif os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+    @abstractmethod
+    def open(self) -> None:
+        """Open the temporary file."""
+
+    @abstractmethod
+    def write(self, item: ResearchOutputItem) -> None:
+        """Write one item and count it."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Flush and close the temporary file."""
+
+    def write_all(self, items: Iterable[ResearchOutputItem]) -> int:
+        for item in items:
+            self.write(item)
+        return self.count
+
+
+class CsvWriter(OutputWriter):
+    """CSV with one column per ResearchOutputItem field, booleans as 1/0 and missing values empty."""
+    suffixes = (".csv",)
+
+    def open(self) -> None:
+        self.file = open_text(self.tmp_path, "w", self.compression)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.fields)
+
+    def write(self, item: ResearchOutputItem) -> None:
+        self.writer.writerow([format_csv_value(getattr(item, name)) for name in self.fields])
+        self.count += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class JsonlWriter(OutputWriter):
+    """One JSON object per line with the ResearchOutputItem fields, missing values as null."""
+    suffixes = (".jsonl", ".ndjson")
+
+    def open(self) -> None:
+        self.file = open_text(self.tmp_path, "w", self.compression)
+
+    def write(self, item: ResearchOutputItem) -> None:
+        self.file.write(json.dumps({name: getattr(item, name) for name in self.fields}, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter(OutputWriter):
+    """Parquet with typed columns, written in row groups of batch_size rows (pip install roagg[parquet])."""
+    suffixes = (".parquet",)
+    batch_size = 50000
+
+    @classmethod
+    def check(cls, compression: Optional[str] = None) -> None:
+        cls.pyarrow()
+
+    @staticmethod
+    def pyarrow():
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            return pyarrow
+        except ImportError as e:
+            raise RuntimeError("Parquet output needs pyarrow: pip install roagg[parquet]") from e
+
+    def open(self) -> None:
+        pa = self.pyarrow()
+        types = {bool: pa.bool_(), int: pa.int64(), str: pa.string()}
+        self.field_types = {f.name: f.type for f in fields(ResearchOutputItem)}
+        self.schema = pa.schema([(f.name, types[f.type]) for f in fields(ResearchOutputItem)])
+        # Parquet compresses the column chunks itself, .parquet.zst picks zstd instead of the default snappy
+        self.writer = pa.parquet.ParquetWriter(self.tmp_path, self.schema, compression=self.compression or "snappy")
+        self.rows: List[dict] = []
+
+    def write(self, item: ResearchOutputItem) -> None:
+        self.rows.append({name: self.column_value(name, getattr(item, name)) for name in self.fields})
+        self.count += 1
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def column_value(self, name: str, value):
+        # publicationYear is an int from DataCite and a string from OpenAire and OpenAlex
+        if self.field_types[name] is int and isinstance(value, str):
+            return int(value) if value.isdigit() else None
+        return value
+
+    def flush(self) -> None:
+        if self.rows:
+            self.writer.write_table(self.pyarrow().Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+
+# output formats by name, add a writer here to support a new format
+WRITERS: Dict[str, Type[OutputWriter]] = {
+    "csv": CsvWriter,
+    "jsonl": JsonlWriter,
+    "parquet": ParquetWriter,
+}
+
+
+def format_csv_value(value):
+    """Format values for CSV output"""
+    if value is None:
+        return ""
+    elif isinstance(value, bool):
+        return 1 if value else 0
+    else:
+        return value
+
+
+def writer_for(path: str, output_format: str = None) -> OutputWriter:
+    """Writer for an output path, the format from output_format or the file suffix (CSV when neither says)."""
+    suffix, compression = split_suffix(path)
+    if output_format is None:
+        output_format = next((name for name, writer in WRITERS.items() if suffix in writer.suffixes), "csv")
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown output format {output_format}, one of {', '.join(WRITERS)}")
+    return WRITERS[output_format](path, compression)
+
+
+def check_output(path: str, output_format: str = None) -> None:
+    """Fail early when writing the output would need a package that is not installed."""
+    writer = writer_for(path, output_format)
+    writer.check(writer.compression)
+
+
+def write_output(items: Iterable[ResearchOutputItem], path: str, output_format: str = None) -> int:
+    """Stream the items to path, returns the number of rows written."""
+    with writer_for(path, output_format) as writer:
+        return writer.write_all(items)
+
+
+def read_output(path: str, output_format: str = None) -> Iterator[ResearchOutputItem]:
+    """Read an output written by write_output back into ResearchOutputItems."""
+    writer = writer_for(path, output_format)
+    dataclass_fields = {field.name: field for field in fields(ResearchOutputItem)}
+    if isinstance(writer, ParquetWriter):
+        parquet = writer.pyarrow().parquet.ParquetFile(path)
+        for batch in parquet.iter_batches():
+            for row in batch.to_pylist():
+                yield ResearchOutputItem(**{name: value for name, value in row.items() if name in dataclass_fields})
+        return
+
+    def parse_value(field, value):
+        if value == "":
+            return "" if field.default == "" else None
+        if field.type is bool:
+            return value == "1"
+        if field.type is int:
+            return int(value)
+        return value
+
+    with open_text(path, "r", writer.compression) as file:
+        if isinstance(writer, JsonlWriter):
+            for line in file:
+                if line.strip():
+                    row = json.loads(line)
+                    yield ResearchOutputItem(**{name: value for name, value in row.items() if name in dataclass_fields})
+            return
+        for row in csv.DictReader(file):
+            yield ResearchOutputItem(**{
+                name: parse_value(dataclass_fields[name], value)
+                for name, value in row.items() if name in dataclass_fields
+            })
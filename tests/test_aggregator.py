@@ -0,0 +1,62 @@
+import threading
+from roagg.aggregator import read_csv, run_harvests, write_csv
+from roagg.helpers.state import high_water_mark
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.models.result_index import ResultIndex
+
+
+class TestRunHarvests:
+    """Test cases for the run_harvests function."""
+
+    def test_serial_results_in_provider_order(self):
+        """Test that results and timings keep the order of the harvests."""
+        results, timings = run_harvests({"b": lambda: [1], "a": lambda: [2, 3]})
+        assert results == {"b": [1], "a": [2, 3]}
+        assert list(results) == ["b", "a"]
+        assert list(timings) == ["b", "a"]
+
+    def test_parallel_matches_serial(self):
+        """Test that the parallel mode gives the same results as the serial mode."""
+        harvests = {"DataCite": lambda: ["x"], "OpenAire": lambda: [], "OpenAlex": lambda: ["y", "z"]}
+        serial, _ = run_harvests(harvests)
+        parallel, _ = run_harvests(harvests, parallel=True)
+        assert list(parallel.items()) == list(serial.items())
+
+    def test_parallel_runs_concurrently(self):
+        """Test that the parallel mode has all harvests in flight at the same time."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def harvest():
+            barrier.wait()
+            return []
+
+        results, timings = run_harvests({"a": harvest, "b": harvest, "c": harvest}, parallel=True)
+        assert results == {"a": [], "b": [], "c": []}
+        assert all(seconds >= 0 for seconds in timings.values())
+
+
+class TestIncremental:
+    """Test cases for the pieces of the incremental harvest."""
+
+    def test_csv_round_trip(self, tmp_path):
+        items = [
+            ResearchOutputItem(doi="10.1234/a", publicationYear=2024, title="A", inDataCite=True, dataCiteViewCount=3),
+            ResearchOutputItem(doi="10.1234/b", isLatestVersion=False, updatedAt="2025-01-02T03:04:05Z"),
+        ]
+        path = tmp_path / "out.csv"
+        write_csv(items, path)
+        assert read_csv(path) == items
+
+    def test_merge_replaces_datacite_fields_and_keeps_enrichment(self):
+        previous = ResultIndex([ResearchOutputItem(doi="10.1234/A", title="old", inOpenAlex=True, openAlexCitedByCount=7)])
+        previous.upsert(ResearchOutputItem(doi="10.1234/a", title="new", inDataCite=True), "DataCite")
+        previous.upsert(ResearchOutputItem(doi="10.1234/b", title="added", inDataCite=True), "DataCite")
+        assert [item.title for item in previous] == ["new", "added"]
+        assert previous.get("10.1234/a").openAlexCitedByCount == 7
+        assert previous.get("10.1234/a").inOpenAlex is True
+
+    def test_high_water_mark(self):
+        assert high_water_mark(["2024-01-01T00:00:00Z", "", None, "2025-02-01T00:00:00Z"]) == "2025-02-01T00:00:00Z"
+        assert high_water_mark([], "2024-01-01") == "2024-01-01"
+        assert high_water_mark(["2023-01-01"], "2024-01-01") == "2024-01-01"
+        assert high_water_mark([]) is None
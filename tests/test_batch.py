@@ -0,0 +1,58 @@
+import argparse
+import threading
+import roagg.batch
+from roagg.aggregator import HarvestOptions
+from roagg.batch import BatchEntry, read_manifest, run_batch
+from roagg.cli import add_harvest_arguments
+
+
+class TestBatch:
+    """Test cases for the multi-organisation batch mode."""
+
+    def test_read_manifest(self, tmp_path):
+        manifest = tmp_path / "manifest.csv"
+        manifest.write_text(
+            "ror,name_txt,output\n"
+            "https://ror.org/040wg7k59,tests/name-lists/chalmers.txt,data/chalmers.csv\n"
+            "https://ror.org/05s754026,,data/kau.csv\n"
+        )
+        entries = read_manifest(manifest)
+        assert [e.ror for e in entries] == ["https://ror.org/040wg7k59", "https://ror.org/05s754026"]
+        assert str(entries[0].name_txt) == "tests/name-lists/chalmers.txt"
+        assert entries[1].name_txt is None
+
+    def test_run_batch_keeps_order_and_reports_failures(self, monkeypatch):
+        calls = []
+        lock = threading.Lock()
+
+        def fake_aggregate(names, ror, output, options, datacite_records=None):
+            with lock:
+                calls.append((ror, options, datacite_records))
+            if ror.endswith("bad"):
+                raise RuntimeError("boom")
+
+        monkeypatch.setattr(roagg.batch, "aggregate", fake_aggregate)
+        entries = [BatchEntry(ror=f"https://ror.org/{n}", output=f"{n}.csv") for n in ("a", "bad", "c")]
+        options = HarvestOptions(parallel_providers=True)
+        results = run_batch(entries, workers=2, options=options)
+        assert [r.entry.ror for r in results] == [e.ror for e in entries]
+        assert [r.error for r in results] == [None, "boom", None]
+        assert all(call[1:] == (options, None) for call in calls)
+
+    def test_harvest_arguments(self):
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--datacite-dump", action="append")
+        add_harvest_arguments(parser)
+        args = parser.parse_args([
+            "--incremental", "--full-records", "--datacite-shard-size", "10000", "--cache-max-size", "64",
+            "--api-url", "ror=http://localhost:8000/ror", "--cursor-max-age", "60", "--datacite-dump", "dump",
+        ])
+        options = HarvestOptions.from_args(args)
+        assert options.incremental and options.datacite_shard_size == 10000
+        assert options.project_fields is False
+        assert options.api_urls == {"ror": "http://localhost:8000/ror/"}
+        assert options.max_cursor_age == 60
+        assert options.datacite_dump == ["dump"]
+        # roagg-batch has no --state-file or --checkpoint-file, every output gets its own
+        assert options.state_file is None and options.checkpoint_file is None
+        assert args.cache_max_size == 64
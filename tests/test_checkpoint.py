@@ -0,0 +1,87 @@
+import json
+import pytest
+from roagg.helpers.checkpoint import Checkpoint
+from roagg.helpers.http import HttpError
+from roagg.helpers.pager import paginate
+
+PAGES = {"start": ([1, 2], "c2", 5), "c2": ([3, 4], "c3", 5), "c3": ([5], None, 5)}
+
+
+class FlakyPages:
+    """Serves PAGES, failing once for the cursors in fail_on."""
+
+    def __init__(self, fail_on=(), error=None):
+        self.fail_on = set(fail_on)
+        self.error = error or OSError("connection reset")
+        self.requested = []
+
+    def __call__(self, cursor):
+        self.requested.append(cursor)
+        if cursor in self.fail_on:
+            self.fail_on.discard(cursor)
+            raise self.error
+        return PAGES[cursor]
+
+
+def harvest(path, fetch, resume=False, **options):
+    checkpoint = Checkpoint(str(path), resume=resume, **options)
+    try:
+        return [record for page in paginate(fetch, "start", "test", checkpoint, "key") for record in page]
+    finally:
+        checkpoint.close()
+
+
+class TestCheckpoint:
+    """Test cases for checkpointed cursor pagination."""
+
+    def test_without_checkpoint(self):
+        assert [r for page in paginate(FlakyPages(), "start", "test") for r in page] == [1, 2, 3, 4, 5]
+
+    def test_resume_continues_from_last_page(self, tmp_path):
+        path = tmp_path / "run.checkpoint.jsonl"
+        with pytest.raises(OSError):
+            harvest(path, FlakyPages(fail_on={"c3"}))
+        fetch = FlakyPages()
+        assert harvest(path, fetch, resume=True) == [1, 2, 3, 4, 5]
+        assert fetch.requested == ["c3"]
+
+    def test_completed_query_is_not_fetched_again(self, tmp_path):
+        path = tmp_path / "run.checkpoint.jsonl"
+        harvest(path, FlakyPages())
+        fetch = FlakyPages()
+        assert harvest(path, fetch, resume=True) == [1, 2, 3, 4, 5]
+        assert fetch.requested == []
+
+    def test_without_resume_the_checkpoint_is_truncated(self, tmp_path):
+        path = tmp_path / "run.checkpoint.jsonl"
+        harvest(path, FlakyPages())
+        fetch = FlakyPages()
+        harvest(path, fetch)
+        assert fetch.requested == ["start", "c2", "c3"]
+
+    def test_rejected_cursor_restarts_query(self, tmp_path):
+        path = tmp_path / "run.checkpoint.jsonl"
+        with pytest.raises(OSError):
+            harvest(path, FlakyPages(fail_on={"c3"}))
+        fetch = FlakyPages(fail_on={"c3"}, error=HttpError("http://api/c3", 400, "Bad Request"))
+        assert harvest(path, fetch, resume=True) == [1, 2, 3, 4, 5]
+        assert fetch.requested == ["c3", "start", "c2", "c3"]
+
+    def test_old_cursor_restarts_query(self, tmp_path):
+        path = tmp_path / "run.checkpoint.jsonl"
+        with pytest.raises(OSError):
+            harvest(path, FlakyPages(fail_on={"c3"}))
+        fetch = FlakyPages()
+        assert harvest(path, fetch, resume=True, max_cursor_age=-1) == [1, 2, 3, 4, 5]
+        assert fetch.requested == ["start", "c2", "c3"]
+
+    def test_partial_last_line_is_dropped(self, tmp_path):
+        path = tmp_path / "run.checkpoint.jsonl"
+        with pytest.raises(OSError):
+            harvest(path, FlakyPages(fail_on={"c3"}))
+        with open(path, "a") as file:
+            file.write('{"key": "key", "cursor": nu')
+        fetch = FlakyPages()
+        assert harvest(path, fetch, resume=True) == [1, 2, 3, 4, 5]
+        assert fetch.requested == ["c3"]
+        assert all(json.loads(line) for line in path.read_text().splitlines())
@@ -0,0 +1,227 @@
+import urllib.parse
+import pytest
+from roagg.helpers.fixtures import ROR, datacite_page, name_list
+from roagg.providers.datacite import DataCiteAPI, DataCiteShard, encoded_length, resource_type_general
+
+
+def make_record(doi: str, creators: list = None) -> dict:
+    return {
+        "id": doi,
+        "attributes": {
+            "doi": doi,
+            "titles": [{"title": f"Dataset {doi}"}],
+            "types": {"resourceTypeGeneral": "Dataset"},
+            "publisher": {"name": "Some Publisher"},
+            "publicationYear": 2024,
+            "creators": creators or [],
+            "contributors": [],
+            "relatedIdentifiers": [],
+            "versionCount": 0,
+            "versionOfCount": 0,
+        },
+        "relationships": {"client": {"data": {"id": "snd.gu"}}},
+    }
+
+
+@pytest.fixture
+def paged_api(monkeypatch):
+    """DataCiteAPI with get_api_result serving two fake pages."""
+    pages = {
+        "page-2": {"data": [make_record("10.1234/c")], "meta": {"total": 3}, "links": {}},
+    }
+    first = {"data": [make_record("10.1234/a"), make_record("10.1234/b")], "meta": {"total": 3}, "links": {"next": "page-2"}}
+    requested = []
+
+    def get_api_result(url):
+        requested.append(url)
+        return pages.get(url, first)
+
+    monkeypatch.setattr(DataCiteAPI, "get_api_result", staticmethod(get_api_result))
+    api = DataCiteAPI(name=["Göteborgs universitet"], ror="https://ror.org/01tm6cn81")
+    api.requested = requested
+    return api
+
+
+class TestDataCitePaging:
+    """Test cases for the page-at-a-time DataCite harvest."""
+
+    def test_iter_pages_yields_each_page(self, paged_api):
+        pages = list(paged_api.iter_pages())
+        assert [len(page) for page in pages] == [2, 1]
+        assert paged_api.requested[1] == "page-2"
+
+    def test_iter_records_maps_records(self, paged_api):
+        dois = [record.doi for record in paged_api.iter_records()]
+        assert dois == ["10.1234/a", "10.1234/b", "10.1234/c"]
+
+    def test_iter_records_is_lazy(self, paged_api):
+        paged_api.prefetch = 0
+        records = paged_api.iter_records()
+        next(records)
+        assert len(paged_api.requested) == 1
+
+    def test_all_returns_raw_records(self, paged_api):
+        assert [r["id"] for r in paged_api.all()] == ["10.1234/a", "10.1234/b", "10.1234/c"]
+
+
+class TestDataCiteQuery:
+    """Test cases for the DataCite query string."""
+
+    def test_updated_since_limits_query(self):
+        api = DataCiteAPI(ror="https://ror.org/01tm6cn81", updated_since="2025-03-04T05:06:07Z")
+        query = api.get_query_string()
+        assert query.startswith("(")
+        assert query.endswith(") AND updated:[2025-03-04 TO *]")
+
+    def test_no_updated_since(self):
+        assert "updated:" not in DataCiteAPI(ror="https://ror.org/01tm6cn81").get_query_string()
+
+
+class TestDataCiteShards:
+    """Test cases for the sharded DataCite harvest."""
+
+    def test_resource_type_general(self):
+        assert resource_type_general("dataset") == "Dataset"
+        assert resource_type_general("physical-object") == "PhysicalObject"
+
+    def test_plan_splits_by_year_then_client(self, monkeypatch):
+        def get_api_result(url):
+            if "2024" in url:
+                return {"meta": {"total": 12, "clients": [{"id": "snd.gu", "count": 7}, {"id": "kth.zenodo", "count": 5}]}}
+            return {"meta": {"total": 30, "published": [{"id": "2024", "count": 12}, {"id": "2023", "count": 8}]}}
+
+        monkeypatch.setattr(DataCiteAPI, "get_api_result", staticmethod(get_api_result))
+        api = DataCiteAPI(ror="https://ror.org/01tm6cn81")
+        shards = api.plan_shards(max_shard_size=10)
+        assert [(s.label, s.count) for s in shards] == [
+            ("publicationYear=2024,client_id=snd.gu", 7),
+            ("publicationYear=2024,client_id=kth.zenodo", 5),
+            ("publicationYear=2023", 8),
+            ("publicationYear=other", 10),
+        ]
+        assert shards[0].query.endswith(') AND publicationYear:"2024") AND client_id:"snd.gu"')
+        assert shards[3].query.endswith(' AND NOT publicationYear:("2024" OR "2023")')
+
+    def test_small_query_is_one_shard(self, monkeypatch):
+        monkeypatch.setattr(DataCiteAPI, "get_api_result", staticmethod(lambda url: {"meta": {"total": 5}}))
+        shards = DataCiteAPI(ror="https://ror.org/01tm6cn81").plan_shards(max_shard_size=10)
+        assert [(s.label, s.count) for s in shards] == [("all", 5)]
+
+    def test_sharded_harvest_deduplicates_in_plan_order(self, monkeypatch):
+        pages = {
+            "q1": [[make_record("10.1234/a"), make_record("10.1234/b")]],
+            "q2": [[make_record("10.1234/B"), make_record("10.1234/c")]],
+        }
+        api = DataCiteAPI(ror="https://ror.org/01tm6cn81")
+        monkeypatch.setattr(api, "plan_shards", lambda size: [DataCiteShard("q1", 2, "one"), DataCiteShard("q2", 2, "two")])
+        monkeypatch.setattr(api, "iter_pages", lambda query, label: iter(pages[query]))
+        assert [r.doi for r in api.iter_records_sharded(max_shard_size=2, workers=2)] == ["10.1234/a", "10.1234/b", "10.1234/c"]
+
+
+class TestDataCiteQueryPlan:
+    """Test cases for splitting a long DataCite query into sub-queries."""
+
+    def test_short_query_is_not_split(self):
+        api = DataCiteAPI(name=["Göteborgs universitet"], ror="https://ror.org/01tm6cn81")
+        assert api.plan_queries(max_query_length=10000) == [DataCiteShard(api.get_query_string(), 0)]
+
+    def batched(self, api, queries, label, parts, clause):
+        """Parts of the sub-queries with label, checking each query matches its parts."""
+        batched = []
+        for query in (q for q in queries if q.label.startswith(f"{label} ")):
+            first, last = map(int, query.label.split()[1].split("-"))
+            assert query.query == api.limit_updated(clause(parts[first - 1:last]))
+            batched.extend(parts[first - 1:last])
+        return batched
+
+    def test_long_query_is_split_by_ror_and_name_batches(self):
+        api = DataCiteAPI(name=name_list(40), ror="https://ror.org/01tm6cn81", updated_since="2025-03-04")
+        queries = api.plan_queries(max_query_length=1500)
+        assert queries[0].label == "ror 1-12"
+        assert len(queries) > 2
+        assert all(encoded_length(q.query) <= 1500 for q in queries)
+        assert all(q.query.endswith("AND updated:[2025-03-04 TO *]") for q in queries)
+        # the batches cover the name list in order
+        assert self.batched(api, queries, "names", api.name, api.name_clause) == api.name
+
+    def test_ror_terms_are_split_to_fit(self):
+        api = DataCiteAPI(name=name_list(40), ror="https://ror.org/01tm6cn81")
+        queries = api.plan_queries(max_query_length=500)
+        assert all(encoded_length(q.query) <= 500 for q in queries)
+        assert [q.label for q in queries if q.label.startswith("ror")] == ["ror 1-5", "ror 6-12"]
+        terms = api.ror_terms()
+        assert self.batched(api, queries, "ror", terms, " OR ".join) == terms
+
+    def test_name_longer_than_limit_gets_own_query(self, caplog):
+        api = DataCiteAPI(name=["a" * 300, "b", "c"])
+        assert [q.label for q in api.plan_queries(max_query_length=200)] == ["names 1-1", "names 2-3"]
+        assert "sub-query names 1-1 (aaa" in caplog.text
+
+    def test_planned_harvest_unions_by_doi(self, monkeypatch):
+        api = DataCiteAPI(name=name_list(10), ror="https://ror.org/01tm6cn81")
+        queries = api.plan_queries(max_query_length=700)
+        pages = {q.query: [[make_record(f"10.1234/{i}"), make_record("10.1234/shared")]] for i, q in enumerate(queries)}
+        monkeypatch.setattr(api, "iter_pages", lambda query, label: iter(pages[query]))
+        dois = [r.doi for r in api.iter_records_planned(max_query_length=700, workers=3)]
+        assert dois == ["10.1234/0", "10.1234/shared"] + [f"10.1234/{i}" for i in range(1, len(queries))]
+
+
+    def test_records_by_doi_in_pages_of_at_most_max_page_size(self, monkeypatch, caplog):
+        api = DataCiteAPI()
+        monkeypatch.setattr(api, "max_page_size", 2)
+        urls = []
+        monkeypatch.setattr(api, "get_api_result", lambda url: urls.append(url) or {"data": []})
+        api.get_records_by_doi(["10.1234/1", "10.1234/2", '10.1234/"3"', "10.1234/4"])
+        queries = [dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))["query"] for url in urls]
+        assert queries == ['doi:("10.1234/1" OR "10.1234/2")', 'doi:("10.1234/4")']
+        assert 'skips 1 DOIs that cannot be quoted in a query: 10.1234/"3"' in caplog.text
+
+class TestDataCiteMappingWorkers:
+    """Test cases for mapping DataCite pages in worker processes."""
+
+    def pages(self):
+        records = datacite_page(count=120, fan_out=5, seed=3)["data"]
+        return [records[i:i + 25] for i in range(0, len(records), 25)]
+
+    def test_same_items_in_same_order_as_serial(self):
+        serial = DataCiteAPI(name=name_list(20), ror=ROR)
+        pooled = DataCiteAPI(name=name_list(20), ror=ROR, mapping_workers=2)
+        try:
+            expected = [record for records in serial.map_pages(iter(self.pages())) for record in records]
+            mapped = [record for records in pooled.map_pages(iter(self.pages())) for record in records]
+        finally:
+            pooled.close()
+        assert mapped == expected
+        assert any(record.haveCreatorAffiliation for record in mapped)
+        assert pooled.mapping_seconds > 0
+
+    def test_iter_records_with_workers(self, paged_api):
+        paged_api.mapping_workers = 2
+        try:
+            dois = [record.doi for record in paged_api.iter_records()]
+        finally:
+            paged_api.close()
+        assert dois == ["10.1234/a", "10.1234/b", "10.1234/c"]
+
+
+class TestDataCiteProjection:
+    """Test cases for the DataCite sparse fieldset."""
+
+    def params(self, url):
+        return dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+
+    def test_requests_only_mapped_fields(self):
+        params = self.params(DataCiteAPI(ror="https://ror.org/01tm6cn81").api_request_url())
+        fields = params["fields[dois]"].split(",")
+        assert set(make_record("10.1234/a")["attributes"]) <= set(fields)
+        assert "client" in fields
+        assert params["disable-facets"] == "true"
+
+    def test_facets_only_when_asked(self):
+        api = DataCiteAPI(ror="https://ror.org/01tm6cn81")
+        assert self.params(api.api_request_url(page_size=0, facets=True))["disable-facets"] == "false"
+
+    def test_full_records(self):
+        params = self.params(DataCiteAPI(ror="https://ror.org/01tm6cn81", project_fields=False).api_request_url())
+        assert "fields[dois]" not in params
+        assert params["disable-facets"] == "false"
@@ -0,0 +1,56 @@
+import gzip
+import json
+from roagg.models.research_output_table import ResearchOutputTable
+from roagg.providers.datacite import DataCiteAPI
+from roagg.providers.datacite_dump import DataCiteDump, normalize_dump_record
+from test_datacite import make_record
+
+GU = "https://ror.org/01tm6cn81"
+KTH = "https://ror.org/026vcq606"
+
+
+def affiliated(doi, name=None, ror=None):
+    affiliation = {"name": name} if name else {"name": "Somewhere", "affiliationIdentifier": ror}
+    return make_record(doi, creators=[{"name": "Doe, Jane", "nameIdentifiers": [], "affiliation": [affiliation]}])
+
+
+def write_dump(path, records):
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+
+class TestDataCiteDump:
+    """Test cases for the offline DataCite data file source."""
+
+    def test_matches_record(self):
+        api = DataCiteAPI(name=["Göteborgs universitet"], ror=GU)
+        assert api.matches_record(affiliated("10.1/a", ror=GU))
+        assert api.matches_record(affiliated("10.1/b", ror="01tm6cn81"))
+        assert api.matches_record(affiliated("10.1/c", name="Göteborgs universitet, Sahlgrenska"))
+        assert not api.matches_record(affiliated("10.1/d", name="KTH"))
+
+    def test_normalize_string_publisher_and_affiliation(self):
+        record = make_record("10.1/a", creators=[{"name": "Doe", "affiliation": ["KTH"]}])
+        record["attributes"]["publisher"] = "Zenodo"
+        del record["relationships"]
+        record["attributes"]["clientId"] = "cern.zenodo"
+        record = normalize_dump_record(record)
+        assert record["attributes"]["publisher"] == {"name": "Zenodo"}
+        assert record["attributes"]["creators"][0]["affiliation"] == [{"name": "KTH"}]
+        assert record["relationships"]["client"]["data"]["id"] == "cern.zenodo"
+
+    def test_scan_many_organisations_in_one_pass(self, tmp_path):
+        write_dump(tmp_path / "part-1.jsonl.gz", [affiliated("10.1/a", ror=GU), affiliated("10.1/b", name="KTH Royal Institute of Technology")])
+        write_dump(tmp_path / "part-2.jsonl.gz", [affiliated("10.1/c", ror=GU), affiliated("10.1/A", ror=GU), affiliated("10.1/x", name="Elsewhere")])
+        organisations = [(["Göteborgs universitet"], GU), (["KTH"], KTH)]
+        gu, kth = DataCiteDump([tmp_path], organisations, workers=2).scan()
+        assert isinstance(gu, ResearchOutputTable)
+        assert [r.doi for r in gu] == ["10.1/a", "10.1/c"]
+        assert [r.doi for r in kth] == ["10.1/b"]
+
+    def test_same_items_as_get_record(self, tmp_path):
+        record = affiliated("10.1/a", ror=GU)
+        write_dump(tmp_path / "part.jsonl.gz", [record])
+        [items] = DataCiteDump([tmp_path / "part.jsonl.gz"], [([], GU)], workers=1).scan()
+        assert list(items) == [DataCiteAPI(ror=GU).get_record(record)]
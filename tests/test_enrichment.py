@@ -0,0 +1,89 @@
+from roagg.enrichment import batches, enrich, missing_dois
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.models.result_index import ResultIndex
+from roagg.providers.datacite import DataCiteAPI
+from roagg.providers.openalex import OpenAlexAPI
+
+
+class FakeClient:
+    """Stand-in for HttpClient, never called because the lookups are replaced."""
+
+
+def make_results() -> ResultIndex:
+    results = ResultIndex()
+    for n in range(5):
+        results.upsert(ResearchOutputItem(doi=f"10.1234/dc.{n}", title=f"DataCite {n}", inDataCite=True), "DataCite")
+    for n in range(3):
+        results.upsert(ResearchOutputItem(doi=f"10.1234/oa.{n}", title=f"OpenAlex {n}", inOpenAlex=True), "OpenAlex")
+    return results
+
+
+class TestEnrichment:
+    """Test cases for the batched cross-provider enrichment."""
+
+    def test_missing_dois(self):
+        results = make_results()
+        results.upsert(ResearchOutputItem(doi=None, title="No DOI"), "OpenAire")
+        assert missing_dois(results, "inDataCite") == ["10.1234/oa.0", "10.1234/oa.1", "10.1234/oa.2"]
+        assert len(missing_dois(results, "inOpenAlex")) == 5
+
+    def test_batches(self):
+        assert batches(list("abcde"), 2) == [["a", "b"], ["c", "d"], ["e"]]
+
+    def test_one_lookup_per_batch(self):
+        results = make_results()
+        datacite = DataCiteAPI(client=FakeClient())
+        openalex = OpenAlexAPI(client=FakeClient())
+        calls = []
+
+        def datacite_lookup(dois):
+            calls.append(("DataCite", dois))
+            # one DOI is unknown, one is not part of the results
+            return [ResearchOutputItem(doi=doi.upper(), title="DataCite title", dataCiteClientId="snd.gu", inDataCite=True) for doi in dois[:1] + ["10.1234/other"]]
+
+        def openalex_lookup(dois):
+            calls.append(("OpenAlex", dois))
+            return [ResearchOutputItem(doi=doi, title="OpenAlex title", openAlexCitedByCount=3, inOpenAlex=True) for doi in dois]
+
+        datacite.get_records_by_doi = datacite_lookup
+        openalex.get_items_by_doi = openalex_lookup
+        enriched = enrich(results, datacite, openalex, batch_size=2, workers=3)
+        assert [(provider, len(dois)) for provider, dois in sorted(calls)] == [("DataCite", 2), ("DataCite", 1), ("OpenAlex", 2), ("OpenAlex", 2), ("OpenAlex", 1)]
+        assert enriched == {"DataCite": 2, "OpenAlex": 5}
+        assert len(results) == 8
+        assert results.get("10.1234/oa.0").dataCiteClientId == "snd.gu"
+        assert results.get("10.1234/dc.0").openAlexCitedByCount == 3
+
+    def test_only_missing_fields_are_filled(self):
+        results = make_results()
+        datacite = DataCiteAPI(client=FakeClient())
+        openalex = OpenAlexAPI(client=FakeClient())
+        datacite.get_records_by_doi = lambda dois: [
+            ResearchOutputItem(doi=doi, title="DataCite title", resourceType="Dataset", haveCreatorAffiliation=True, inDataCite=True) for doi in dois
+        ]
+        openalex.get_items_by_doi = lambda dois: [
+            ResearchOutputItem(doi=doi, title="OpenAlex title", openAlexCitedByCount=3, haveCreatorAffiliation=True, inOpenAlex=True) for doi in dois
+        ]
+        enrich(results, datacite, openalex)
+        found_in_openalex = results.get("10.1234/oa.0")
+        assert found_in_openalex.title == "OpenAlex 0"
+        assert found_in_openalex.resourceType == "Dataset"
+        assert found_in_openalex.haveCreatorAffiliation is False
+        # the provenance flags still say which providers found the record for the organisation
+        assert found_in_openalex.inDataCite is None
+        assert results.get("10.1234/dc.0").inOpenAlex is None
+        assert results.get("10.1234/dc.0").openAlexCitedByCount == 3
+        assert results.source("10.1234/dc.0", "openAlexCitedByCount") == "OpenAlex"
+
+    def test_failed_batch_is_skipped(self):
+        results = make_results()
+        datacite = DataCiteAPI(client=FakeClient())
+        openalex = OpenAlexAPI(client=FakeClient())
+
+        def failing(dois):
+            raise RuntimeError("Failed run DataCite query")
+
+        datacite.get_records_by_doi = failing
+        openalex.get_items_by_doi = lambda dois: []
+        assert enrich(results, datacite, openalex) == {}
+        assert results.get("10.1234/oa.0").inDataCite is None
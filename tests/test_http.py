@@ -0,0 +1,186 @@
+import gzip
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from roagg.helpers.cache import ResponseCache, normalize_url
+from roagg.helpers.http import HttpClient, HttpError
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.seen.append({
+            "path": self.path,
+            "client_port": self.client_address[1],
+            "user_agent": self.headers.get("User-Agent"),
+            "accept_encoding": self.headers.get("Accept-Encoding"),
+        })
+        if self.path == "/missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/flaky" and len(self.server.seen) == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/moved":
+            self.send_response(301)
+            self.send_header("Location", "/plain")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/etag" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"path": self.path, "items": list(range(100))}).encode()
+        self.send_response(200)
+        if self.path == "/etag":
+            self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        if self.path != "/plain" and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.seen = []
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(user_agent="roagg-test")
+    yield client
+    client.close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+class TestHttpClient:
+    """Test cases for HttpClient against a local http.server."""
+
+    def test_get_json_decodes_gzip(self, server, client):
+        assert client.get_json(url(server, "/a?x=1")) == {"path": "/a?x=1", "items": list(range(100))}
+        assert server.seen[0]["accept_encoding"] == "gzip"
+
+    def test_sets_user_agent(self, server, client):
+        client.get_json(url(server, "/a"))
+        assert server.seen[0]["user_agent"] == "roagg-test"
+
+    def test_reuses_connection(self, server, client):
+        for page in range(3):
+            client.get_json(url(server, f"/page/{page}"))
+        assert len({request["client_port"] for request in server.seen}) == 1
+
+    def test_counts_bytes_and_requests(self, server, client):
+        response = client.get(url(server, "/a"))
+        client.get(url(server, "/plain"))
+        assert client.stats.requests == 2
+        assert response.bytes_received < len(response.body)
+        host = f"127.0.0.1:{server.server_address[1]}"
+        assert client.host_stats[host].bytes_received == client.stats.bytes_received
+
+    def test_follows_redirect(self, server, client):
+        assert client.get_json(url(server, "/moved"))["path"] == "/plain"
+
+    def test_memoize_avoids_second_request(self, server, client):
+        assert client.get_json(url(server, "/lookup"), memoize=True) == client.get_json(url(server, "/lookup"), memoize=True)
+        assert len(server.seen) == 1
+
+    def test_max_per_host_limits_concurrency(self, server):
+        client = HttpClient(max_per_host=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+        original = client._request
+
+        def counting_request(*args):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            try:
+                return original(*args)
+            finally:
+                with lock:
+                    active.pop()
+
+        client._request = counting_request
+        threads = [threading.Thread(target=client.get, args=(url(server, f"/{n}"),)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(server.seen) == 8
+        assert max(peak) <= 2
+        client.close()
+
+    def test_retries_after_throttling(self, server, client):
+        assert client.get_json(url(server, "/flaky"))["path"] == "/flaky"
+        host = f"127.0.0.1:{server.server_address[1]}"
+        assert len(server.seen) == 2
+        assert client.stats.retries == 1
+        assert client.host_stats[host].throttled == 1
+
+    def test_raises_http_error(self, server, client):
+        with pytest.raises(HttpError) as error:
+            client.get(url(server, "/missing"))
+        assert error.value.status == 404
+
+
+class TestResponseCache:
+    """Test cases for the on-disk response cache."""
+
+    def test_normalize_url(self):
+        assert normalize_url("HTTPS://API.Example.org/dois?b=2&a=1#x") == "https://api.example.org/dois?a=1&b=2"
+
+    def test_rerun_within_ttl_makes_no_requests(self, server, tmp_path):
+        first = HttpClient(cache=ResponseCache(tmp_path))
+        assert first.get_json(url(server, "/a?x=1&y=2"))["path"] == "/a?x=1&y=2"
+        second = HttpClient(cache=ResponseCache(tmp_path))
+        assert second.get_json(url(server, "/a?y=2&x=1"))["path"] == "/a?x=1&y=2"
+        assert len(server.seen) == 1
+        assert (second.cache.hits, second.cache.misses) == (1, 0)
+        assert second.stats.requests == 0
+
+    def test_stale_entry_is_revalidated_with_etag(self, server, tmp_path):
+        client = HttpClient(cache=ResponseCache(tmp_path, ttl=0))
+        client.get_json(url(server, "/etag"))
+        assert client.get_json(url(server, "/etag"))["path"] == "/etag"
+        assert server.seen[1]["path"] == "/etag"
+        assert client.cache.revalidated == 1
+
+    def test_bodies_are_compressed(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        body = b'{"data": "' + b"x" * 10000 + b'"}'
+        cache.put("https://example.org/a", {}, body)
+        assert cache.path_for("https://example.org/a").stat().st_size < len(body) / 10
+        assert cache.get("https://example.org/a").body == body
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ResponseCache(tmp_path, max_bytes=1500)
+        for n in range(3):
+            cache.put(f"https://example.org/{n}", {}, os.urandom(600))
+        assert cache.get("https://example.org/0") is None
+        assert cache.get("https://example.org/2") is not None
@@ -0,0 +1,48 @@
+import json
+from roagg.helpers.http import HttpStats
+from roagg.helpers.metrics import ProviderMetrics, RunMetrics, prometheus_text, write_json_report
+
+
+def make_run(ror="https://ror.org/01tm6cn81"):
+    run = RunMetrics(ror=ror, output="out.csv", seconds=2.5, records=10)
+    run.stages["harvest"] = 2.0
+    run.providers["DataCite"] = ProviderMetrics(records=10, pages=1, harvest_seconds=2.0, requests=1)
+    return run
+
+
+class TestRunMetrics:
+    """Test cases for the run metrics report."""
+
+    def test_records_per_second(self):
+        assert ProviderMetrics(records=10, harvest_seconds=2.0).records_per_second == 5.0
+        assert ProviderMetrics(records=10).records_per_second == 0.0
+
+    def test_stage_accumulates(self):
+        run = RunMetrics()
+        with run.stage("write"):
+            pass
+        with run.stage("write"):
+            pass
+        assert list(run.stages) == ["write"]
+
+    def test_http_stats_difference(self):
+        before = HttpStats(requests=2, bytes_received=100, retries=1)
+        after = HttpStats(requests=5, bytes_received=400, retries=1)
+        metrics = ProviderMetrics()
+        metrics.add_http(after.since(before))
+        assert (metrics.requests, metrics.bytes_received, metrics.retries) == (3, 300, 0)
+
+    def test_json_report(self, tmp_path):
+        path = tmp_path / "metrics.json"
+        write_json_report(path, make_run())
+        report = json.loads(path.read_text())
+        assert report["providers"]["DataCite"]["records_per_second"] == 5.0
+        write_json_report(path, [make_run(), make_run()])
+        assert len(json.loads(path.read_text())) == 2
+
+    def test_prometheus_text(self):
+        text = prometheus_text([make_run(), make_run("https://ror.org/040wg7k59")])
+        lines = text.splitlines()
+        assert lines.count("# TYPE roagg_run_seconds gauge") == 1
+        assert 'roagg_provider_records_per_second{ror="https://ror.org/01tm6cn81",provider="DataCite"} 5.0' in lines
+        assert 'roagg_stage_seconds{ror="https://ror.org/040wg7k59",stage="harvest"} 2.0' in lines
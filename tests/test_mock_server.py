@@ -0,0 +1,117 @@
+import csv
+import json
+import logging
+import multiprocessing
+import pytest
+from roagg.aggregator import HarvestOptions, aggregate
+from roagg.helpers.http import HttpClient, set_default_client
+from roagg.helpers.ratelimit import RetryPolicy
+from roagg.mock_server import MockApiServer, MockData
+from roagg.providers.datacite import DataCiteAPI
+
+
+@pytest.fixture
+def mock_api():
+    servers = []
+
+    def start(**options):
+        server = MockApiServer(data=MockData(records=250), **options)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    set_default_client(None)
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+class TestMockApiServer:
+    """Test cases for running aggregate against the mock API server."""
+
+    def test_aggregate_end_to_end(self, mock_api, tmp_path):
+        server = mock_api()
+        output = tmp_path / "out.csv"
+        metrics = aggregate([], server.data.ror, output, HarvestOptions(parallel_providers=True, api_urls=server.api_urls()))
+        rows = read_rows(output)
+        assert metrics.records == 450
+        assert metrics.providers["DataCite"].pages == 1
+        assert metrics.providers["OpenAlex"].records == 250
+        assert {"resolve_names", "harvest", "merge", "write"} <= set(metrics.stages)
+        # 250 DataCite records, 50 PANGAEA and 150 Zenodo DOIs only in OpenAire or OpenAlex
+        assert len(rows) == 450
+        assert sum(row["inOpenAire"] == "1" for row in rows) == 200
+        assert server.stats["datacite"] == 1
+
+    def test_enrichment_fills_fields_in_batches(self, mock_api, tmp_path):
+        server = mock_api()
+        aggregate([], server.data.ror, tmp_path / "plain.csv", HarvestOptions(api_urls=server.api_urls()))
+        before = dict(server.stats)
+        aggregate([], server.data.ror, tmp_path / "out.csv", HarvestOptions(api_urls=server.api_urls(), enrich=True, datacite_mapping_workers=2))
+        plain = {row["doi"]: row for row in read_rows(tmp_path / "plain.csv")}
+        rows = read_rows(tmp_path / "out.csv")
+        assert len(rows) == 450
+        # values found for the organisation are kept, only empty fields are filled
+        assert all(value == "" or row[field] == value for row in rows for field, value in plain[row["doi"]].items())
+        assert sum(row["inDataCite"] == "1" for row in rows) == 250
+        assert sum(row["inOpenAlex"] == "1" for row in rows) == 250
+        # the odd Zenodo DOIs are in DataCite and the odd DataCite DOIs in OpenAlex, just not for this organisation
+        assert sum(row["dataCiteClientId"] != "" for row in rows) == 375
+        assert sum(row["openAlexId"] != "" for row in rows) == 375
+        assert next(row for row in rows if row["doi"] == "10.5281/zenodo.1")["dataCiteClientId"] == "snd.client1"
+        # 200 DOIs missing in each provider, 4 batches of 50 on top of the harvest
+        assert server.stats["datacite"] - before["datacite"] == 1 + 4
+        # two pages of works, the institution ID is known from the first run
+        assert server.stats["openalex"] - before["openalex"] == 2 + 4
+        # the DataCite mapping pool used by the enrichment is shut down with the run
+        assert multiprocessing.active_children() == []
+
+    def test_faults_are_retried(self, mock_api, tmp_path):
+        clean = mock_api()
+        aggregate([], clean.data.ror, tmp_path / "clean.csv", HarvestOptions(api_urls=clean.api_urls()))
+        faulty = mock_api(failure_rate=0.1, throttle_rate=0.2, retry_after=0, seed=1)
+        set_default_client(HttpClient(retry=RetryPolicy(max_retries=20, backoff=0.001)))
+        aggregate([], faulty.data.ror, tmp_path / "faulty.csv", HarvestOptions(api_urls=faulty.api_urls()))
+        assert faulty.stats["throttled"] and faulty.stats["failed"]
+        assert read_rows(tmp_path / "faulty.csv") == read_rows(tmp_path / "clean.csv")
+
+    def test_datacite_cursor_pages_and_shards(self, mock_api):
+        server = mock_api()
+        api = DataCiteAPI(page_size=40, ror=server.data.ror, base_url=server.api_urls()["datacite"], client=HttpClient())
+        paged = [record.doi for record in api.iter_records()]
+        sharded = [record.doi for record in api.iter_records_sharded(max_shard_size=30, workers=4)]
+        assert len(paged) == 250
+        assert sorted(sharded) == sorted(paged)
+        assert server.stats["datacite"] > 250 // 40
+
+    def test_checkpoint_is_removed_after_run(self, mock_api, tmp_path):
+        server = mock_api()
+        output = tmp_path / "out.csv"
+        aggregate([], server.data.ror, output, HarvestOptions(api_urls=server.api_urls(), checkpoint=True))
+        assert len(read_rows(output)) == 450
+        assert not (tmp_path / "out.checkpoint.jsonl").exists()
+
+    @pytest.mark.parametrize("store", [False, True])
+    def test_incremental_run_merges_by_doi(self, mock_api, tmp_path, caplog, store):
+        server = mock_api()
+        output = tmp_path / "out.csv"
+        state_file = tmp_path / "marks.json"
+        options = HarvestOptions(api_urls=server.api_urls(), incremental=True, state_file=str(state_file), store=str(tmp_path / "roagg.sqlite") if store else None)
+        aggregate([], server.data.ror, output, options)
+        first = read_rows(output)
+        marks = json.loads(state_file.read_text())[server.data.ror]
+        assert marks["DataCite"].startswith("2024-02-28")
+        with caplog.at_level(logging.INFO):
+            metrics = aggregate([], server.data.ror, output, options)
+        assert "Incremental harvest of 450 previous records" in caplog.text
+        # only the records updated on the high-water mark day are harvested again
+        assert 0 < metrics.providers["DataCite"].records < 250
+        rows = read_rows(output)
+        assert len(rows) == 450
+        assert sorted(row["doi"] for row in rows) == sorted(row["doi"] for row in first)
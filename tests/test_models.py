@@ -0,0 +1,93 @@
+import pytest
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.models.research_output_table import ResearchOutputTable
+from roagg.models.result_index import ResultIndex
+from roagg.providers.openaire import OpenAireAPI
+
+
+class TestResearchOutputItem:
+    """Test cases for the slotted ResearchOutputItem."""
+
+    def test_has_no_instance_dict(self):
+        assert not hasattr(ResearchOutputItem(doi="10.1234/a"), "__dict__")
+
+    def test_repeated_strings_are_interned(self):
+        a = ResearchOutputItem(doi="10.1234/a", resourceType="".join(["Data", "set"]))
+        b = ResearchOutputItem(doi="10.1234/b", resourceType="".join(["Datas", "et"]))
+        assert a.resourceType is b.resourceType
+
+
+class TestResearchOutputTable:
+    """Test cases for the column-backed ResearchOutputTable."""
+
+    items = [
+        ResearchOutputItem(doi="10.1234/a", publicationYear=2024, isFunder=None, isPublisher=True, title="A"),
+        ResearchOutputItem(doi="10.1234/b", haveCreatorAffiliation=None, inOpenAlex=False, openAlexCitedByCount=4),
+    ]
+
+    def test_round_trip(self):
+        table = ResearchOutputTable(self.items)
+        assert len(table) == 2
+        assert list(table) == self.items
+
+    def test_negative_index(self):
+        assert ResearchOutputTable(self.items)[-1] == self.items[1]
+
+    def test_index_out_of_range(self):
+        with pytest.raises(IndexError):
+            ResearchOutputTable(self.items)[2]
+
+    def test_column(self):
+        table = ResearchOutputTable(self.items)
+        assert table.column("doi") == ["10.1234/a", "10.1234/b"]
+        assert table.column("haveCreatorAffiliation") == [False, None]
+
+
+class TestResultIndex:
+    """Test cases for the cross-provider ResultIndex."""
+
+    def test_doi_is_normalised(self):
+        index = ResultIndex([ResearchOutputItem(doi="https://doi.org/10.1234/A")], "DataCite")
+        assert "10.1234/a" in index
+        assert index.get("10.1234/a").doi == "https://doi.org/10.1234/A"
+
+    def test_records_without_doi_are_kept(self):
+        index = ResultIndex([ResearchOutputItem(doi=""), ResearchOutputItem(doi=""), ResearchOutputItem(doi="10.1234/a")], "DataCite")
+        assert len(index) == 3
+        assert "" not in index
+
+    def test_provider_only_merges_its_own_fields(self):
+        index = ResultIndex([ResearchOutputItem(doi="10.1234/a", title="DataCite title", inDataCite=True)], "DataCite")
+        index.upsert(ResearchOutputItem(doi="10.1234/A", title="OpenAlex title", inOpenAlex=True, openAlexCitedByCount=2), "OpenAlex")
+        item = index.get("10.1234/a")
+        assert (item.title, item.inOpenAlex, item.openAlexCitedByCount) == ("DataCite title", True, 2)
+        assert index.source("10.1234/a", "openAlexCitedByCount") == "OpenAlex"
+        assert index.source("10.1234/a", "title") == "DataCite"
+
+    def test_precedence(self):
+        index = ResultIndex([ResearchOutputItem(doi="10.1234/a", haveCreatorAffiliation=True)], "DataCite")
+        index.upsert(ResearchOutputItem(doi="10.1234/a", haveCreatorAffiliation=False), "OpenAlex")
+        assert index.get("10.1234/a").haveCreatorAffiliation is True
+
+    def test_missing_value_is_filled_by_weaker_provider(self):
+        index = ResultIndex([ResearchOutputItem(doi="10.1234/a", haveCreatorAffiliation=None)], "OpenAire")
+        index.upsert(ResearchOutputItem(doi="10.1234/a", haveCreatorAffiliation=True), "OpenAlex")
+        assert index.get("10.1234/a").haveCreatorAffiliation is True
+
+    def test_previous_run_is_overwritten(self):
+        index = ResultIndex([ResearchOutputItem(doi="10.1234/a", title="old", openAlexCitedByCount=1)])
+        index.upsert(ResearchOutputItem(doi="10.1234/a", title="new"), "DataCite")
+        assert index.get("10.1234/a").title == "new"
+        assert index.get("10.1234/a").openAlexCitedByCount == 1
+
+    def test_openaire_enriches_every_known_doi(self):
+        index = ResultIndex([ResearchOutputItem(doi="10.1234/a"), ResearchOutputItem(doi="10.1234/b")], "DataCite")
+        product = {
+            "id": "openaire-1",
+            "mainTitle": "A",
+            "bestAccessRight": {"label": "OPEN"},
+            "instances": [{"pids": [{"scheme": "doi", "value": "10.1234/A"}, {"scheme": "doi", "value": "10.1234/B"}]}],
+        }
+        OpenAireAPI(ror="https://ror.org/01tm6cn81", results=index, client=object()).merge_records([product])
+        assert len(index) == 2
+        assert all(item.inOpenAire and item.openAireBestAccessRight == "OPEN" for item in index)
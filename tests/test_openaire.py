@@ -0,0 +1,40 @@
+import logging
+from roagg.providers.openaire import DoiExtractor, OpenAireAPI
+
+
+class TestDoiExtractor:
+    """Test cases for the OpenAire DoiExtractor."""
+
+    def test_pids_and_alternate_identifiers(self):
+        resource = {"instances": [{
+            "pids": [{"scheme": "doi", "value": "10.1234/a"}, {"scheme": "handle", "value": "11.1/x"}],
+            "alternateIdentifiers": [{"scheme": "DOI", "value": "10.1234/b"}, {"scheme": "doi", "value": "10.1234/a"}],
+            "urls": ["https://doi.org/10.1234/c"],
+        }]}
+        assert DoiExtractor().extract(resource) == ["10.1234/a", "10.1234/b"]
+
+    def test_rewritten_urls(self):
+        resource = {"instances": [{"urls": [
+            "https://zenodo.org/records/123",
+            "https://doi.pangaea.de/10.1594/PANGAEA.1",
+            "https://example.org/landing",
+        ]}]}
+        assert DoiExtractor().extract(resource) == ["10.5281/zenodo.123", "10.1594/PANGAEA.1"]
+
+    def test_non_ascii_match_is_rejected(self):
+        assert DoiExtractor().extract({"instances": [{"urls": ["https://doi.org/10.1234/å"]}]}) == []
+
+    def test_missing_dois_are_summarised(self, caplog):
+        extractor = DoiExtractor()
+        pages = extractor.extract_page([
+            {"id": "a", "instances": [{"urls": []}]},
+            {"id": "b", "instances": [{"pids": [{"scheme": "doi", "value": "10.1234/b"}]}]},
+        ])
+        assert pages == [[], ["10.1234/b"]]
+        with caplog.at_level(logging.WARNING):
+            extractor.log_summary()
+        assert caplog.messages == ["No DOI found in 1 of 2 OpenAire research products, e.g. a"]
+
+    def test_api_method_uses_extractor(self):
+        api = OpenAireAPI(client=object())
+        assert api.get_doi_list_from_resource({"instances": [{"urls": ["https://doi.org/10.1234/x"]}]}) == ["10.1234/x"]
@@ -0,0 +1,54 @@
+import urllib.parse
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.models.result_index import ResultIndex
+from roagg.providers.openalex import OpenAlexAPI
+
+
+class FakeClient:
+    """Serves one page of works and records the requested URLs."""
+
+    def __init__(self, works):
+        self.works = works
+        self.urls = []
+
+    def get_json(self, url, headers=None, memoize=False):
+        self.urls.append(url)
+        if "/institutions/" in url:
+            return {"id": "https://openalex.org/I123"}
+        return {"results": self.works, "meta": {"count": len(self.works), "next_cursor": None}}
+
+
+def work(doi, **fields):
+    return {"id": f"https://openalex.org/W{doi[-1]}", "doi": f"https://doi.org/{doi}", "title": "A title", **fields}
+
+
+class TestOpenAlex:
+    """Test cases for the OpenAlex harvest."""
+
+    def test_select_limits_fields(self):
+        client = FakeClient([])
+        OpenAlexAPI(ror="https://ror.org/01tm6cn81", client=client).fetch_records()
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(client.urls[-1]).query))
+        assert params["select"].split(",") == OpenAlexAPI.select_fields
+
+    def test_full_records(self):
+        client = FakeClient([])
+        OpenAlexAPI(ror="https://ror.org/01tm6cn81", client=client, project_fields=False).fetch_records()
+        assert "select=" not in client.urls[-1]
+
+    def test_merge_enriches_and_adds(self):
+        results = ResultIndex([ResearchOutputItem(doi="10.1234/A", inDataCite=True)], "DataCite")
+        client = FakeClient([work("10.1234/a", cited_by_count=3), work("10.1234/b", publication_date="2021-05-01")])
+        OpenAlexAPI(ror="https://ror.org/01tm6cn81", client=client, results=results).get_records()
+        assert results.get("10.1234/a").openAlexCitedByCount == 3
+        assert results.get("10.1234/a").inOpenAlex is True
+        assert [r.doi for r in results] == ["10.1234/A", "10.1234/b"]
+        assert results.get("10.1234/b").publicationYear == "2021"
+
+    def test_items_by_doi_in_chunks_of_the_filter_limit(self, caplog):
+        client = FakeClient([])
+        dois = [f"10.1234/{n}" for n in range(250)] + ["10.1234/a,b", "10.1234/a|b"]
+        OpenAlexAPI(client=client).get_items_by_doi(dois)
+        filters = [dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))["filter"] for url in client.urls]
+        assert [len(f.split("|")) for f in filters] == [100, 100, 50]
+        assert "skips 2 DOIs that cannot be used in a filter: 10.1234/a,b, 10.1234/a|b" in caplog.text
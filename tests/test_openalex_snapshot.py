@@ -0,0 +1,103 @@
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.models.result_index import ResultIndex
+from roagg.providers.openalex import OpenAlexAPI
+from roagg.providers.openalex_snapshot import OpenAlexSnapshot
+
+GU = "https://ror.org/01tm6cn81"
+KTH = "https://ror.org/026vcq606"
+
+
+def work(n, ror, work_type="dataset", updated="2024-01-01", cited=0):
+    return {
+        "id": f"https://openalex.org/W{n}",
+        "doi": f"https://doi.org/10.5878/{n}",
+        "title": f"Work {n}",
+        "type": work_type,
+        "updated_date": updated,
+        "cited_by_count": cited,
+        "referenced_works_count": 1,
+        "abstract_inverted_index": {"not": [0], "kept": [1]},
+        "authorships": [{"institutions": [{"ror": ror}]}],
+    }
+
+
+def write_partition(directory, updated, works):
+    partition = directory / "data" / "works" / f"updated_date={updated}"
+    partition.mkdir(parents=True)
+    with gzip.open(partition / "part_000.gz", "wt", encoding="utf-8") as file:
+        for w in works:
+            file.write(json.dumps(w) + "\n")
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    write_partition(tmp_path, "2024-01-01", [work(1, GU), work(2, KTH), work(3, GU, work_type="article")])
+    # a newer version of W1 in a later partition
+    write_partition(tmp_path, "2024-06-01", [work(1, GU, updated="2024-06-01", cited=5), work(4, GU, updated="2024-06-01")])
+    return tmp_path
+
+
+class TestOpenAlexSnapshot:
+    """Test cases for the OpenAlex snapshot index."""
+
+    def test_works_for_ror(self, snapshot_dir):
+        snapshot = OpenAlexSnapshot(snapshot_dir, workers=2)
+        works = snapshot.works_for_ror(GU)
+        assert [w["id"] for w in works] == ["https://openalex.org/W1", "https://openalex.org/W4"]
+        assert works[0]["cited_by_count"] == 5
+        assert "abstract_inverted_index" not in works[0]
+
+    def test_updated_since(self, snapshot_dir):
+        snapshot = OpenAlexSnapshot(snapshot_dir, workers=1)
+        assert len(snapshot.works_for_ror(GU, updated_since="2024-03-01T00:00:00Z")) == 2
+        assert len(snapshot.works_for_ror(KTH, updated_since="2024-03-01T00:00:00Z")) == 0
+
+    def test_index_is_reused(self, snapshot_dir):
+        assert OpenAlexSnapshot(snapshot_dir, workers=1).build_index() == 4
+        snapshot = OpenAlexSnapshot(snapshot_dir, workers=1)
+        assert snapshot.stale_partitions() == []
+        assert snapshot.build_index() == 0
+        assert snapshot.lookup(["https://doi.org/10.5878/2", "10.5878/404"])["10.5878/2"]["referenced_works_count"] == 1
+
+    def test_lookup_finds_any_work_type(self, snapshot_dir):
+        snapshot = OpenAlexSnapshot(snapshot_dir, workers=1, types=None)
+        assert snapshot.lookup(["10.5878/3"])["10.5878/3"]["type"] == "article"
+        assert [w["id"] for w in snapshot.works_for_ror(GU)] == ["https://openalex.org/W1", "https://openalex.org/W4"]
+
+    def test_index_for_other_types_is_rebuilt(self, snapshot_dir):
+        assert OpenAlexSnapshot(snapshot_dir, workers=1).build_index() == 4
+        snapshot = OpenAlexSnapshot(snapshot_dir, workers=1, types=None)
+        assert len(snapshot.stale_partitions()) == 2
+        assert "10.5878/3" in snapshot.lookup(["10.5878/3"])
+
+    def test_index_for_all_types_is_reused_for_datasets(self, snapshot_dir):
+        assert OpenAlexSnapshot(snapshot_dir, workers=1, types=None).build_index() == 5
+        snapshot = OpenAlexSnapshot(snapshot_dir, workers=1)
+        assert snapshot.stale_partitions() == []
+        assert snapshot.types is None
+        assert [w["id"] for w in snapshot.works_for_ror(GU)] == ["https://openalex.org/W1", "https://openalex.org/W4"]
+
+    def test_harvest_and_lookup_share_the_index(self, snapshot_dir):
+        snapshot = OpenAlexSnapshot(snapshot_dir, workers=1, types=None)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            works = executor.submit(snapshot.works_for_ror, GU)
+            lookups = [executor.submit(snapshot.lookup, ["10.5878/3"]) for _ in range(3)]
+            assert len(works.result()) == 2
+            assert all("10.5878/3" in lookup.result() for lookup in lookups)
+        assert snapshot.build_index() == 0
+
+    def test_items_by_doi_from_snapshot(self, snapshot_dir):
+        api = OpenAlexAPI(ror=GU, snapshot=OpenAlexSnapshot(snapshot_dir, workers=1, types=None), client=object())
+        items = api.get_items_by_doi(["10.5878/3", "https://doi.org/10.5878/1", "10.5878/404"])
+        assert [(item.doi, item.openAlexCitedByCount) for item in items] == [("10.5878/3", 0), ("10.5878/1", 5)]
+
+    def test_openalex_api_reads_snapshot(self, snapshot_dir):
+        results = ResultIndex([ResearchOutputItem(doi="10.5878/1", inDataCite=True)], "DataCite")
+        api = OpenAlexAPI(ror=GU, results=results, snapshot=OpenAlexSnapshot(snapshot_dir, workers=1))
+        api.get_records()
+        assert results.get("10.5878/1").openAlexCitedByCount == 5
+        assert [r.doi for r in results] == ["10.5878/1", "10.5878/4"]
@@ -0,0 +1,55 @@
+import threading
+import time
+import pytest
+from roagg.helpers.pager import paginate
+
+
+class EndlessPages:
+    """Numbered pages that never run out."""
+
+    def __init__(self, fail_at=None):
+        self.requested = 0
+        self.fail_at = fail_at
+        self.threads = set()
+
+    def __call__(self, cursor):
+        self.threads.add(threading.current_thread().name)
+        self.requested += 1
+        if self.requested == self.fail_at:
+            raise OSError("connection reset")
+        return [int(cursor)], str(int(cursor) + 1), None
+
+
+class TestPrefetch:
+    """Test cases for the prefetching pager."""
+
+    def test_same_pages_as_serial(self):
+        def fetch(cursor):
+            n = int(cursor)
+            return [n, n], (str(n + 1) if n < 9 else None), 20
+
+        serial = list(paginate(fetch, "0", "test"))
+        assert list(paginate(fetch, "0", "test", prefetch=3)) == serial
+
+    def test_fetches_in_background_thread(self):
+        fetch = EndlessPages()
+        pages = paginate(fetch, "0", "test", prefetch=2)
+        assert next(pages) == [0]
+        assert threading.current_thread().name not in fetch.threads
+        pages.close()
+
+    def test_backpressure(self):
+        fetch = EndlessPages()
+        pages = paginate(fetch, "0", "test", prefetch=2)
+        next(pages)
+        time.sleep(0.3)
+        # one page consumed, two waiting and one fetched but blocked on the full queue
+        assert fetch.requested <= 4
+        pages.close()
+
+    def test_error_is_raised_in_consumer(self):
+        pages = paginate(EndlessPages(fail_at=3), "0", "test", prefetch=2)
+        assert next(pages) == [0]
+        assert next(pages) == [1]
+        with pytest.raises(OSError):
+            next(pages)
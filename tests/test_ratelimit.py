@@ -0,0 +1,79 @@
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import pytest
+from roagg.helpers.http import HttpError
+from roagg.helpers.ratelimit import AdaptiveLimiter, RetryPolicy, TokenBucket, parse_retry_after
+
+
+class TestTokenBucket:
+    """Test cases for the token bucket rate limit."""
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        # two tokens from the burst, two more at 50 per second
+        assert time.monotonic() - start >= 0.035
+
+
+class TestAdaptiveLimiter:
+    """Test cases for the adaptive concurrency limit."""
+
+    def test_halves_on_throttle_and_grows_back(self):
+        limiter = AdaptiveLimiter(8, increase_after=2)
+        limiter.throttled()
+        limiter.throttled()
+        assert limiter.limit == 2
+        for _ in range(4):
+            limiter.succeeded()
+        assert limiter.limit == 4
+
+    def test_never_below_one(self):
+        limiter = AdaptiveLimiter(1)
+        limiter.throttled()
+        assert limiter.limit == 1
+
+
+class TestRetryAfter:
+    """Test cases for parse_retry_after."""
+
+    def test_seconds(self):
+        assert parse_retry_after("120") == 120
+
+    def test_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        assert 25 < parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+
+    def test_invalid(self):
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+
+class TestRetryPolicy:
+    """Test cases for the retry decisions."""
+
+    policy = RetryPolicy(max_retries=3, backoff=1, max_backoff=10)
+
+    @pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+    def test_retries_throttling_and_server_errors(self, status):
+        assert self.policy.delay(HttpError("u", status), 0) is not None
+
+    def test_does_not_retry_client_errors(self):
+        assert self.policy.delay(HttpError("u", 404), 0) is None
+
+    def test_honours_retry_after(self):
+        assert self.policy.delay(HttpError("u", 429, headers={"retry-after": "7"}), 0) == 7
+
+    def test_retry_after_is_capped(self):
+        assert self.policy.delay(HttpError("u", 429, headers={"retry-after": "3600"}), 0) == 10
+
+    def test_retries_timeouts(self):
+        assert 0 <= self.policy.delay(TimeoutError(), 2) <= 4
+
+    def test_gives_up_after_max_retries(self):
+        assert self.policy.delay(TimeoutError(), 3) is None
+
+    def test_does_not_retry_other_errors(self):
+        assert self.policy.delay(ValueError(), 0) is None
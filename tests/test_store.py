@@ -0,0 +1,35 @@
+import pytest
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.store import RecordStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    with RecordStore(str(tmp_path / "roagg.sqlite"), batch_size=2) as store:
+        yield store
+
+
+class TestRecordStore:
+    """Test cases for the SQLite record store."""
+
+    def test_round_trip(self, store):
+        item = ResearchOutputItem(doi="10.1234/a", publicationYear=2024, isPublisher=True, inOpenAlex=None, title="A")
+        assert store.upsert("https://ror.org/1", [item]) == 1
+        assert list(store.iter_records("https://ror.org/1")) == [item]
+
+    def test_upsert_by_normalised_doi(self, store):
+        store.upsert("https://ror.org/1", [ResearchOutputItem(doi="https://doi.org/10.1234/ABC", title="old")])
+        store.upsert("https://ror.org/1", [ResearchOutputItem(doi="10.1234/abc", title="new")])
+        assert [item.title for item in store.iter_records("https://ror.org/1")] == ["new"]
+
+    def test_organisations_are_separate(self, store):
+        store.upsert("https://ror.org/1", [ResearchOutputItem(doi=f"10.1234/{n}") for n in range(5)])
+        store.upsert("https://ror.org/2", [ResearchOutputItem(doi="10.1234/0")])
+        assert store.count("https://ror.org/1") == 5
+        assert store.count("https://ror.org/2") == 1
+        store.clear("https://ror.org/1")
+        assert store.count("https://ror.org/1") == 0
+        assert store.count("https://ror.org/2") == 1
+
+    def test_items_without_doi_are_skipped(self, store):
+        assert store.upsert("", [ResearchOutputItem(doi=None)]) == 0
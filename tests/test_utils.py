@@ -1,5 +1,6 @@
 import pytest
-from roagg.helpers.utils import is_valid_doi, find_doi_in_text, string_word_count
+from pathlib import Path
+from roagg.helpers.utils import is_valid_doi, find_doi_in_text, string_word_count, match_patterns, NameMatcher
 
 
 class TestIsValidDoi:
@@ -252,4 +253,50 @@ class TestStringWordCount:
     def test_string_with_numeric_characters(self):
         """Test with numeric characters - split() doesn't separate on dots."""
         # "Version 2.0 of the software" = 5 words (2.0 is one word)
-        assert string_word_count("Version 2.0 of the software    ") == 5
\ No newline at end of file
+        assert string_word_count("Version 2.0 of the software    ") == 5
+
+class TestNameMatcher:
+    """NameMatcher must give the same results as match_patterns."""
+
+    candidates = [
+        None,
+        "",
+        "Swedish University of Agricultural Sciences",
+        "Department of Ecology, SLU Uppsala",
+        "Sveriges lantbruksuniversitet",
+        "University of Gothenburg",
+        "Göteborgs universitet, Institutionen för biologi",
+        "Chalmers tekniska högskola",
+        "KTH Royal Institute of Technology",
+        "Stockholm University",
+        "Lund University",
+        "NOAA",
+    ]
+
+    @pytest.mark.parametrize("name_list", sorted((Path(__file__).parent / "name-lists").glob("*.txt")), ids=lambda p: p.stem)
+    def test_same_result_as_match_patterns(self, name_list):
+        patterns = [line.strip() for line in name_list.read_text().splitlines() if line.strip()]
+        matcher = NameMatcher(patterns)
+        for candidate in self.candidates:
+            assert matcher.match(candidate) == match_patterns(candidate, patterns), candidate
+
+    def test_substring_is_case_insensitive(self):
+        assert NameMatcher(["Chalmers"]).match("CHALMERS UNIVERSITY")
+
+    def test_wildcard_must_match_whole_string(self):
+        matcher = NameMatcher(["swe* univ*"])
+        assert matcher.match("Swedish University of Agricultural Sciences")
+        assert not matcher.match("The Swedish University")
+
+    def test_question_mark_matches_single_character(self):
+        matcher = NameMatcher(["g?teborg"])
+        assert matcher.match("Göteborg")
+        assert not matcher.match("Gteborg")
+
+    def test_special_characters_are_escaped(self):
+        matcher = NameMatcher(["a.b (c)"])
+        assert matcher.match("x a.b (c) y")
+        assert not matcher.match("axb (c)")
+
+    def test_empty_pattern_list(self):
+        assert not NameMatcher([]).match("anything")
@@ -0,0 +1,100 @@
+import gzip
+import json
+import os
+import tracemalloc
+import pytest
+from roagg.models.research_output_item import ResearchOutputItem
+from roagg.writers import CsvWriter, JsonlWriter, OutputWriter, ParquetWriter, check_output, read_output, write_output, writer_for
+
+
+def make_items(count: int):
+    for n in range(count):
+        yield ResearchOutputItem(
+            doi=f"10.1234/{n}", title=f"Dataset, \"{n}\"", publicationYear=2000 + n % 25,
+            inDataCite=n % 2 == 0, inOpenAlex=None, dataCiteCitationCount=n, publisher="Svensk nationell datatjänst",
+        )
+
+
+class TestWriters:
+    """Test cases for the streaming output writers."""
+
+    def test_format_from_suffix(self):
+        assert isinstance(writer_for("data/kth.csv"), CsvWriter)
+        assert isinstance(writer_for("data/kth.txt"), CsvWriter)
+        jsonl = writer_for("data/kth.JSONL.gz")
+        assert isinstance(jsonl, JsonlWriter) and jsonl.compression == "gzip"
+        assert isinstance(writer_for("data/kth.parquet"), ParquetWriter)
+        assert isinstance(writer_for("data/kth.csv", "jsonl"), JsonlWriter)
+        with pytest.raises(ValueError):
+            writer_for("data/kth.csv", "xml")
+
+    def test_writer_must_implement_open_write_close(self):
+        class NoClose(OutputWriter):
+            def open(self):
+                pass
+
+            def write(self, item):
+                pass
+
+        with pytest.raises(TypeError, match="close"):
+            NoClose("out.txt")
+
+    @pytest.mark.parametrize("name", ["out.csv", "out.csv.gz", "out.jsonl", "out.jsonl.gz"])
+    def test_round_trip(self, tmp_path, name):
+        path = tmp_path / "nested" / name
+        assert write_output(make_items(20), path) == 20
+        assert list(read_output(path)) == list(make_items(20))
+        assert os.listdir(path.parent) == [name]
+
+    def test_gzip_and_jsonl_content(self, tmp_path):
+        write_output(make_items(2), tmp_path / "out.jsonl.gz")
+        with gzip.open(tmp_path / "out.jsonl.gz", "rt", encoding="utf-8") as file:
+            rows = [json.loads(line) for line in file]
+        assert rows[0]["inDataCite"] is True
+        assert rows[0]["inOpenAlex"] is None
+        assert rows[1]["publisher"] == "Svensk nationell datatjänst"
+
+    def test_failed_write_keeps_previous_output(self, tmp_path):
+        path = tmp_path / "out.csv"
+        write_output(make_items(3), path)
+        before = path.read_bytes()
+
+        def failing():
+            yield from make_items(2)
+            raise RuntimeError("harvest failed")
+
+        with pytest.raises(RuntimeError):
+            write_output(failing(), path)
+        assert path.read_bytes() == before
+        assert os.listdir(tmp_path) == ["out.csv"]
+
+    def test_constant_memory(self, tmp_path):
+        def peak(count):
+            tracemalloc.start()
+            write_output(make_items(count), tmp_path / "out.csv.gz")
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        assert peak(20000) < peak(2000) + 100 * 1024
+
+    def test_zstd(self, tmp_path):
+        pytest.importorskip("zstandard")
+        write_output(make_items(5), tmp_path / "out.csv.zst")
+        assert list(read_output(tmp_path / "out.csv.zst")) == list(make_items(5))
+
+    def test_parquet(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        items = list(make_items(5))
+        items[0].publicationYear = "2021"
+        write_output(items, tmp_path / "out.parquet")
+        assert [item.publicationYear for item in read_output(tmp_path / "out.parquet")] == [2021, 2001, 2002, 2003, 2004]
+
+    def test_missing_optional_package_fails_early(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            with pytest.raises(RuntimeError, match="roagg\\[parquet\\]"):
+                check_output("data/kth.parquet")
+        else:
+            pytest.skip("pyarrow is installed")